@@ -0,0 +1,216 @@
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from rules import ACES, KINGS, SEVENS
+from records import MAX_SEATS, PASS, find_stores
+
+EDGES = ACES | ACES << 1 | KINGS >> 1 | KINGS		# A, 2, Q, K: the cards furthest from the 7s
+TIME_BINS = np.logspace(-3, 2, 51)		# 1 ms .. 100 s, log spaced (moves outside land in the end bins)
+
+
+# set bits of every uint64 in the array (SWAR, no unpacking)
+def popcount(x):
+	x = x.astype(np.uint64)
+	x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+	x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+	x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+	return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+# every query folds chunks of games into a few counters (memory independent of the number of games)
+
+
+# how often the seat holding 7H (first on turn) wins, and where it finishes on average, per table size
+class FirstPlayer:
+	title = "first-player advantage"
+
+	def __init__(self):
+		self.games = np.zeros(MAX_SEATS + 1, dtype = np.int64)		# by number of players
+		self.wins = np.zeros(MAX_SEATS + 1, dtype = np.int64)
+		self.places = np.zeros(MAX_SEATS + 1, dtype = np.int64)		# sum of finishing places (0 = winner)
+
+
+	def update(self, games, moves):
+		players = games["num_players"].astype(np.int64)
+		place = (games["order"] == games["first"][:, None]).argmax(axis = 1)
+		self.games += np.bincount(players, minlength = MAX_SEATS + 1)
+		self.wins += np.bincount(players, weights = place == 0, minlength = MAX_SEATS + 1).astype(np.int64)
+		self.places += np.bincount(players, weights = place, minlength = MAX_SEATS + 1).astype(np.int64)
+
+
+	def result(self):
+		players = np.nonzero(self.games)[0]
+		games = self.games[players]
+		return pd.DataFrame({
+				"players": players,
+				"games": games,
+				"first_wins": self.wins[players] / games,
+				"fair_wins": 1 / players,
+				"first_place": self.places[players] / games + 1,
+				"fair_place": (players + 1) / 2,
+				})
+
+
+	def plot(self, ax, df):
+		x = np.arange(len(df))
+		ax.bar(x - 0.2, df["first_wins"], 0.4, label = "seat holding 7H")
+		ax.bar(x + 0.2, df["fair_wins"], 0.4, label = "1 / players")
+		ax.set_xticks(x, [f"{p} players" for p in df["players"]])
+		ax.set_ylabel("win rate")
+		ax.legend()
+
+
+# PASS share of a seat's turns, by the hand it was dealt: 7s held x edge cards (A, 2, Q, K) held
+class PassRate:
+	title = "pass rate by hand"
+
+	def __init__(self):
+		self.passes = np.zeros((5, 17), dtype = np.int64)
+		self.turns = np.zeros((5, 17), dtype = np.int64)
+
+
+	def update(self, games, moves):
+		seated = np.arange(MAX_SEATS) < games["num_players"][:, None].astype(np.int64)
+		hands = games["hands"][seated]
+		passes = games["passes"][seated].astype(np.int64)
+		cell = popcount(hands & np.uint64(SEVENS)) * 17 + popcount(hands & np.uint64(EDGES))
+		turns = passes + popcount(hands)		# every dealt card is played, one turn each
+		self.passes += np.bincount(cell, weights = passes, minlength = 5 * 17).reshape(5, 17).astype(np.int64)
+		self.turns += np.bincount(cell, weights = turns, minlength = 5 * 17).reshape(5, 17).astype(np.int64)
+
+
+	# 7s dealt (rows) x edge cards dealt (columns), cells seen in fewer than min_turns turns left empty
+	def result(self, min_turns = 100):
+		rate = np.where(self.turns >= min_turns, self.passes / np.maximum(self.turns, 1), np.nan)
+		df = pd.DataFrame(rate, index = pd.Index(range(5), name = "sevens"), columns = pd.Index(range(17), name = "edges"))
+		return df.dropna(how = "all").dropna(axis = 1, how = "all")
+
+
+	def plot(self, ax, df):
+		image = ax.imshow(df.values, origin = "lower", aspect = "auto", cmap = "viridis")
+		ax.set_xticks(range(len(df.columns)), df.columns)
+		ax.set_yticks(range(len(df.index)), df.index)
+		ax.set_xlabel("edge cards dealt (A, 2, Q, K)")
+		ax.set_ylabel("7s dealt")
+		ax.figure.colorbar(image, ax = ax, label = "PASS / turns")
+
+
+# seconds per move (since the previous one), humans and bots apart, untimed (simulated) moves skipped
+class MoveTimes:
+	title = "time per move"
+	kinds = ["human", "bot"]
+
+	def __init__(self):
+		self.counts = np.zeros((2, len(TIME_BINS) - 1), dtype = np.int64)
+		self.moves = np.zeros(2, dtype = np.int64)
+		self.seconds = np.zeros(2)
+		self.passes = np.zeros(2, dtype = np.int64)
+
+
+	def update(self, games, moves):
+		seconds = moves["move_seconds"]
+		bots = np.repeat(games["bots"], games["num_moves"].astype(np.int64))
+		bot = ((bots >> moves["move_seat"]) & 1).astype(bool)
+		timed = ~np.isnan(seconds)
+		for kind, mask in enumerate([timed & ~bot, timed & bot]):
+			values = np.clip(seconds[mask], TIME_BINS[0], TIME_BINS[-1])
+			self.counts[kind] += np.histogram(values, TIME_BINS)[0]
+			self.moves[kind] += mask.sum()
+			self.seconds[kind] += values.sum()
+			self.passes[kind] += (moves["move_card"][mask] == PASS).sum()
+
+
+	# bucket upper bound holding the q-th quantile
+	def quantile(self, kind, q):
+		seen = np.cumsum(self.counts[kind])
+		if not seen[-1]:
+			return np.nan
+		return TIME_BINS[1:][np.searchsorted(seen, q * seen[-1])]
+
+
+	# one row per kind of player that has timed moves
+	def result(self):
+		kinds = [kind for kind in range(2) if self.moves[kind]]
+		return pd.DataFrame({
+				"moves": self.moves[kinds],
+				"mean": self.seconds[kinds] / self.moves[kinds],
+				"p50": [self.quantile(kind, 0.5) for kind in kinds],
+				"p90": [self.quantile(kind, 0.9) for kind in kinds],
+				"p99": [self.quantile(kind, 0.99) for kind in kinds],
+				"passes": self.passes[kinds] / self.moves[kinds],
+				}, index = [self.kinds[kind] for kind in kinds])
+
+
+	def plot(self, ax, df):
+		for kind, name in enumerate(self.kinds):
+			if self.moves[kind]:
+				ax.stairs(self.counts[kind] / self.moves[kind], TIME_BINS, label = f"{name} ({self.moves[kind]:,} moves)")
+		ax.set_xscale("log")
+		ax.set_xlabel("seconds since the previous move")
+		ax.set_ylabel("share of moves")
+		ax.legend()
+
+
+QUERIES = {"first_player": FirstPlayer, "pass_rate": PassRate, "move_times": MoveTimes}
+
+
+# streams every store under path through the queries, chunk games at a time, returns (games, seconds)
+def scan(path, queries, chunk = 1 << 16):
+	start = time.perf_counter()
+	n = 0
+	for store in find_stores(path):
+		for games, moves in store.chunks(chunk):
+			for query in queries:
+				query.update(games, moves)
+			n += len(games["seed"])
+	return n, time.perf_counter() - start
+
+
+# one png per query (matplotlib only imported when plotting, no display needed)
+def plot(queries, results, out_dir):
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	os.makedirs(out_dir, exist_ok = True)
+	paths = []
+	for name, query in queries.items():
+		if results[name].empty:
+			continue
+		fig, ax = plt.subplots(figsize = (7, 4.5))
+		query.plot(ax, results[name])
+		ax.set_title(query.title)
+		fig.tight_layout()
+		path = os.path.join(out_dir, f"{name}.png")
+		fig.savefig(path, dpi = 120)
+		plt.close(fig)
+		paths.append(path)
+	return paths
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "aggregate recorded games (records.py) without loading them into memory")
+	parser.add_argument("path", help = "a record store, or a directory of them (searched recursively)")
+	parser.add_argument("--queries", nargs = "+", choices = sorted(QUERIES), default = list(QUERIES))
+	parser.add_argument("--chunk", type = int, default = 1 << 16, help = "games per chunk")
+	parser.add_argument("--plots", default = None, help = "write one png per query here")
+	args = parser.parse_args()
+
+	queries = {name: QUERIES[name]() for name in args.queries}
+	games, elapsed = scan(args.path, queries.values(), args.chunk)
+	print(f"{games:,} games in {elapsed:.2f}s ({games / max(elapsed, 1e-9):,.0f} games/s)")
+	results = {name: query.result() for name, query in queries.items()}
+	with pd.option_context("display.max_rows", 100, "display.width", 120):
+		for name, query in queries.items():
+			print(f"\n{query.title}:")
+			if results[name].empty:
+				print("(no data)")
+			else:
+				print(results[name].to_string(index = name != "first_player", float_format = "{:.4f}".format))
+	if args.plots:
+		for path in plot(queries, results, args.plots):
+			print("wrote", path)
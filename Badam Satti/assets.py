@@ -0,0 +1,61 @@
+import os
+import pygame
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+# card sprites loaded once, scaled surfaces cached per (card, size, hover)
+class SpriteCache:
+	def __init__(self, asset_dir = ASSET_DIR, hover_scale = 0.1, atlas = False):
+		self.asset_dir = asset_dir
+		self.hover_scale = hover_scale		# hovered cards are drawn this much bigger
+		self.use_atlas = atlas		# pack every sprite into one surface (one texture, subsurface views)
+		self.atlas = None
+		self.images = {}		# card -> full size surface
+		self.scaled = {}		# (card, size, hover) -> scaled surface
+		self.screen_size = None
+
+
+	# read every png in the assets folder (needs a display mode set for convert_alpha)
+	def load(self):
+		names = sorted(f[:-4] for f in os.listdir(self.asset_dir) if f.endswith(".png"))
+		images = {name: pygame.image.load(os.path.join(self.asset_dir, f"{name}.png")).convert_alpha() for name in names}
+		if self.use_atlas:
+			images = self.pack(images)
+		self.images = images
+		self.scaled.clear()
+
+
+	# blit the sprites on a grid in one surface, hand out subsurfaces of it
+	def pack(self, images):
+		w = max(image.get_width() for image in images.values())
+		h = max(image.get_height() for image in images.values())
+		cols = 14
+		rows = (len(images) + cols - 1) // cols
+		self.atlas = pygame.Surface((w * cols, h * rows), pygame.SRCALPHA).convert_alpha()
+		packed = {}
+		for i, (name, image) in enumerate(images.items()):
+			rect = pygame.Rect((i % cols) * w, (i // cols) * h, image.get_width(), image.get_height())
+			self.atlas.blit(image, rect)
+			packed[name] = self.atlas.subsurface(rect)
+		return packed
+
+
+	# scaled sprite of the card, size is the card size on the table (hover scaling applied here)
+	def get(self, card, size, hover = False):
+		key = (card, size, hover)
+		surface = self.scaled.get(key)
+		if surface is None:
+			if not self.images:
+				self.load()
+			scale = 1 + hover * self.hover_scale
+			surface = pygame.transform.scale(self.images[card], (round(size[0] * scale), round(size[1] * scale)))
+			self.scaled[key] = surface
+		return surface
+
+
+	# window size changed, the scaled sprites are stale
+	def resize(self, screen_size):
+		if screen_size != self.screen_size:
+			self.screen_size = screen_size
+			self.scaled.clear()
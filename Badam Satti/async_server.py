@@ -0,0 +1,13 @@
+import hive
+from gamehive.async_server import AsyncServer as CoreAsyncServer
+from game_type import GAME
+
+
+# gamehive AsyncServer hosting Badam Satti only
+class AsyncServer(CoreAsyncServer):
+	def __init__(self, host = '127.0.0.1', port = 62743, users = 2, bots = 0, metrics = None, log_dir = None, record_dir = None):
+		CoreAsyncServer.__init__(self, [GAME], host, port, users, bots, metrics, log_dir, record_dir)
+
+
+if __name__ == "__main__":
+	AsyncServer(host = "0.0.0.0").run()
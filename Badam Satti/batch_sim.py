@@ -0,0 +1,198 @@
+import time
+import random
+import argparse
+
+import numpy as np
+
+from room import Room
+
+PASS = -1
+SEVEN_H = 6		# card id of 7H
+
+
+class BatchGame:
+	# N games from their shuffled decks (card ids) and the turn Room drew before dealing
+	def __init__(self, decks, turns, num_players, record = False):
+		self.n = len(decks)
+		self.num_players = num_players
+		n, p = self.n, self.num_players
+		self.games = np.arange(n)
+
+		# distribute cards among players the way Room.initialise_board does
+		per_player = 52 // p
+		self.hands = np.zeros((n, p, 52), dtype = bool)
+		for i in range(p):
+			self.hands[self.games[:, None], i, decks[:, i * per_player : (i + 1) * per_player]] = True
+		self.leftover = np.zeros((n, 52), dtype = bool)
+		self.leftover[self.games[:, None], decks[:, per_player * p :]] = True
+
+		self.table = np.full((n, 4, 2), -1, dtype = np.int8)		# (l, r) per suite, -1 if closed
+		self.started = np.zeros(n, dtype = bool)
+		self.turn = np.where(self.hands[:, :, SEVEN_H].any(axis = 1), self.hands[:, :, SEVEN_H].argmax(axis = 1), turns)		# find_7H
+		self.active = np.ones((n, p), dtype = bool)
+		self.finished = np.zeros(n, dtype = bool)
+		self.position = np.full((n, p), -1)		# finishing position per seat (0 = winner)
+		self.num_out = np.zeros(n, dtype = int)
+		self.steps = 0
+
+		# leftover 7s go straight on the table (find_7H)
+		for s in range(4):
+			g = self.games[self.leftover[:, s * 13 + 6]]
+			self.leftover[g, s * 13 + 6] = False
+			self.put_on_table(g, np.full(len(g), s * 13 + 6))
+
+		self.record = record
+		self.history = []		# (N,) card id / PASS per step, -2 once a game is finished
+
+
+	# same seed -> same deal and starting turn as Room(num_players, seed)
+	@classmethod
+	def from_seeds(cls, seeds, num_players, record = False):
+		decks, turns = [], []
+		for seed in seeds:
+			rng = random.Random(int(seed))		# replays Room.__init__ + initialise_board draws
+			turns.append(rng.choice(range(num_players)))
+			deck = list(range(52))
+			rng.shuffle(deck)
+			decks.append(deck)
+		return cls(np.array(decks), np.array(turns), num_players, record)
+
+
+	# (N, 8) candidate card ids (52 = none) and whether the player on turn holds them
+	def candidates(self):
+		l, r = self.table[:, :, 0].astype(int), self.table[:, :, 1].astype(int)
+		base = np.arange(4) * 13
+		closed = l == -1
+		cand = np.stack([
+				np.where(closed, base + 6, np.where(l > 0, base + l - 1, 52)),		# 7 of a closed suite / left neighbour
+				np.where(closed | (r == 12), 52, base + r + 1),		# right neighbour
+				], axis = 2).reshape(self.n, 8)
+		cand[~self.started] = 52		# only 7H opens the game
+		cand[~self.started, 0] = SEVEN_H
+		hand = np.zeros((self.n, 53), dtype = bool)		# column 52 swallows the empty candidates
+		hand[:, :52] = self.hands[self.games, self.turn]
+		return cand, hand[self.games[:, None], cand]
+
+
+	# (N, 52) mask of cards the player on turn may place (Room.legal_moves for every game at once)
+	def legal_moves(self):
+		cand, valid = self.candidates()
+		legal = np.zeros((self.n, 53), dtype = bool)
+		legal[self.games[:, None], np.where(valid, cand, 52)] = True
+		return legal[:, :52]
+
+
+	# uniform random legal card per game, PASS when there is none
+	def random_policy(self, rng):
+		cand, valid = self.candidates()
+		pick = np.where(valid, rng.random(valid.shape, dtype = np.float32), np.float32(-1)).argmax(axis = 1)		# draws can be 0.0, invalid slots sit below them
+		return np.where(valid.any(axis = 1), cand[self.games, pick], PASS)
+
+
+	# apply one move per unfinished game (card ids / PASS), mirrors Room.verify_move on valid moves
+	def step(self, moves):
+		live = ~self.finished
+		placing = live & (moves != PASS)
+		g, c = self.games[placing], moves[placing]
+		self.hands[g, self.turn[g], c] = False
+		self.put_on_table(g, c)
+
+		self.update_state(live)
+		if self.record:
+			self.history.append(np.where(live, moves, -2))
+		self.steps += 1
+
+
+	# card c goes on the table of game g, along with the leftover cards it connects to
+	def put_on_table(self, g, c):
+		s, k = c // 13, c % 13
+		self.started[g[c == SEVEN_H]] = True
+		l, r = self.table[g, s, 0], self.table[g, s, 1]
+		l = np.where(l == -1, k, np.minimum(l, k))
+		r = np.maximum(r, k)
+
+		# leftover cards touching the span go on the table too
+		while True:
+			left = (l > 0) & self.leftover[g, s * 13 + np.maximum(l - 1, 0)]
+			right = (r < 12) & self.leftover[g, s * 13 + np.minimum(r + 1, 12)]
+			if not (left.any() or right.any()):
+				break
+			self.leftover[g[left], (s * 13 + l - 1)[left]] = False
+			self.leftover[g[right], (s * 13 + r + 1)[right]] = False
+			l = l - left
+			r = r + right
+		self.table[g, s, 0], self.table[g, s, 1] = l, r
+
+
+	# rank, active players, turn for the live games (Room.update_state)
+	def update_state(self, live):
+		g = self.games[live]
+		out = self.active[g, self.turn[g]] & ~self.hands[g, self.turn[g]].any(axis = 1)
+		go, seat = g[out], self.turn[g[out]]
+		self.position[go, seat] = self.num_out[go]
+		self.num_out[go] += 1
+		self.active[go, seat] = False
+		self.finished[g] = ~self.active[g].any(axis = 1)
+
+		# next active seat after the current one (just the next seat once everyone is out)
+		p = self.num_players
+		seats = (self.turn[g, None] + np.arange(1, p + 1)) % p
+		nxt = self.active[g[:, None], seats].argmax(axis = 1)
+		self.turn[g] = np.where(self.finished[g], (self.turn[g] + 1) % p, seats[np.arange(len(g)), nxt])
+
+
+	# play every game to the end, policy(batch, legal) -> moves (defaults to random)
+	def run(self, policy = None, seed = None):
+		rng = np.random.default_rng(seed)
+		while not self.finished.all():
+			moves = policy(self, self.legal_moves()) if policy else self.random_policy(rng)
+			self.step(moves)
+		return self.position
+
+
+	# seat ids in finishing order per game (Room.leaderboard)
+	def leaderboard(self):
+		return np.argsort(self.position, axis = 1)
+
+
+# replays the recorded batch moves through Room.verify_move, every move must be accepted and ranks match
+def check_against_room(seeds, num_players, seed = 0):
+	batch = BatchGame.from_seeds(seeds, num_players, record = True)
+	batch.run(seed = seed)
+	history = np.stack(batch.history, axis = 1)
+	for g, room_seed in enumerate(seeds):
+		room = Room(num_players, seed = int(room_seed))
+		room.initialise_board()
+		for move in history[g]:
+			if move == -2:
+				break
+			assert room.verify_move(room.turn, "PASS" if move == PASS else room.ref_cards[move]), f"seed {room_seed}: move rejected"
+		assert room.finished and room.leaderboard() == list(batch.leaderboard()[g]), f"seed {room_seed}: ranks differ"
+	return len(seeds)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "lockstep NumPy Badam Satti simulator")
+	parser.add_argument("--games", type = int, default = 100000)
+	parser.add_argument("--players", type = int, default = 4)
+	parser.add_argument("--batch", type = int, default = 20000, help = "games per lockstep batch")
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--check", type = int, default = 0, help = "replay this many games through Room first")
+	args = parser.parse_args()
+
+	if args.check:
+		print(f"{check_against_room(range(args.seed, args.seed + args.check), args.players, args.seed)} games match Room")
+
+	deal_time = sim_time = 0
+	wins = np.zeros(args.players, dtype = int)
+	for start in range(0, args.games, args.batch):
+		t0 = time.perf_counter()
+		batch = BatchGame.from_seeds(range(args.seed + start, args.seed + min(start + args.batch, args.games)), args.players)
+		t1 = time.perf_counter()
+		position = batch.run(seed = args.seed + start)
+		sim_time += time.perf_counter() - t1
+		deal_time += t1 - t0
+		wins += np.bincount(np.where(position == 0)[1], minlength = args.players)
+
+	print(f"{args.games} games: deal {deal_time:.1f}s, simulate {sim_time:.1f}s ({args.games / sim_time:,.0f} games/s)")
+	print("wins per seat:", wins.tolist())
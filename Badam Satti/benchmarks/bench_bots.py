@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from room import Room
+from bot import Bot, ISMCTSBot
+
+
+# one ISMCTS seat (rotating) against random bots, returns (average finishing position, win rate, rollouts/s)
+def evaluate(games, players, iterations, time_budget, workers):
+	positions = []
+	searcher = ISMCTSBot(0, delay = None, seed = 0, iterations = iterations, time_budget = time_budget, workers = workers)
+	for g in range(games):
+		room = Room(players, seed = g)
+		room.initialise_board()
+		seat = g % players
+		bots = [searcher if i == seat else Bot(i, delay = None, seed = g * players + i) for i in range(players)]
+		while not room.finished:
+			turn = room.turn
+			available_moves = room.possible_moves(turn)
+			room.verify_move(turn, bots[turn].move(room.serialize(turn), available_moves) or "PASS")
+		positions.append(room.leaderboard().index(seat) + 1)
+	return sum(positions) / games, positions.count(1) / games, searcher.rollouts_per_sec()
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "ISMCTS bot strength vs random bots, rollouts/sec")
+	parser.add_argument("--games", type = int, default = 100)
+	parser.add_argument("--players", type = int, default = 4)
+	parser.add_argument("--iterations", type = int, nargs = "+", default = [50, 200, 800])
+	parser.add_argument("--time-budget", type = float, default = None, help = "seconds per move instead of iterations")
+	parser.add_argument("--workers", type = int, default = 1)
+	args = parser.parse_args()
+
+	print(f"random baseline: average position {(args.players + 1) / 2:.2f}, win rate {1 / args.players:.1%}")
+	for iterations in args.iterations:
+		start = time.perf_counter()
+		position, win_rate, rate = evaluate(args.games, args.players, iterations, args.time_budget, args.workers)
+		print(f"ismcts {iterations:>5} it: average position {position:.2f}, win rate {win_rate:.1%}, {rate:,.0f} rollouts/s ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+	main()
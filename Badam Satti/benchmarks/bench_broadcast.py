@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.protocols import Protocols
+from codec import CODECS
+from gamehive.transport import Transport
+from loadgen import TableView
+from server import Server
+from async_server import AsyncServer
+from gamehive.metrics import NullMetrics
+
+
+# how Server.run broadcast before: every room, every 50 ms tick, whether it changed or not
+class PollingServer(Server):
+	def run(self):
+		self.spawn(self.connection_listener)
+		self.scheduler.start()
+		while not self.kill:
+			for room_id, room, clients in self.rooms.active_rooms():
+				for i, client in enumerate(clients):
+					if client is None:
+						continue
+					try:
+						data = self.rooms.state_update(client, room, i)
+						if data is not None:
+							self.queue(Protocols.Response.GAME_STATE, data, client)
+						if room.finished:
+							self.queue(Protocols.Response.RESULTS, room.leaderboard(), client)
+						self.transports[client].flush()
+					except (OSError, KeyError):
+						pass
+				if room.finished:
+					self.rooms.close_room(room_id)
+			time.sleep(self.tick)
+
+
+# same tick on the event loop
+class PollingAsyncServer(AsyncServer):
+	async def serve(self):
+		self.changed = asyncio.Event()		# set by mark_dirty, nobody waits on it here
+		self.server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address = True)
+		self.scheduler.start()
+		async with self.server:
+			while True:
+				for room_id, room, clients in self.rooms.active_rooms():
+					if await self.broadcast(room_id, room, clients):
+						self.rooms.close_room(room_id)
+				await asyncio.sleep(self.tick)
+
+
+# one seat of a table, blocking socket + what it knows of the table
+class Seat:
+	def __init__(self, port, name, codec):
+		self.sock = socket.create_connection(('127.0.0.1', port))
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+		self.transport = Transport(self.sock)
+		self.codec = CODECS["json"]
+		self.view = TableView()
+		self.read()		# NICKNAME offer
+		self.send(Protocols.Request.NICKNAME, {"nickname": name, "codec": codec})
+		self.codec = CODECS[codec]
+
+
+	def send(self, r_type, data):
+		self.transport.send(self.codec.encode(r_type, data))
+
+
+	def read(self):
+		msg = self.codec.decode(self.transport.recv_frame())
+		if msg["type"] == Protocols.Response.GAME_STATE:
+			self.view.apply(msg["data"])
+		return msg
+
+
+	# reads until this seat holds version (or the game is over)
+	def wait_for(self, version):
+		while self.view.version is None or self.view.version < version:
+			if self.read()["type"] == Protocols.Response.RESULTS:
+				return False
+		return True
+
+
+# plays `games` 2-seat games, returns move -> every seat updated times (seconds)
+def play(port, games, codec):
+	latencies = []
+	for game in range(games):
+		seats = [Seat(port, f"bench_{game}_{i}", codec) for i in range(2)]
+		for seat in seats:
+			seat.wait_for(0)		# first snapshot
+		running = True
+		while running:
+			mover = next(seat for seat in seats if seat.view.player_id == seats[0].view.turn)		# logins race, seat order != player_id
+			moves = mover.view.legal()
+			version = mover.view.version + 1
+			start = time.perf_counter()
+			mover.send(Protocols.Request.MOVE, moves[0] if moves else "PASS")
+			for seat in seats:
+				running = seat.wait_for(version) and running
+			if running:
+				latencies.append(time.perf_counter() - start)
+		for seat in seats:
+			seat.sock.close()
+	return latencies
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "move -> every seat's GAME_STATE latency on loopback")
+	parser.add_argument("--games", type = int, default = 5)
+	parser.add_argument("--codec", choices = sorted(CODECS), default = "binary")
+	parser.add_argument("--tick", type = float, default = 0.05, help = "broadcast period of the polling (before) servers")
+	parser.add_argument("--port", type = int, default = 62801)
+	args = parser.parse_args()
+
+	runs = [
+		("threaded, 50 ms tick (before)", PollingServer),
+		("threaded, on change", Server),
+		("asyncio, 50 ms tick (before)", PollingAsyncServer),
+		("asyncio, on change", AsyncServer),
+	]
+	sys.stdout = open(os.devnull, "w")		# server logs (rooms opening / closing)
+	for i, (name, server_class) in enumerate(runs):
+		server = server_class(port = args.port + i, users = 2, metrics = NullMetrics())
+		server.tick = args.tick
+		threading.Thread(target = server.run, daemon = True).start()
+		time.sleep(0.3)
+		latencies = sorted(play(args.port + i, args.games, args.codec))
+		p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+		print(f"{name:>30}: {len(latencies):>5} moves  median {statistics.median(latencies) * 1e3:>7.3f} ms  p99 {p99 * 1e3:>7.3f} ms", file = sys.__stdout__)
+		if isinstance(server, Server):
+			server.await_kill()
+	os._exit(0)		# asyncio servers run until the process ends
+
+
+if __name__ == "__main__":
+	main()
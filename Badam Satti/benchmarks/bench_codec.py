@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.protocols import Protocols
+from room import Room
+from codec import CODECS
+
+
+# play random games, collect the messages a server would send / receive
+def sample_messages(games, num_players):
+	samples = {"snapshot": [], "delta": [], "move": [], "results": []}
+	for _ in range(games):
+		room = Room(num_players)
+		room.initialise_board()
+		since = [None] * num_players
+		while not room.finished:
+			for i in range(num_players):
+				data = room.serialize_update(i, since[i])
+				since[i] = data["version"]
+				samples["delta" if "changes" in data else "snapshot"].append((Protocols.Response.GAME_STATE, data))
+			moves = room.possible_moves(room.turn)
+			move = random.choice(moves) if moves else "PASS"
+			samples["move"].append((Protocols.Request.MOVE, move))
+			room.verify_move(room.turn, move)
+		samples["results"].append((Protocols.Response.RESULTS, room.leaderboard()))
+	return samples
+
+
+def measure(codec, messages, repeat):
+	start = time.perf_counter()
+	for _ in range(repeat):
+		encoded = [codec.encode(r_type, data) for r_type, data in messages]
+	encode_rate = len(messages) * repeat / (time.perf_counter() - start)
+
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for msg in encoded:
+			codec.decode(msg)
+	decode_rate = len(messages) * repeat / (time.perf_counter() - start)
+
+	return sum(len(msg) + 4 for msg in encoded) / len(encoded), encode_rate, decode_rate		# +4 for the length prefix
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "json vs binary wire codec")
+	parser.add_argument("--games", type = int, default = 200)
+	parser.add_argument("--players", type = int, default = 4)
+	parser.add_argument("--repeat", type = int, default = 5)
+	parser.add_argument("--seed", type = int, default = 0)
+	args = parser.parse_args()
+
+	random.seed(args.seed)
+	samples = sample_messages(args.games, args.players)
+	print(f"{'message':>9} {'codec':>7} {'bytes/msg':>10} {'encode/s':>12} {'decode/s':>12}")
+	for kind, messages in samples.items():
+		for name, codec in CODECS.items():
+			size, encode_rate, decode_rate = measure(codec, messages, args.repeat)
+			print(f"{kind:>9} {name:>7} {size:>10.1f} {encode_rate:>12,.0f} {decode_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+import hive
+from gamehive.protocols import Protocols
+from client import Client
+from game_state import GameState
+from server import Server
+from gamehive.metrics import NullMetrics
+
+
+# forwards both ways with `delay` seconds added to every chunk (half the round trip each way), order kept
+def start_proxy(port, upstream, delay):
+	async def pipe(reader, writer):
+		loop = asyncio.get_running_loop()
+		try:
+			while data := await reader.read(1 << 16):
+				loop.call_later(delay, writer.write, data)
+		finally:
+			loop.call_later(delay, writer.close)
+
+	async def handle(reader, writer):
+		up_reader, up_writer = await asyncio.open_connection('127.0.0.1', upstream)
+		await asyncio.gather(pipe(reader, up_writer), pipe(up_reader, writer), return_exceptions = True)
+
+	async def serve():
+		server = await asyncio.start_server(handle, '127.0.0.1', port, reuse_address = True)
+		async with server:
+			await server.serve_forever()
+
+	threading.Thread(target = asyncio.run, args = (serve(),), daemon = True).start()
+	time.sleep(0.2)
+
+
+# GameState the client's listener thread wakes
+class Probe(GameState):
+	def __init__(self):
+		GameState.__init__(self)
+		self.updated = threading.Condition()
+
+
+	def notify(self):
+		with self.updated:
+			self.updated.notify_all()
+
+
+	def wait(self, ready, timeout = 10):
+		with self.updated:
+			return self.updated.wait_for(ready, timeout)
+
+
+# one game against a bot through the proxy: per move of ours, click -> move on our screen, with and without predicting it
+def play(port):
+	client = Client(port = port, nickname = "bench", view = "terminal")
+	client.login()
+	client.game = game = Probe()
+	client.listener = threading.Thread(target = client.server_listener, daemon = True)
+	client.listener.start()
+	shown, confirmed = [], []
+	while game.wait(lambda: client.kill or (game.my_turn and game.pending is None)) and not client.kill:
+		version = game.version
+		legal = game.legal()
+		start = time.perf_counter()
+		if not game.predict(legal[0] if legal else "PASS"):
+			break
+		shown.append(time.perf_counter() - start)		# what the screen waits for now
+		client.send(Protocols.Request.MOVE, game.pending)
+		game.wait(lambda: client.kill or game.version != version)
+		confirmed.append(time.perf_counter() - start)		# what it waited for before (the server's GAME_STATE)
+	client.await_kill()
+	return shown, confirmed, game.rollbacks
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "perceived latency of a move (click -> on screen) with and without client-side prediction")
+	parser.add_argument("--rtt", type = float, nargs = "+", default = [0, 50, 150], help = "round trips to add (ms)")
+	parser.add_argument("--games", type = int, default = 3)
+	parser.add_argument("--port", type = int, default = 62921)
+	args = parser.parse_args()
+
+	sys.stdout = open(os.devnull, "w")		# server + client logs
+	server = Server(port = args.port, users = 1, bots = 1, metrics = NullMetrics())
+	server.rooms.bot_class = lambda i: bot.Bot(i, delay = (0.001, 0.002))
+	threading.Thread(target = server.run, daemon = True).start()
+	time.sleep(0.3)
+	for i, rtt in enumerate(args.rtt):
+		port = args.port + 1 + i
+		start_proxy(port, args.port, rtt / 2000)
+		shown, confirmed, rollbacks = [], [], 0
+		for _ in range(args.games):
+			s, c, r = play(port)
+			shown, confirmed, rollbacks = shown + s, confirmed + c, rollbacks + r
+		print(f"rtt {rtt:>5.0f} ms: {len(shown):>4} moves  server state (before) median {statistics.median(confirmed) * 1e3:>8.3f} ms  "
+				f"predicted median {statistics.median(shown) * 1e3:>7.3f} ms  {rollbacks} rollbacks", file = sys.__stdout__)
+	server.await_kill()
+	os._exit(0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")		# headless, no window needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from game import Game
+from assets import ASSET_DIR, SpriteCache
+
+
+# how Game.draw_card worked before the sprite cache: disk read + rescale per card per frame
+def draw_card_uncached(game, card, space_center, hover = False):
+	if card is None:
+		card = "0_GREY"
+	card_img = pygame.image.load(os.path.join(ASSET_DIR, f"{card}.png")).convert_alpha()
+	target_rect = pygame.Rect(space_center[0] - (game.card_size[0] / 2) * (1 + hover * game.hover_scale), space_center[1] - (game.card_size[1] / 2) * (1 + hover * game.hover_scale), game.card_size[0] * (1 + hover * game.hover_scale), game.card_size[1] * (1 + hover * game.hover_scale))
+	game.screen.blit(pygame.transform.scale(card_img, target_rect.size), target_rect)
+
+
+# a late-game board: long spans on every suite, a full hand, a few leftovers
+def full_table(game, num_players, seed):
+	rng = random.Random(seed)
+	game.player_names = [f"Player_{i}" for i in range(num_players)]
+	game.num_cards = [rng.randint(0, 13) for _ in range(num_players)]
+	game.table = [(rng.randint(0, 5), rng.randint(7, 12)) for _ in game.card_suite]
+	game.my_cards = rng.sample(game.ref_cards, 13)
+	game.leftover_cards = rng.sample(game.ref_cards, 52 % num_players)
+	game.turn = 0
+	game.mouse_pos = (0, 0)
+
+
+# average ms per draw_board call (full repaint, what every frame cost before dirty regions)
+def frame_time(game, frames):
+	game.draw_board(False)		# warm up (fills the sprite cache)
+	start = time.perf_counter()
+	for _ in range(frames):
+		game.draw_board(False)
+	return (time.perf_counter() - start) / frames * 1000
+
+
+# average ms per Game.draw call, mouse moves between the given positions each frame (None = idle)
+def draw_time(game, frames, positions = None):
+	game.draw()
+	start = time.perf_counter()
+	for i in range(frames):
+		if positions:
+			game.mouse_pos = positions[i % len(positions)]
+		game.draw()
+	return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "Game.draw_board frame time, per-frame image loads vs sprite cache")
+	parser.add_argument("--frames", type = int, default = 200)
+	parser.add_argument("--players", type = int, default = 3)
+	parser.add_argument("--size", type = int, nargs = 2, default = [700, 600])
+	args = parser.parse_args()
+
+	game = Game(*args.size)
+	full_table(game, args.players, 0)
+	cached = game.draw_card
+
+	game.draw_card = lambda card, space_center, hover = False: draw_card_uncached(game, card, space_center, hover)
+	before = frame_time(game, args.frames)
+	game.draw_card = cached
+	after = frame_time(game, args.frames)
+	game.sprites = SpriteCache(hover_scale = game.hover_scale, atlas = True)
+	game.sprites.load()
+	atlas = frame_time(game, args.frames)
+
+	idle = draw_time(game, args.frames)
+	hover = draw_time(game, args.frames, [game.hand_center(0), game.hand_center(1)])		# hovered card changes every frame
+
+	print(f"{'uncached (before)':>24}: {before:7.2f} ms/frame")
+	print(f"{'sprite cache':>24}: {after:7.2f} ms/frame ({before / after:.0f}x)")
+	print(f"{'sprite cache, atlas':>24}: {atlas:7.2f} ms/frame")
+	print(f"{'dirty regions, idle':>24}: {idle:7.3f} ms/frame")
+	print(f"{'dirty regions, hover':>24}: {hover:7.3f} ms/frame")
+	pygame.quit()
+
+
+if __name__ == "__main__":
+	main()
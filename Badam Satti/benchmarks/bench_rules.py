@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from room import Room
+from rules import card_ids
+
+
+# the list-of-strings rules engine Room used before the bitboards (kept only as the "before" number)
+class ListRoom:
+	def __init__(self, num_players):
+		self.num_players = num_players
+		self.game_start = False
+		self.finished = False
+		self.card_num = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+		self.card_suite = ['H', 'S', 'D', 'C']
+		self.ref_cards = sum([[str(i) + s for i in self.card_num] for s in self.card_suite], [])
+		self.shuffled_cards = self.ref_cards.copy()
+		self.player_cards = []
+		self.leftover_cards = []
+		self.table = []
+		self.turn = random.choice(range(self.num_players))
+		self.rank = []
+		self.active_players = list(range(self.num_players))
+
+	def sort_cards(self, cards):
+		return sorted(cards, key=lambda x: self.card_suite.index(x[-1])*100+self.card_num.index(x[:-1]))
+
+	def initialise_board(self):
+		random.shuffle(self.shuffled_cards)
+		cards_per_player = len(self.ref_cards) // self.num_players
+		self.player_cards = [self.sort_cards(self.shuffled_cards[i * cards_per_player : i * cards_per_player + cards_per_player]) for i in range(self.num_players)]
+		self.table = [(-1, -1) for _ in self.card_suite]
+		for i, cards in enumerate(self.player_cards):
+			if '7H' in cards:
+				self.turn = i
+
+	def possible_moves(self, player_id):
+		if not self.game_start:
+			return ['7H']
+		moves = []
+		for si, (l, r) in enumerate(self.table):
+			if l == -1:
+				moves.append(self.ref_cards[si * 13 + 6])
+				continue
+			if l != 0:
+				moves.append(self.ref_cards[si * 13 + l - 1])
+			if r != 12:
+				moves.append(self.ref_cards[si * 13 + r + 1])
+		return [c for c in moves if c in self.player_cards[player_id]]
+
+	def place_card(self, move):
+		if move == "7H":
+			self.game_start = True
+		ci = self.ref_cards.index(move)
+		n, s = ci % 13, ci // 13
+		l, r = self.table[s] if self.table[s][0] != -1 else (n, n)
+		l = n if n == l - 1 else l
+		r = n if n == r + 1 else r
+		while l > 0 and (self.ref_cards[s * 13 + l - 1] in self.leftover_cards):
+			self.leftover_cards.remove(self.ref_cards[s * 13 + l - 1])
+			l -= 1
+		while r < 12 and (self.ref_cards[s * 13 + r + 1] in self.leftover_cards):
+			self.leftover_cards.remove(self.ref_cards[s * 13 + r + 1])
+			r += 1
+		self.table[s] = (l, r)
+		self.player_cards[self.turn].remove(move)
+
+	def update_state(self):
+		if self.turn in self.active_players:
+			if self.player_cards[self.turn] == []:
+				self.rank.append(self.turn)
+				self.active_players.remove(self.turn)
+		if self.active_players == []:
+			self.finished = True
+		self.turn = (self.turn + 1) % self.num_players
+		while (self.active_players != []) and (self.turn not in self.active_players):
+			self.turn = (self.turn + 1) % self.num_players
+
+	def verify_move(self, player_id, move):
+		move = move.upper()
+		valid = False
+		if player_id == self.turn:
+			allowed_moves = self.possible_moves(player_id)
+			valid = (move == "PASS") if allowed_moves == [] else (move in allowed_moves)
+		if valid:
+			if move != "PASS":
+				self.place_card(move)
+			self.update_state()
+		return valid
+
+
+# random games through the string API (possible_moves + verify_move), returns moves played
+def play_strings(room_class, games, num_players):
+	moves = 0
+	for _ in range(games):
+		room = room_class(num_players)
+		room.initialise_board()
+		while not room.finished:
+			allowed = room.possible_moves(room.turn)
+			room.verify_move(room.turn, random.choice(allowed) if allowed else "PASS")
+			moves += 1
+	return moves
+
+
+# random games through the bitboard fast path (legal_moves mask + play), returns moves played
+def play_bits(games, num_players):
+	moves = 0
+	for _ in range(games):
+		room = Room(num_players)
+		room.initialise_board()
+		while not room.finished:
+			allowed = room.legal_moves(room.turn)
+			room.play(random.choice(list(card_ids(allowed))) if allowed else None)
+			moves += 1
+	return moves
+
+
+def timed(fn, *args):
+	start = time.perf_counter()
+	result = fn(*args)
+	return result, time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "rules engine moves/sec, list-based vs bitboard Room")
+	parser.add_argument("--games", type = int, default = 2000)
+	parser.add_argument("--players", type = int, default = 4)
+	parser.add_argument("--seed", type = int, default = 0)
+	args = parser.parse_args()
+
+	runs = [
+		("list Room (before)", play_strings, ListRoom),
+		("bitboard Room, string API", play_strings, Room),
+		("bitboard Room, play()", play_bits),
+	]
+	for name, fn, *room_class in runs:
+		random.seed(args.seed)
+		moves, elapsed = timed(fn, *room_class, args.games, args.players)
+		print(f"{name:>26}: {moves / elapsed:>12,.0f} moves/s")
+
+	room = Room(args.players)
+	room.initialise_board()
+	clones, elapsed = timed(lambda n: [room.clone() for _ in range(n)], 100000)
+	print(f"{'Room.clone':>26}: {len(clones) / elapsed:>12,.0f} clones/s")
+
+
+if __name__ == "__main__":
+	main()
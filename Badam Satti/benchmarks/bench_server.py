@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import json
+import struct
+import socket
+import asyncio
+import argparse
+import resource
+import statistics
+import subprocess
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+import hive
+from gamehive.protocols import Protocols
+
+
+SERVERS = {
+	"threaded": "from server import Server; Server(port = {port}, users = 2).run()",
+	"asyncio": "from async_server import AsyncServer; AsyncServer(port = {port}, users = 2).run()",
+}
+
+
+# start a server in its own process (own GIL)
+def start_server(kind, port):
+	return subprocess.Popen([sys.executable, "-c", SERVERS[kind].format(port = port)], cwd = GAME_DIR, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+
+# first connection doubles as the readiness probe (a throwaway probe would take a seat on the threaded server)
+def connect(port, timeout = 10):
+	deadline = time.time() + timeout
+	while True:
+		try:
+			return socket.create_connection(("127.0.0.1", port))
+		except OSError:
+			if time.time() > deadline:
+				raise
+			time.sleep(0.05)
+
+
+def frame(r_type, data):
+	msg = json.dumps({"type": r_type, "data": data}).encode("utf-8")
+	return struct.pack("!I", len(msg)) + msg
+
+
+def read_frame(sock):
+	buf = b""
+	while len(buf) < 4:
+		buf += sock.recv(4 - len(buf))
+	(length,) = struct.unpack("!I", buf)
+	buf = b""
+	while len(buf) < length:
+		buf += sock.recv(length - len(buf))
+	return json.loads(buf)
+
+
+# open n connections at once, count how many get the NICKNAME prompt within timeout
+async def hold_connections(port, n, timeout):
+	first = connect(port)
+
+	async def one():
+		try:
+			reader, writer = await asyncio.open_connection("127.0.0.1", port)
+		except OSError:
+			return None, False
+		try:
+			await asyncio.wait_for(reader.readexactly(4), timeout)
+			return writer, True
+		except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError):
+			return writer, False
+
+	results = await asyncio.gather(*[one() for _ in range(n - 1)])
+	first.settimeout(timeout)
+	try:
+		results.append((first, len(first.recv(4)) > 0))
+	except OSError:
+		results.append((first, False))
+	held = sum(ok for _, ok in results)
+	for writer, _ in results:
+		if writer:
+			writer.close()
+	return held
+
+
+# two players join, the player without the turn sends PASS repeatedly (always MOVE_INVALID)
+def move_rtt(port, moves):
+	socks = []
+	for name in ("bench_0", "bench_1"):
+		s = connect(port)
+		s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+		read_frame(s)		# NICKNAME
+		s.sendall(frame(Protocols.Request.NICKNAME, name))
+		socks.append(s)
+
+	# find the player who is waiting for its turn
+	idle = None
+	while idle is None:
+		for s in socks:
+			msg = read_frame(s)
+			if msg["type"] == Protocols.Response.GAME_STATE and not msg["data"]["my_turn"]:
+				idle = s
+				break
+
+	samples = []
+	for _ in range(moves):
+		start = time.perf_counter()
+		idle.sendall(frame(Protocols.Request.MOVE, "PASS"))
+		while read_frame(idle)["type"] not in (Protocols.Response.MOVE_VALID, Protocols.Response.MOVE_INVALID):
+			pass
+		samples.append(time.perf_counter() - start)
+	for s in socks:
+		s.close()
+	return samples
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "threaded Server vs AsyncServer")
+	parser.add_argument("--connections", type = int, default = 2000)
+	parser.add_argument("--moves", type = int, default = 500)
+	parser.add_argument("--timeout", type = float, default = 5.0)
+	parser.add_argument("--port", type = int, default = 62900)
+	args = parser.parse_args()
+
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.connections * 2 + 256)), hard))
+
+	for i, kind in enumerate(SERVERS):
+		port = args.port + 2 * i
+		proc = start_server(kind, port)
+		try:
+			held = asyncio.run(hold_connections(port, args.connections, args.timeout))
+		finally:
+			proc.kill()
+			proc.wait()
+
+		proc = start_server(kind, port + 1)
+		try:
+			samples = sorted(move_rtt(port + 1, args.moves))
+		finally:
+			proc.kill()
+			proc.wait()
+
+		p50 = statistics.median(samples) * 1e3
+		p99 = samples[int(len(samples) * 0.99) - 1] * 1e3
+		print(f"{kind:>9}: held {held}/{args.connections} connections | move RTT p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+from loadgen import SERVERS, run_stage
+
+
+# moves/s the swarm gets through one server (started in a subprocess, killed after)
+def measure(command, port, tables, seed):
+	server = subprocess.Popen([sys.executable, "-c", command], cwd = GAME_DIR, stdout = subprocess.DEVNULL)
+	time.sleep(1.5)
+	try:
+		stats, _, elapsed = asyncio.run(run_stage('127.0.0.1', port, tables, 2, "binary", "random", 0.0, None, seed))
+	finally:
+		server.kill()		# workers see the handoff socket close and exit too
+		server.wait()
+	return len(stats.rtt) / elapsed, stats.games, stats.errors
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "moves/s of the single process server vs the sharded one, by worker count")
+	parser.add_argument("--tables", type = int, default = 300, help = "concurrent 2-player tables")
+	parser.add_argument("--workers", type = int, nargs = "+", default = [1, 2, 4])
+	parser.add_argument("--port", type = int, default = 62901)
+	args = parser.parse_args()
+
+	print(f"{os.cpu_count()} cores, {args.tables} tables (the swarm shares the cores, run it from another box for clean numbers)")
+	runs = [("asyncio", SERVERS["asyncio"].format(port = args.port, users = 2), args.port)]
+	runs += [(f"sharded, {n} workers", SERVERS["sharded"].format(port = args.port + n, users = 2, workers = n), args.port + n) for n in args.workers]
+	for i, (name, command, port) in enumerate(runs):
+		rate, games, errors = measure(command, port, args.tables, i)
+		print(f"{name:>20}: {rate:>9,.0f} moves/s  {games} games  {errors} errors")
+
+
+if __name__ == "__main__":
+	main()
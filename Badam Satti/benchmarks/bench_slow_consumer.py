@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.protocols import Protocols
+from codec import CODECS
+from gamehive.transport import Transport
+from server import Server
+from async_server import AsyncServer
+from gamehive.metrics import Metrics
+from bench_broadcast import play
+
+
+# how clients were written to before: sendall on the broadcasting thread
+class BlockingTransport(Transport):
+	def pending(self):
+		return 0
+
+
+	def close(self):
+		pass
+
+
+# threaded server as before: blocking flush per client in the broadcast loop, every GAME_STATE sent
+class BlockingServer(Server):
+	def handle_client(self, client):
+		self.transports[client] = BlockingTransport(client)		# before the NICKNAME offer goes out
+		Server.handle_client(self, client)
+
+
+	def queue_state(self, data, client, room, player_id, frames, key):
+		if key is None:
+			self.queue(Protocols.Response.GAME_STATE, data, client)
+		else:
+			self.queue_shared(Protocols.Response.GAME_STATE, data, client, frames, key)
+
+
+# asyncio server as before: the broadcaster awaits every client's drain (default 64 KiB high-water mark)
+class DrainingAsyncServer(AsyncServer):
+	def attach(self, client, task = None):
+		AsyncServer.attach(self, client, task)
+		client.transport.set_write_buffer_limits()
+
+
+	def behind(self, room_id, client):
+		return False
+
+
+	async def broadcast(self, room_id, room, clients):
+		results = await AsyncServer.broadcast(self, room_id, room, clients)
+		for client in [client for client in clients if client is not None] + list(self.rooms.watchers.get(room_id, ())):
+			try:
+				await client.drain()
+			except OSError:
+				pass
+		return results
+
+
+# server_class with every accepted socket's send buffer capped at size (loopback autotunes it to MBs, a slow reader would never back up)
+def constrained(server_class, size):
+	if issubclass(server_class, AsyncServer):
+		class Constrained(server_class):
+			def attach(self, client, task = None):
+				server_class.attach(self, client, task)
+				client.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size)
+	else:
+		class Constrained(server_class):
+			def handle_client(self, client):
+				client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size)
+				server_class.handle_client(self, client)
+	return Constrained
+
+
+# a spectator of the next room behind a tiny receive buffer, reading `rate` bytes/s (0: never) until the server hangs up
+def slow_spectator(port, codec, rate):
+	sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)		# before connect, the window is agreed then
+	sock.connect(('127.0.0.1', port))
+	transport = Transport(sock)
+	transport.recv_frame()		# NICKNAME offer
+	transport.send(CODECS["json"].encode(Protocols.Request.SPECTATE, {"room": None, "codec": codec}))
+	transport.recv_frame()		# WAIT
+
+	def read():
+		while rate:
+			time.sleep(0.05)
+			try:
+				data = sock.recv(max(1, int(rate * 0.05)))
+			except OSError:
+				return
+			if not data:
+				return
+
+	threading.Thread(target = read, daemon = True).start()
+	return sock
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "move -> update latency of healthy 2-seat tables, each watched by throttled spectators")
+	parser.add_argument("--games", type = int, default = 5)
+	parser.add_argument("--spectators", type = int, default = 1, help = "slow spectators per table")
+	parser.add_argument("--rate", type = int, default = 2048, help = "bytes/s a slow spectator reads (0: never reads, the before servers then stall for good)")
+	parser.add_argument("--limit", type = int, default = 1 << 20, help = "send_limit of the servers (bytes behind before a client is evicted)")
+	parser.add_argument("--lag", type = float, default = 2.0, help = "send_lag of the servers (seconds before a stuck client is evicted)")
+	parser.add_argument("--servers", nargs = "+", default = None, help = "run only these (substrings of the names below)")
+	parser.add_argument("--sndbuf", type = int, default = 4096, help = "server send buffer per socket (bytes)")
+	parser.add_argument("--codec", choices = sorted(CODECS), default = "json")
+	parser.add_argument("--port", type = int, default = 62871)
+	args = parser.parse_args()
+
+	runs = [
+		("threaded, blocking (before)", BlockingServer),
+		("threaded, queued", Server),
+		("asyncio, drained (before)", DrainingAsyncServer),
+		("asyncio, queued", AsyncServer),
+	]
+	runs = [(name, server_class) for name, server_class in runs if not args.servers or any(s in name for s in args.servers)]
+	sys.stdout = open(os.devnull, "w")		# server logs (rooms opening / closing)
+	port = args.port
+	for name, server_class in runs:
+		for slow in (False, True):
+			metrics = Metrics()
+			server = constrained(server_class, args.sndbuf)(port = port, users = 2, metrics = metrics)
+			server.send_limit, server.send_lag = args.limit, args.lag
+			threading.Thread(target = server.run, daemon = True).start()
+			time.sleep(0.3)
+			latencies, spectators = [], []
+			start = time.perf_counter()
+			for game in range(args.games):
+				if slow:
+					spectators += [slow_spectator(port, args.codec, args.rate) for _ in range(args.spectators)]
+				latencies += play(port, 1, args.codec)
+			elapsed = time.perf_counter() - start
+			latencies.sort()
+			p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+			evicted = metrics.snapshot()["counters"].get("gamehive_evicted_clients_total", 0)
+			print(f"{name:>28}, {'slow spectators' if slow else 'no spectators':>15}: {len(latencies):>4} moves in {elapsed:>6.2f}s  "
+					f"median {statistics.median(latencies) * 1e3:>8.3f} ms  p99 {p99 * 1e3:>8.3f} ms  max {latencies[-1] * 1e3:>8.3f} ms  "
+					f"{evicted} evicted", file = sys.__stdout__)
+			for sock in spectators:
+				sock.close()
+			if isinstance(server, Server):
+				server.await_kill()
+			port += 1
+	os._exit(0)		# asyncio servers run until the process ends
+
+
+if __name__ == "__main__":
+	main()
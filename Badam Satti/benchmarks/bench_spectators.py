@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import selectors
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.protocols import Protocols
+from codec import CODECS
+from gamehive.transport import Transport
+from server import Server
+from gamehive.metrics import Metrics
+from bench_broadcast import play
+
+
+# how messages were queued before: encoded again for every client
+class PerClientServer(Server):
+	def queue_shared(self, r_type, data, client, frames, key):
+		self.queue(r_type, data, client)
+
+
+# n spectator sockets logged in before the table fills (they watch the next room), read and dropped on one thread
+def spectators(port, n, codec):
+	sel = selectors.DefaultSelector()
+	for i in range(n):
+		sock = socket.create_connection(('127.0.0.1', port))
+		transport = Transport(sock)
+		transport.recv_frame()		# NICKNAME offer
+		transport.send(CODECS["json"].encode(Protocols.Request.SPECTATE, {"room": None, "codec": codec}))
+		transport.recv_frame()		# WAIT
+		sock.setblocking(False)
+		sel.register(sock, selectors.EVENT_READ)
+	received = [0]
+
+	def drain():
+		while sel.get_map():
+			for key, _ in sel.select():
+				try:
+					data = key.fileobj.recv(1 << 16)
+				except BlockingIOError:
+					continue
+				except OSError:
+					data = b""
+				if not data:
+					sel.unregister(key.fileobj)
+					key.fileobj.close()
+				received[0] += len(data)
+
+	thread = threading.Thread(target = drain, daemon = True)
+	thread.start()
+	return thread, received
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "broadcast cost of one 2-seat game watched by many spectators")
+	parser.add_argument("--spectators", type = int, nargs = "+", default = [10, 100, 1000])
+	parser.add_argument("--codec", choices = sorted(CODECS), default = "binary")
+	parser.add_argument("--port", type = int, default = 62851)
+	args = parser.parse_args()
+
+	runs = [("encoded per client (before)", PerClientServer), ("encoded once", Server)]
+	sys.stdout = open(os.devnull, "w")		# server logs (rooms opening / closing)
+	port = args.port
+	for n in args.spectators:
+		for name, server_class in runs:
+			metrics = Metrics()
+			server = server_class(port = port, users = 2, metrics = metrics)
+			threading.Thread(target = server.run, daemon = True).start()
+			time.sleep(0.3)
+			thread, received = spectators(port, n, args.codec)
+			moves = len(play(port, 1, args.codec))
+			time.sleep(0.2)		# last broadcast (RESULTS) reaches the spectators
+			broadcast = metrics.snapshot()["histograms"]["gamehive_broadcast_seconds"]
+			print(f"{n:>5} spectators, {name:>27}: {moves} moves  {broadcast['sum'] / broadcast['count'] * 1e3:>8.3f} ms per broadcast  "
+					f"{received[0] / 1e6:>7.2f} MB to spectators", file = sys.__stdout__)
+			server.await_kill()		# shuts the spectator sockets, the drain thread ends
+			thread.join(30)
+			port += 1
+	os._exit(0)
+
+
+if __name__ == "__main__":
+	main()
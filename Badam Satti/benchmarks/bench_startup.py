@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+import hive
+from gamehive.protocols import Protocols
+from codec import JSON, CODECS
+from gamehive.transport import Transport
+
+# client processes timed from launch to their NICKNAME reply, against a fake server on this socket
+CLIENTS = {
+	# Client used to import game (pygame) at module load and build the window before answering the handshake
+	"before (pygame first)": "from client import Client; import game; c = Client(port = {port}, nickname = 'bench'); c.game = game.Game(); c.login()",
+	"pygame view": "from client import Client; Client(port = {port}, nickname = 'bench', view = 'pygame').run()",
+	"terminal view": "from client import Client; Client(port = {port}, nickname = 'bench', view = 'terminal').run()",
+}
+
+# in-process cost of each view, import + construction
+VIEWS = {
+	"game.Game": "import game; game.Game()",
+	"terminal.TerminalView": "import terminal; terminal.TerminalView()",
+}
+
+
+# launch -> nickname received, in ms
+def handshake(listener, command, env):
+	start = time.perf_counter()
+	process = subprocess.Popen([sys.executable, "-c", command], cwd = GAME_DIR, env = env, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+	try:
+		sock, _ = listener.accept()
+		transport = Transport(sock)
+		transport.send(JSON.encode(Protocols.Response.NICKNAME, list(CODECS)))
+		transport.recv_frame()
+		elapsed = time.perf_counter() - start
+		sock.close()
+	finally:
+		process.kill()
+		process.wait()
+	return elapsed * 1e3
+
+
+def view_cost(command, env):
+	timer = f"import time; start = time.perf_counter(); {command}; print((time.perf_counter() - start) * 1e3)"
+	return float(subprocess.check_output([sys.executable, "-c", timer], cwd = GAME_DIR, env = env))
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "client cold start: process launch -> NICKNAME reply")
+	parser.add_argument("--runs", type = int, default = 10)
+	args = parser.parse_args()
+
+	env = dict(os.environ, SDL_VIDEODRIVER = os.environ.get("SDL_VIDEODRIVER", "dummy"), PYGAME_HIDE_SUPPORT_PROMPT = "1")
+	listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+	listener.bind(('127.0.0.1', 0))
+	listener.listen()
+	port = listener.getsockname()[1]
+
+	for name, command in CLIENTS.items():
+		times = [handshake(listener, command.format(port = port), env) for _ in range(args.runs)]
+		print(f"{name:>22}: median {statistics.median(times):>7.1f} ms  min {min(times):>7.1f} ms  (launch -> nickname)")
+	for name, command in VIEWS.items():
+		times = [view_cost(command, env) for _ in range(args.runs)]
+		print(f"{name:>22}: median {statistics.median(times):>7.1f} ms  min {min(times):>7.1f} ms  (import + init)")
+	listener.close()
+
+
+if __name__ == "__main__":
+	main()
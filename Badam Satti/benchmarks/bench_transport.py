@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import socket
+import struct
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.transport import Transport
+
+
+# how Server / Client framed messages before the transport: one sendall per frame, bytes concatenation on receive
+class LegacyFraming:
+	def __init__(self, sock):
+		self.sock = sock
+
+
+	def receive_all(self, length):
+		msg = b""
+		while len(msg) < length:
+			more_msg = self.sock.recv(length - len(msg))
+			if not more_msg:
+				return None
+			msg += more_msg
+		return msg
+
+
+	def recv_frame(self):
+		raw_len = self.receive_all(4)
+		if not raw_len:
+			return None
+		(length,) = struct.unpack("!I", raw_len)
+		return self.receive_all(length)
+
+
+	def send_frames(self, frames):
+		for msg in frames:
+			self.sock.sendall(struct.pack("!I", len(msg)) + msg)
+
+
+# Transport with `batch` frames gathered per flush
+class BatchedTransport(Transport):
+	def __init__(self, sock, batch):
+		super().__init__(sock)
+		self.batch = batch
+
+
+	def send_frames(self, frames):
+		if self.batch == 1:
+			for msg in frames:
+				self.send(msg)
+			return
+		for i, msg in enumerate(frames):
+			self.queue(msg)
+			if (i + 1) % self.batch == 0:
+				self.flush()
+		self.flush()
+
+
+# pushes `count` frames of `size` bytes over a loopback socket pair, returns (frames/s, MB/s)
+def loopback(make, count, size):
+	a, b = socket.socketpair()
+	sender, receiver = make(a), make(b)
+	frames = [bytes(size)] * count
+	thread = threading.Thread(target = sender.send_frames, args = (frames,))
+
+	start = time.perf_counter()
+	thread.start()
+	for _ in range(count):
+		receiver.recv_frame()
+	elapsed = time.perf_counter() - start
+	thread.join()
+	a.close()
+	b.close()
+	return count / elapsed, count * (size + 4) / elapsed / 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "framing throughput over a loopback socket pair")
+	parser.add_argument("--frames", type = int, default = 200000)
+	parser.add_argument("--sizes", type = int, nargs = "+", default = [16, 64, 512, 4096], help = "payload bytes (binary deltas are ~16-64)")
+	parser.add_argument("--batch", type = int, default = 16, help = "frames gathered per flush")
+	args = parser.parse_args()
+
+	runs = [
+		("legacy (before)", LegacyFraming),
+		("transport", lambda sock: BatchedTransport(sock, 1)),
+		(f"transport, {args.batch}/flush", lambda sock: BatchedTransport(sock, args.batch)),
+	]
+	for size in args.sizes:
+		for name, make in runs:
+			rate, throughput = loopback(make, args.frames, size)
+			print(f"{size:>5} B {name:>20}: {rate:>12,.0f} frames/s {throughput:>9,.1f} MB/s")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import cProfile
+import platform
+import argparse
+import threading
+import statistics
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hive
+from gamehive.protocols import Protocols
+from room import Room
+from codec import CODECS
+from gamehive.transport import Transport
+
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")		# one json file per machine
+PROFILE_DIR = os.path.join(BENCH_DIR, "profiles")
+
+
+# every benchmark below is a setup function returning run(), run() does the work once and returns how many operations it did
+
+
+# a dealt room after `moves` random (seeded) moves through verify_move, with the moves played
+def midgame(num_players = 4, seed = 0, moves = 20):
+	rng = random.Random(seed)
+	room = Room(num_players, seed = seed)
+	room.initialise_board()
+	played = []
+	while not room.finished and len(played) < moves:
+		allowed = room.possible_moves(room.turn)
+		move = rng.choice(allowed) if allowed else "PASS"
+		room.verify_move(room.turn, move)
+		played.append(move)
+	return room, played
+
+
+def bench_initialise_board():
+	room = Room(4, seed = 0)
+
+	def run():
+		room.initialise_board()
+		return 1
+	return run
+
+
+def bench_sort_cards():
+	room = Room(4, seed = 0)
+	cards = random.Random(0).sample(room.ref_cards, 13)
+
+	def run():
+		room.sort_cards(cards)
+		return 1
+	return run
+
+
+def bench_possible_moves():
+	room, _ = midgame()
+
+	def run():
+		for player_id in range(room.num_players):
+			room.possible_moves(player_id)
+		return room.num_players
+	return run
+
+
+# a whole seeded game replayed through place_card (+ update_state, which moves the turn on) on a copy of the dealt room
+def bench_place_card():
+	start = Room(4, seed = 0)
+	start.initialise_board()
+	_, moves = midgame(moves = 10 ** 6)
+	cards = [move for move in moves if move != "PASS"]
+
+	def run():
+		room = start.clone()
+		for move in moves:
+			if move != "PASS":
+				room.place_card(move)
+			room.update_state()
+		return len(cards)
+	return run
+
+
+# the same game through verify_move, change tracking on (what the server does per MOVE)
+def bench_verify_move():
+	start = Room(4, seed = 0)
+	start.initialise_board()
+	_, moves = midgame(moves = 10 ** 6)
+
+	def run():
+		room = start.clone()
+		room.track_changes = True
+		for move in moves:
+			room.verify_move(room.turn, move)
+		return len(moves)
+	return run
+
+
+def bench_serialize():
+	room, _ = midgame()
+
+	def run():
+		for player_id in range(room.num_players):
+			room.serialize(player_id)
+		return room.num_players
+	return run
+
+
+# GAME_STATE messages the server sends most: a player's snapshot and a 4-move delta
+def sample_messages():
+	room, _ = midgame()
+	return [(Protocols.Response.GAME_STATE, room.serialize(0)), (Protocols.Response.GAME_STATE, room.serialize_update(0, room.version - 4))]
+
+
+def bench_encode(codec):
+	def setup():
+		messages = sample_messages()
+
+		def run():
+			for r_type, data in messages:
+				codec.encode(r_type, data)
+			return len(messages)
+		return run
+	return setup
+
+
+def bench_decode(codec):
+	def setup():
+		encoded = [codec.encode(r_type, data) for r_type, data in sample_messages()]
+
+		def run():
+			for msg in encoded:
+				codec.decode(msg)
+			return len(encoded)
+		return run
+	return setup
+
+
+# encode -> frame -> one write -> recv_frame -> decode over a socket pair, 64 messages per round (a busy broadcast)
+def bench_framing():
+	codec = CODECS["binary"]
+	messages = sample_messages() * 32
+	a, b = socket.socketpair()
+	sender, receiver = Transport(a), Transport(b)
+
+	def run():
+		for r_type, data in messages:
+			sender.queue(codec.encode(r_type, data))
+		sender.flush()
+		for _ in messages:
+			codec.decode(receiver.recv_frame())
+		return len(messages)
+	return run
+
+
+# full repaint of a late-game board offscreen (SDL dummy driver), None if pygame isn't installed
+def bench_draw_board():
+	os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+	os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+	try:
+		from game import Game
+		from bench_render import full_table
+	except ImportError:
+		return None
+	game = Game()
+	full_table(game, 3, 0)
+	game.draw_board(False)		# fills the sprite cache
+
+	def run():
+		game.draw_board(False)
+		return 1
+	return run
+
+
+BENCHMARKS = {
+	"room.initialise_board": bench_initialise_board,
+	"room.sort_cards": bench_sort_cards,
+	"room.possible_moves": bench_possible_moves,
+	"room.place_card": bench_place_card,
+	"room.verify_move": bench_verify_move,
+	"room.serialize": bench_serialize,
+	"codec.json.encode": bench_encode(CODECS["json"]),
+	"codec.json.decode": bench_decode(CODECS["json"]),
+	"codec.binary.encode": bench_encode(CODECS["binary"]),
+	"codec.binary.decode": bench_decode(CODECS["binary"]),
+	"transport.framing": bench_framing,
+	"game.draw_board": bench_draw_board,
+}
+
+
+# seconds per operation: calibrated so one sample takes at least min_time, best and median of `repeat` samples
+def measure(run, repeat, min_time):
+	loops = 1
+	while True:
+		start = time.perf_counter()
+		ops = sum(run() for _ in range(loops))
+		elapsed = time.perf_counter() - start
+		if elapsed >= min_time / 10:		# long enough to time reliably, scale up to min_time
+			loops = max(loops, int(loops * min_time / elapsed))
+			break
+		loops *= 10
+	samples = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		ops = sum(run() for _ in range(loops))
+		samples.append((time.perf_counter() - start) / ops)
+	return {"best": min(samples), "median": statistics.median(samples), "ops": ops}
+
+
+# baselines are only comparable on the same box and interpreter
+def machine_id():
+	name = f"{platform.node()}-{platform.system()}-{platform.machine()}-py{platform.python_version()}"
+	return "".join(c if c.isalnum() or c in "-._" else "_" for c in name)
+
+
+def baseline_path(directory):
+	return os.path.join(directory, f"{machine_id()}.json")
+
+
+def load_baseline(path):
+	if not os.path.exists(path):
+		return {}
+	with open(path) as f:
+		return json.load(f)["benchmarks"]
+
+
+def save_baseline(path, results):
+	os.makedirs(os.path.dirname(path), exist_ok = True)
+	benchmarks = load_baseline(path)
+	benchmarks.update(results)		# benchmarks not run this time keep their old numbers
+	data = {
+			"machine": machine_id(),
+			"processor": platform.processor(),
+			"cpus": os.cpu_count(),
+			"python": sys.version,
+			"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"benchmarks": dict(sorted(benchmarks.items())),
+			}
+	with open(path, "w") as f:
+		json.dump(data, f, indent = 2)
+
+
+# "a;b;c" call stack of run() -> samples, taken every `interval` seconds while run() loops on this thread for `seconds`
+def sample_stacks(run, seconds, interval = 0.001):
+	stacks = Counter()
+	main = threading.get_ident()
+	here = sys._getframe().f_code		# stacks stop below this frame (the suite's own callers)
+	done = threading.Event()
+
+	def sampler():
+		while not done.wait(interval):
+			frame = sys._current_frames().get(main)
+			stack = []
+			while frame is not None and frame.f_code is not here:
+				code = frame.f_code
+				stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+				frame = frame.f_back
+			stacks[";".join(reversed(stack))] += 1
+
+	switch = sys.getswitchinterval()
+	sys.setswitchinterval(interval / 10)		# the sampler gets the GIL on time, not only when run() blocks
+	thread = threading.Thread(target = sampler, daemon = True)
+	thread.start()
+	end = time.perf_counter() + seconds
+	while time.perf_counter() < end:
+		run()
+	done.set()
+	thread.join()
+	sys.setswitchinterval(switch)
+	return stacks
+
+
+# <name>.prof (cProfile: snakeviz, flameprof, gprof2dot) and <name>.folded (collapsed stacks: flamegraph.pl, speedscope, inferno)
+def profile(name, run, seconds, directory):
+	os.makedirs(directory, exist_ok = True)
+	profiler = cProfile.Profile()
+	end = time.perf_counter() + seconds
+	profiler.enable()
+	while time.perf_counter() < end:
+		run()
+	profiler.disable()
+	prof = os.path.join(directory, f"{name}.prof")
+	profiler.dump_stats(prof)
+
+	folded = os.path.join(directory, f"{name}.folded")
+	with open(folded, "w") as f:
+		for stack, samples in sample_stacks(run, seconds).most_common():
+			f.write(f"{stack} {samples}\n")
+	return prof, folded
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "core benchmark suite: compares against this machine's stored baseline, exits 1 on a regression")
+	parser.add_argument("names", nargs = "*", help = "benchmarks to run, prefixes work (default: all)")
+	parser.add_argument("--list", action = "store_true", help = "list the benchmarks and exit")
+	parser.add_argument("--save", action = "store_true", help = "store the results as this machine's baseline")
+	parser.add_argument("--threshold", type = float, default = 0.2, help = "allowed slowdown of the best time over the baseline (0.2 = 20%%)")
+	parser.add_argument("--repeat", type = int, default = 7, help = "timed samples per benchmark")
+	parser.add_argument("--min-time", type = float, default = 0.1, help = "seconds per sample")
+	parser.add_argument("--baseline-dir", default = BASELINE_DIR)
+	parser.add_argument("--profile", metavar = "NAME", help = "profile one benchmark instead of timing it")
+	parser.add_argument("--profile-seconds", type = float, default = 3.0)
+	parser.add_argument("--profile-dir", default = PROFILE_DIR)
+	args = parser.parse_args()
+
+	if args.list:
+		print("\n".join(BENCHMARKS))
+		return 0
+	if args.profile:
+		run = BENCHMARKS[args.profile]()
+		if run is None:
+			print(f"{args.profile}: dependencies missing")
+			return 1
+		for path in profile(args.profile, run, args.profile_seconds, args.profile_dir):
+			print("wrote", path)
+		return 0
+
+	names = [name for name in BENCHMARKS if not args.names or any(name.startswith(prefix) for prefix in args.names)]
+	path = baseline_path(args.baseline_dir)
+	baseline = load_baseline(path)
+	print(f"baseline: {path if baseline else '(none, run with --save to store one)'}")
+	print(f"{'benchmark':>24} {'best':>12} {'median':>12} {'baseline':>12} {'change':>8}")
+	results, regressions = {}, []
+	for name in names:
+		run = BENCHMARKS[name]()
+		if run is None:
+			print(f"{name:>24} {'skipped (dependencies missing)':>38}")
+			continue
+		results[name] = measure(run, args.repeat, args.min_time)
+		best, median = results[name]["best"], results[name]["median"]
+		line = f"{name:>24} {best * 1e6:>9.3f} us {median * 1e6:>9.3f} us"
+		if name in baseline:
+			change = best / baseline[name]["best"] - 1
+			line += f" {baseline[name]['best'] * 1e6:>9.3f} us {change:>+8.1%}"
+			if change > args.threshold:
+				regressions.append(name)
+				line += "  REGRESSION"
+		print(line)
+
+	if args.save:
+		save_baseline(path, results)
+		print("saved", path)
+	if regressions:
+		print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {' '.join(regressions)}")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,33 +1,223 @@
-import struct
-import json
+import math
 import random
 import time
+import multiprocessing
 
 from utils import *
+from rules import *
+from room import Room
+from solver import EndgameSolver
 
 
 # --- basic bot ---
 class Bot:
-	def __init__(self, bot_id, game_type = "card_game"):
+	offload = False		# True if move() is expensive enough to run off the server's scheduler
+
+	def __init__(self, bot_id, game_type = "card_game", delay = (0.5, 1.5), seed = None):
 		self.bot_id = bot_id
 		self.name = f"Bot_{bot_id}"
 		self.game_type = game_type
+		self.delay = delay		# (min, max) thinking time in seconds, None for headless play
+		self.rng = random.Random(seed)
 
 
-	# returns a move from available_moves based on the game_state
-	def move(self, game_state, available_moves):
-		time.sleep(random.uniform(0.5, 1.5))
+	# seconds to "think" before moving
+	def think_time(self):
+		if not self.delay:
+			return 0
+		return self.rng.uniform(*self.delay)
+
 
+	# returns a move from available_moves based on the game_state (no waiting, the server schedules think_time)
+	def move(self, game_state, available_moves):
 		if not available_moves:
 			return None
 
-		return random.choice(available_moves)
+		return self.rng.choice(available_moves)
 
 
 	def eval_game_state(self, game_state):
 		pass
 
 
+# --- search bot ---
+class SearchNode:
+	__slots__ = ("move", "player", "parent", "children", "visits", "avail", "reward")
+
+	def __init__(self, move = None, player = None, parent = None):
+		self.move = move		# card id played to reach this node (None = PASS)
+		self.player = player		# who played it
+		self.parent = parent
+		self.children = {}
+		self.visits = 0
+		self.avail = 0		# times the move was legal in a determinization
+		self.reward = 0.0
+
+
+	# upper confidence bound, exploration uses availability instead of parent visits (ISMCTS)
+	def ucb(self, c):
+		return self.reward / self.visits + c * math.sqrt(math.log(self.avail) / self.visits)
+
+
+# information-set MCTS, samples hidden hands consistent with what the seat can see (Room.serialize)
+class ISMCTSBot(Bot):
+	offload = True
+
+	def __init__(self, bot_id, game_type = "card_game", delay = (0.5, 1.5), seed = None, iterations = 400, time_budget = None, workers = 1, exploration = 0.7, endgame = 0, endgame_samples = 8):
+		super().__init__(bot_id, game_type, delay, seed)
+		self.iterations = iterations		# rollouts per move
+		self.time_budget = time_budget		# seconds per move (overrides iterations)
+		self.workers = workers		# > 1 splits the budget over a process pool (root parallel)
+		self.exploration = exploration
+		self.pool = None
+		self.endgame = endgame		# solve exactly once this many cards (or fewer) are left in the hands, 0 = off
+		self.endgame_samples = endgame_samples		# deals solved when more than one hidden hand is left
+		self.solver = EndgameSolver() if endgame else None		# transposition table kept across moves
+
+		# stats to size the CPU budget
+		self.rollouts = 0
+		self.search_time = 0.0
+
+
+	def rollouts_per_sec(self):
+		return self.rollouts / self.search_time if self.search_time else 0.0
+
+
+	# shut down the search pool (if any)
+	def close(self):
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool = None
+
+
+	def move(self, game_state, available_moves):
+		if len(available_moves) <= 1:		# forced move, nothing to search
+			return available_moves[0] if available_moves else None
+		if self.solver and sum(game_state["num_cards"]) <= self.endgame:
+			return self.endgame_move(game_state)
+
+		start = time.perf_counter()
+		if self.workers > 1:
+			if self.pool is None:
+				self.pool = multiprocessing.Pool(self.workers)
+			jobs = [(game_state, self.iterations // self.workers, self.time_budget, self.exploration, self.rng.random()) for _ in range(self.workers)]
+			visits = {}
+			for counts, rollouts in self.pool.map(search_worker, jobs):
+				self.rollouts += rollouts
+				for ci, n in counts.items():
+					visits[ci] = visits.get(ci, 0) + n
+		else:
+			visits, rollouts = search(game_state, self.iterations, self.time_budget, self.exploration, self.rng)
+			self.rollouts += rollouts
+		self.search_time += time.perf_counter() - start
+
+		best = max(visits, key = visits.get)
+		return "PASS" if best is None else CARDS[best]
+
+
+	# solver's best move over deals of the unseen cards (exact when at most one opponent still holds cards)
+	def endgame_move(self, game_state):
+		observed, unseen = observed_room(game_state)
+		hidden = sum(1 for i, n in enumerate(game_state["num_cards"]) if n and i != game_state["player_id"])
+		votes = {}
+		for _ in range(1 if hidden <= 1 else self.endgame_samples):
+			_, best = self.solver.solve(determinize(observed, unseen, game_state["num_cards"], self.rng))
+			votes[best] = votes.get(best, 0) + 1
+		best = max(votes, key = votes.get)
+		return "PASS" if best is None else CARDS[best]
+
+
+# ISMCTS until the endgame, exact solver after that
+class EndgameBot(ISMCTSBot):
+	def __init__(self, bot_id, game_type = "card_game", delay = (0.5, 1.5), seed = None, endgame = 16, **options):
+		super().__init__(bot_id, game_type, delay, seed, endgame = endgame, **options)
+
+
+# room holding everything the seat can see, hidden hands still empty (returns room, unseen card ids)
+def observed_room(game_state):
+	num_cards = game_state["num_cards"]
+	table = from_spans(game_state["table"])
+	leftover = to_mask(game_state["leftover_cards"])
+	mine = to_mask(game_state["my_cards"])
+
+	room = Room(len(num_cards))
+	room.hands = [mine if i == game_state["player_id"] else 0 for i in range(len(num_cards))]
+	room.leftover = leftover
+	room.table_mask = table
+	room.game_start = bool(table & SEVEN_H)
+	room.turn = game_state["turn"]
+	room.active_players = [i for i, n in enumerate(num_cards) if n]
+	room.rank = [i for i, n in enumerate(num_cards) if not n]		# finishing order of those already out does not matter to us
+	return room, list(card_ids(FULL_DECK & ~(table | leftover | mine)))
+
+
+# copy of the observed room with the unseen cards dealt at random, consistent with num_cards
+def determinize(observed, unseen, num_cards, rng):
+	room = observed.clone()
+	rng.shuffle(unseen)
+	dealt = 0
+	for i, n in enumerate(num_cards):
+		if room.hands[i] or not n:		# my own hand / already out
+			continue
+		for ci in unseen[dealt : dealt + n]:
+			room.hands[i] |= 1 << ci
+		dealt += n
+	return room
+
+
+# legal moves of the player on turn as card ids, [None] for a forced PASS
+def actions(room):
+	legal = room.legal_moves(room.turn)
+	return list(card_ids(legal)) if legal else [None]
+
+
+# runs ISMCTS from the seat's view, returns ({card id: root visits}, rollouts)
+def search(game_state, iterations, time_budget, exploration, rng):
+	root = SearchNode()
+	observed, unseen = observed_room(game_state)
+	deadline = time.perf_counter() + time_budget if time_budget else None
+	rollouts = 0
+	while (rollouts < iterations) if deadline is None else (time.perf_counter() < deadline):
+		room = determinize(observed, unseen, game_state["num_cards"], rng)
+		node = root
+
+		# selection / expansion, restricted to moves legal in this determinization
+		while not room.finished:
+			legal = actions(room)
+			untried = [m for m in legal if m not in node.children]
+			for m in legal:
+				if m in node.children:
+					node.children[m].avail += 1
+			if untried:
+				m = rng.choice(untried)
+				node.children[m] = node = SearchNode(m, room.turn, node)
+				node.avail = 1
+				room.play(m)
+				break
+			node = max((node.children[m] for m in legal), key = lambda child: child.ucb(exploration))
+			room.play(node.move)
+
+		# random playout
+		while not room.finished:
+			room.play(rng.choice(actions(room)))
+		rollouts += 1
+
+		# backpropagate, every node scores from the view of the player who moved into it
+		last = room.num_players - 1
+		score = {player: 1 - position / last for position, player in enumerate(room.rank)}
+		while node is not root:
+			node.visits += 1
+			node.reward += score[node.player]
+			node = node.parent
+	return {m: child.visits for m, child in root.children.items()}, rollouts
+
+
+# pool entry point for the root parallel search
+def search_worker(job):
+	game_state, iterations, time_budget, exploration, seed = job
+	return search(game_state, iterations, time_budget, exploration, random.Random(seed))
+
+
 # # --- specialised bot classes ---
 # class SmartBot(Bot):
 # 	def move(self, game_state, available_moves):
@@ -1,135 +1,36 @@
-import socket
-import threading
-import json
-import struct
-import time
+import argparse
 
-from protocols import Protocols
-from game import Game
+import hive
+from gamehive.client import Client as CoreClient
+from codec import CODECS
+from utils import GAME_NAME
 
+VIEWS = {		# --view name -> (module, class), imported only when picked (pygame is slow to load)
+	"pygame": ("game", "Game"),
+	"terminal": ("terminal", "TerminalView"),
+}
 
-class Client:
-	def __init__(self, host = '127.0.0.1', port = 62743, nickname = None):
-		self.host = host
-		self.port = port 
-		self.nickname = nickname
 
-		self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
-		self.server.connect((self.host, self.port))
-		print(f"Connected to server")
-
-		self.game = Game()
-		self.started = False
-
-		self.kill = False
-		self.thread_count = 0
-
-
-	# sends request r_type to server along with data
-	def send(self, r_type, data):
-		msg = {"type": r_type, "data": data}
-		msg = json.dumps(msg).encode("utf-8")
-		self.server.sendall(struct.pack("!I", len(msg)) + msg)		# pack length in first 4 bytes
-
-
-	def receive_all(self, length):
-		msg = b""
-		while len(msg) < length:
-			more_msg = self.server.recv(length - len(msg))
-			if not more_msg:
-				return None
-			msg += more_msg
-		return msg
-
-
-	# receive client requests
-	def receive(self):
-		raw_len = self.receive_all(4)		# unpack length from first 4 bytes
-		if not raw_len:
-			return None
-
-		(length,) = struct.unpack("!I", raw_len)
-		msg = self.receive_all(length)
-		if not msg:
-			return None
-
-		# decode json safely
-		try:
-			return json.loads(msg.decode("utf-8"))
-		except json.JSONDecodeError as e:
-			print("JSON decode error:", e)
-			print("Raw bytes:", msg)
-			return None
-
-
-	# handle server responses
-	def handle_receive(self, msg):
-		if not msg:
-			return
-		r_type, data = msg.get("type"), msg.get("data")
-
-		if r_type == Protocols.Response.GAME_STATE:
-			self.game.deserialize(data)
-		elif r_type == Protocols.Response.MOVE_VALID:		# highlight with green
-			pass
-		elif r_type == Protocols.Response.MOVE_INVALID:		# highlight with red
-			pass
-		elif r_type == Protocols.Response.NICKNAME:
-			self.send(Protocols.Request.NICKNAME, self.nickname)
-		elif r_type == Protocols.Response.START:
-			self.started = True
-			self.game.setup_game(data)
-		elif r_type == Protocols.Response.RESULTS:
-			self.game.update_results(data)
-			self.kill = True
-		# elif r_type == Protocols.Response.WAIT:		# means not started (covered under START)
-		# 	pass
-
-
-	# actively listening to server for responses (on thread)
-	def server_listener(self):
-		self.thread_count += 1
-
-		self.server.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
-		self.server.settimeout(1)
-		while not self.kill:
-			try:
-				msg = self.receive()
-				self.handle_receive(msg)
-			except socket.timeout:
-				pass
-			time.sleep(0.001)
-
-		self.thread_count -= 1
-
-
-	# awaiting all threads to kill themselves (only 1 thread here)
-	def await_kill(self):
-		self.kill = True
-		while self.thread_count:
-			time.sleep(0.01)
-		print("Client killed")
-
-
-	# main loop which updates game state
-	def run(self):
-		threading.Thread(target = self.server_listener).start()
-		try:
-			while not self.kill:
-				self.kill = self.game.handle_events()		# to capture inputs (returns kill switch)
-				move = self.game.draw(self.started)		# to render screen (returns move made by the player)
-				if move:
-					self.send(Protocols.Request.MOVE, move)
-			self.game.handle_end()		# when game over
-		except KeyboardInterrupt:
-			
-			pass
-		self.await_kill()
+# gamehive client speaking Badam Satti (binary codec, pygame / terminal views)
+class Client(CoreClient):
+	game_name = GAME_NAME
+	codecs = CODECS
+	views = VIEWS
 
 
 if __name__ == "__main__":
-	nickname = input("Enter nickname : ")
+	parser = argparse.ArgumentParser(description = "Badam Satti client")
+	parser.add_argument("--host", default = "100.83.58.23")
+	parser.add_argument("--port", type = int, default = 62743)
+	parser.add_argument("--nickname", default = None)
+	parser.add_argument("--view", choices = sorted(VIEWS), default = "pygame", help = "terminal needs no pygame / display")
+	parser.add_argument("--policy", choices = ["first", "random"], default = None, help = "terminal view plays by itself")
+	parser.add_argument("--spectate", action = "store_true", help = "watch a room instead of playing")
+	parser.add_argument("--room", type = int, default = None, help = "room to watch (default: the newest one)")
+	args = parser.parse_args()
+
+	nickname = args.nickname or ("spectator" if args.spectate else input("Enter nickname : "))
 	while nickname == "":
 		nickname = input("Enter VALID nickname : ")
-	Client(host = "100.83.58.23", nickname = nickname).run()
\ No newline at end of file
+	options = {"policy": args.policy} if args.view == "terminal" else {}
+	Client(host = args.host, port = args.port, nickname = nickname, view = args.view, view_options = options, spectate = args.spectate, room = args.room).run()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import json
+import struct
+
+import hive
+from gamehive.protocols import Protocols
+from gamehive.codec import JSON
+from utils import *
+
+
+# one byte id per message type, frozen: ids already on the wire never change, new types are only appended
+MESSAGE_IDS = {
+		Protocols.Response.NICKNAME: 0,
+		Protocols.Response.WAIT: 1,
+		Protocols.Response.START: 2,
+		Protocols.Response.GAME_STATE: 3,
+		Protocols.Response.MOVE_VALID: 4,
+		Protocols.Response.MOVE_INVALID: 5,
+		Protocols.Response.RESULTS: 6,
+		Protocols.Request.NICKNAME: 7,
+		Protocols.Request.MOVE: 8,
+		Protocols.Request.NEW_GAME: 9,
+		Protocols.Request.LEAVE: 10,
+		Protocols.Request.RESYNC: 11,
+		Protocols.Request.SPECTATE: 12,
+		Protocols.Response.ERROR: 13,
+		}
+MESSAGE_TYPES = {i: r_type for r_type, i in MESSAGE_IDS.items()}
+
+NO_CARD = 0xFF		# PASS / no card placed / nobody went out / no seat (spectator snapshot)
+RAW_MOVE = 0xFE		# move that is not a card (sent as utf-8 text, server rejects it)
+SNAPSHOT, DELTA = 0, 1		# GAME_STATE flavours
+
+SNAPSHOT_HEAD = struct.Struct("!BIBBB8b")		# flavour, version, player_id, turn, my_turn, table spans
+DELTA_HEAD = struct.Struct("!BIIH")		# flavour, base, version, number of changes
+CHANGE = struct.Struct("!BBbbBB")		# player, card, span (l, r), turn, out
+
+
+class BinaryCodec:
+	name = "binary"
+
+	# {r_type, data} -> bytes, [type id][payload]
+	def encode(self, r_type, data):
+		type_id = bytes((MESSAGE_IDS[r_type],))
+		if r_type == Protocols.Response.RESULTS:		# [] has an empty body too, decodes back to []
+			return type_id + bytes(data or ())
+		if data is None:
+			return type_id
+		if r_type == Protocols.Response.GAME_STATE:
+			return type_id + (self.encode_delta(data) if "changes" in data else self.encode_snapshot(data))
+		if r_type == Protocols.Request.MOVE:
+			return type_id + self.encode_move(data)
+		return type_id + json.dumps(data).encode("utf-8")		# rare messages (START, NICKNAME) stay json
+
+
+	# bytes -> {r_type, data}
+	def decode(self, msg):
+		r_type = MESSAGE_TYPES.get(msg[0])
+		if r_type is None:
+			raise ValueError(f"unknown message id {msg[0]}")
+		payload = memoryview(msg)[1:]
+		if r_type == Protocols.Response.RESULTS:
+			data = list(payload)
+		elif not payload:		# sent without a body (data None)
+			data = None
+		elif r_type == Protocols.Response.GAME_STATE:
+			data = self.decode_delta(payload) if payload[0] == DELTA else self.decode_snapshot(payload)
+		elif r_type == Protocols.Request.MOVE:
+			data = self.decode_move(payload)
+		else:
+			data = json.loads(bytes(payload).decode("utf-8"))
+		return {"type": r_type, "data": data}
+
+
+	# card list -> [count][card ids]
+	def encode_cards(self, cards):
+		return bytes((len(cards),)) + bytes(CARD_IDS[c] for c in cards)
+
+
+	# returns (card list, bytes consumed)
+	def decode_cards(self, payload, offset):
+		count = payload[offset]
+		return [CARDS[i] for i in payload[offset + 1 : offset + 1 + count]], count + 1
+
+
+	def encode_snapshot(self, data):
+		spans = sum((list(span) for span in data["table"]), []) or [-1] * 8		# table is empty before initialise_board
+		player_id = NO_CARD if data["player_id"] is None else data["player_id"]
+		head = SNAPSHOT_HEAD.pack(SNAPSHOT, data["version"], player_id, data["turn"], data["my_turn"], *spans)
+		return head + bytes((len(data["num_cards"]),)) + bytes(data["num_cards"]) + self.encode_cards(data["my_cards"]) + self.encode_cards(data["leftover_cards"])
+
+
+	def decode_snapshot(self, payload):
+		_, version, player_id, turn, my_turn, *spans = SNAPSHOT_HEAD.unpack_from(payload)
+		offset = SNAPSHOT_HEAD.size
+		num_players = payload[offset]
+		num_cards = list(payload[offset + 1 : offset + 1 + num_players])
+		offset += num_players + 1
+		my_cards, size = self.decode_cards(payload, offset)
+		leftover_cards, _ = self.decode_cards(payload, offset + size)
+		data = {
+				"version": version,
+				"player_id": None if player_id == NO_CARD else player_id,
+				"turn": turn,
+				"my_turn": my_turn,
+				"table": [spans[i : i + 2] for i in range(0, 8, 2)],
+				"num_cards": num_cards,
+				"my_cards": my_cards,
+				"leftover_cards": leftover_cards,
+				}
+		return data
+
+
+	def encode_delta(self, data):
+		msg = [DELTA_HEAD.pack(DELTA, data["base"], data["version"], len(data["changes"]))]
+		for change in data["changes"]:
+			card, span, out = change["card"], change["span"] or (-1, -1), change["out"]
+			msg.append(CHANGE.pack(change["player"], NO_CARD if card is None else CARD_IDS[card], span[0], span[1], change["turn"], NO_CARD if out is None else out))
+		return b"".join(msg)
+
+
+	def decode_delta(self, payload):
+		_, base, version, count = DELTA_HEAD.unpack_from(payload)
+		changes = []
+		for player, card, l, r, turn, out in CHANGE.iter_unpack(payload[DELTA_HEAD.size : DELTA_HEAD.size + count * CHANGE.size]):
+			changes.append({
+					"player": player,
+					"card": None if card == NO_CARD else CARDS[card],
+					"span": None if card == NO_CARD else [l, r],
+					"turn": turn,
+					"out": None if out == NO_CARD else out,
+					})
+		return {"base": base, "version": version, "changes": changes}
+
+
+	def encode_move(self, move):
+		move = move.upper()
+		if move == "PASS":
+			return bytes((NO_CARD,))
+		if move in CARD_IDS:
+			return bytes((CARD_IDS[move],))
+		return bytes((RAW_MOVE,)) + move.encode("utf-8")
+
+
+	def decode_move(self, payload):
+		if payload[0] == NO_CARD:
+			return "PASS"
+		if payload[0] == RAW_MOVE:
+			return bytes(payload[1:]).decode("utf-8")
+		return CARDS[payload[0]]
+
+
+CODECS = {codec.name: codec for codec in (JSON, BinaryCodec())}		# offered by the server at the NICKNAME handshake
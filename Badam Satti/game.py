@@ -1,79 +1,74 @@
-import sys
 import pygame
 
 from utils import *
+from assets import SpriteCache
+from game_state import GameState
 
+NETWORK_UPDATE = pygame.USEREVENT + 1		# posted by the client's listener thread when the state changes
+TABLE_COLOR = (97, 200, 86)		# green table cloth
+HAND_COLOR = (216, 153, 70)		# player selection area
 
-class Game:
+
+# pygame view of the game state (window, sprites, mouse input)
+class Game(GameState):
 	def __init__(self, width = 700, height = 600):
 		self.width = width
 		self.height = height
-		self.player_names = []
+		GameState.__init__(self)
 
-		# setup reference cards
-		self.card_num = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-		self.card_suite = ['H', 'S', 'D', 'C']
-		self.ref_cards = sum([[str(i) + s for i in self.card_num] for s in self.card_suite], [])
-		
 		pygame.init()
-		self.screen = pygame.display.set_mode((self.width, self.height))
-		self.clock = pygame.time.Clock()
-		self.font = pygame.font.Font(size = self.width // 20)
-
-		# board dimensions
-		self.step_size = min(self.width, self.height)/27		# standard distance used to design the board
-		self.card_size = (self.step_size * 3, self.step_size * 4)		# dimensions of card on the table
-		self.row_step = (self.step_size * 1.5, self.step_size * 5)		# step size of rows in (x, y) direction
-		self.row_centers = [(self.step_size * 2.5, self.step_size * 3 + self.row_step[1] * i) for i in range(4)]		# starting position of suite rows
-		self.table_height = self.row_centers[-1][1] + self.step_size * 3
+		self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
 		self.hover_scale = 0.1  		# scaling factor when hover over it 
 		self.color_scale = 0.95			# lighten color by this scale
-
-		# game state
-		self.turn = 0 			# who's turn is it?
-		self.my_turn = 0 		# is it my turn?
-		self.table = []			# config of the table
-		self.num_cards = []			# number of cards each player has
-		self.my_cards = []			# user selects a card from here
-		self.leftover_cards = []		# cards left to be dealt
+		self.sprites = SpriteCache(hover_scale = self.hover_scale)		# card images, loaded once
+		self.sprites.load()
+		self.resize(self.width, self.height)
 
 		# event handling
 		self.clicked = False		# clicked on any card
-		self.finished = False		# game over (display rank)
-		self.close = False
-		self.rank = []
 		self.mouse_pos = None
 		self.move = ""
+		self.drawn = {}		# region key -> signature on screen (retained mode, see draw)
 
 
-	# setting up the game env
-	def setup_game(self, data):
-		self.player_names = data
+	# board dimensions follow the window size
+	def resize(self, width, height):
+		self.width = width
+		self.height = height
+		self.font = pygame.font.Font(size = self.width // 20)
+		self.step_size = min(self.width, self.height)/27		# standard distance used to design the board
+		self.card_size = (self.step_size * 3, self.step_size * 4)		# dimensions of card on the table
+		self.row_step = (self.step_size * 1.5, self.step_size * 5)		# step size of rows in (x, y) direction
+		self.row_centers = [(self.step_size * 2.5, self.step_size * 3 + self.row_step[1] * i) for i in range(4)]		# starting position of suite rows
+		self.table_height = self.row_centers[-1][1] + self.step_size * 3
+		self.sprites.resize((width, height))		# drop sprites scaled for the old size
+
 
+	# wake the render loop from the network thread (state changed)
+	def notify(self):
+		try:
+			pygame.event.post(pygame.event.Event(NETWORK_UPDATE))
+		except pygame.error:		# window already closed
+			pass
 
-	# unpack the game state
-	def deserialize(self, data):
-		self.turn = data.get("turn")
-		self.my_turn = data.get("my_turn")
-		self.table = data.get("table")
-		self.num_cards = data.get("num_cards")
-		self.my_cards = data.get("my_cards")
-		self.leftover_cards = data.get("leftover_cards")
-				
 
-	# keyboard or mouse events
-	def handle_events(self):
+	# keyboard or mouse events, sleeps until one arrives (or a network update, or timeout ms)
+	def handle_events(self, timeout = 1000):
 		self.clicked = False
+		events = [pygame.event.wait(timeout)] + pygame.event.get()
 		self.mouse_pos = pygame.mouse.get_pos()
 
-		for event in pygame.event.get():
+		for event in events:
 			if event.type == pygame.QUIT:
 				self.close = True
 				pygame.quit()
 				# sys.exit()
+				break
 			if event.type == pygame.MOUSEBUTTONDOWN:
 				if event.button == 1:
 					self.clicked = True
+			if event.type == pygame.VIDEORESIZE:
+				self.resize(event.w, event.h)
 
 		return self.close
 
@@ -90,33 +85,18 @@ class Game:
 
 
 	# place card at the space_center
-	def draw_card(self, card, space_center, selectable = False):
+	def draw_card(self, card, space_center, hover = False):
 		if card is None:
 			card = "0_GREY"
-		card_img = pygame.image.load(f"assets/{card}.png").convert_alpha()
-		hover = False
-		if selectable:
-			# create a bounding box for mouse hover
-			mouse_rect = pygame.Rect(space_center[0] - self.card_size[0] / 2, space_center[1] - self.card_size[1] / 2, self.card_size[0] / 2, self.card_size[1])
-			if mouse_rect.collidepoint(self.mouse_pos):
-				hover = True
-				if self.clicked:
-					# sends selected card to client for making a move
-					self.move = card
-		target_rect = pygame.Rect(space_center[0] - (self.card_size[0] / 2) * (1 + hover * self.hover_scale), space_center[1] - (self.card_size[1] / 2) * (1 + hover * self.hover_scale), self.card_size[0] * (1 + hover * self.hover_scale), self.card_size[1] * (1 + hover * self.hover_scale))
-		scaled_card_img = pygame.transform.scale(card_img, target_rect.size)
-		self.screen.blit(scaled_card_img, target_rect)
-
-
-	# button with text, color, position (x, y), dimensions (w, h), action
-	def draw_button(self, text, color, pos, dim, action):
-		button_rect = pygame.Rect(pos[0], pos[1], dim[0], dim[1])
-
-		if button_rect.collidepoint(self.mouse_pos):
+		card_img = self.sprites.get(card, self.card_size, hover)		# pre-scaled, no disk read per frame
+		self.screen.blit(card_img, card_img.get_rect(center = space_center))
+
+
+	# button with text, color, rect, darker while hovered
+	def draw_button(self, text, color, button_rect, hover):
+		if hover:
 			# darken color
 			pygame.draw.rect(self.screen, color, button_rect)
-			if self.clicked:
-				action()
 		else:
 			# lighten color
 			pygame.draw.rect(self.screen, tuple(c * self.color_scale for c in color), button_rect)
@@ -127,75 +107,147 @@ class Game:
 		self.screen.blit(text_surf, text_rect)
 
 
-	# draw the game board / table
-	def draw_board(self, end_screen):
-		# draw suite cards on the table
-		for i, (l, r) in enumerate(self.table):
-			if l == -1:
-				l, r = 1, 0
-			self.draw_card(None, (self.row_centers[i][0] + self.row_step[0] * 6, self.row_centers[i][1]))
-			for j in range(l, r + 1):
-				self.draw_card(self.ref_cards[i * 13 + j], (self.row_centers[i][0] + self.row_step[0] * j, self.row_centers[i][1]))
-
-		# draw my cards
+	# center of the i-th card in my hand
+	def hand_center(self, i):
+		return (self.row_centers[-1][0] + self.row_step[0] * i, self.row_centers[-1][1] + self.step_size * 6)
+
+
+	# index of the hand card under the mouse (left half of each card, the rest is covered), None if no card
+	def hovered_card(self):
+		if self.mouse_pos is None:
+			return None
+		for i in range(len(self.my_cards)):
+			x, y = self.hand_center(i)
+			if pygame.Rect(x - self.card_size[0] / 2, y - self.card_size[1] / 2, self.card_size[0] / 2, self.card_size[1]).collidepoint(self.mouse_pos):
+				return i
+		return None
+
+
+	def pass_rect(self):
+		return pygame.Rect(self.width - self.step_size * 4, self.row_centers[-1][1] + self.step_size * 5, self.step_size * 3, self.step_size * 2)
+
+
+	def leftover_pos(self):
+		return (self.row_centers[2][0] + self.row_step[0] * 13 + self.step_size * 3, self.row_centers[2][1])
+
+
+	# suite row i on the table
+	def draw_row(self, i):
+		l, r = self.table[i]
+		if l == -1:
+			l, r = 1, 0
+		self.draw_card(None, (self.row_centers[i][0] + self.row_step[0] * 6, self.row_centers[i][1]))
+		for j in range(l, r + 1):
+			self.draw_card(self.ref_cards[i * 13 + j], (self.row_centers[i][0] + self.row_step[0] * j, self.row_centers[i][1]))
+
+
+	def draw_hand(self, hovered):
 		for i, card in enumerate(self.my_cards):
-			space_center = (self.row_centers[-1][0] + self.row_step[0] * i, self.row_centers[-1][1] + self.step_size * 6)
-			self.draw_card(card, space_center, selectable = True)
-		
-		# draw PASS button
-		button_pos = (self.width - self.step_size * 4, self.row_centers[-1][1] + self.step_size * 5)
-		self.draw_button("PASS", pygame.Color("burlywood4"), button_pos, (self.step_size * 3, self.step_size * 2), self.selected_pass)
-
-		# draw leftover cards
-		leftover_pos = (self.row_centers[2][0] + self.row_step[0] * 13 + self.step_size * 3, self.row_centers[2][1])
-		self.draw_card(None, leftover_pos)
+			self.draw_card(card, self.hand_center(i), hover = (i == hovered))
+
+
+	def draw_leftover(self):
+		self.draw_card(None, self.leftover_pos())
 		for i, card in enumerate(self.leftover_cards):
-			space_center = (leftover_pos[0], leftover_pos[1] + self.step_size * i)
-			self.draw_card(card, space_center)
+			self.draw_card(card, (self.leftover_pos()[0], self.leftover_pos()[1] + self.step_size * i))
 
-		# display leaderboard
+
+	# display leaderboard (turn marker / cards left, ranks on the end screen)
+	def draw_leaderboard(self, end_screen):
 		text_start = (self.row_centers[0][0] + self.row_step[0] * 13 + self.step_size, self.row_centers[0][1])
 		for i, n in enumerate(self.num_cards):
 			text = f"{'>' if self.turn == i else ''} {self.player_names[i]} -> {n}"
-			if end_screen:
+			if end_screen and i in self.rank:
 				text = f"{self.player_names[i]} -> {self.rank.index(i) + 1} {'(W)' if self.rank.index(i) == 0 else ''}"
+			elif end_screen:		# abandoned room, never went out
+				text = f"{self.player_names[i]} -> -"
 			self.screen.blit(self.font.render(text, True, (0, 0, 0)), (text_start[0], text_start[1] + self.step_size * i))
 
 
-	# draw the entire screen (waiting + board)
+	# parts of the board that redraw independently: (key, rect, signature, background, paint)
+	# a region is repainted only when its signature differs from the one last drawn
+	def board_regions(self, end_screen):
+		hovered = self.hovered_card()
+		pass_hover = self.mouse_pos is not None and self.pass_rect().collidepoint(self.mouse_pos)
+		card_w, card_h = self.card_size
+		regions = []
+		for i, span in enumerate(self.table):
+			rect = pygame.Rect(0, self.row_centers[i][1] - card_h / 2, self.row_centers[i][0] + self.row_step[0] * 13, card_h)
+			regions.append((f"row_{i}", rect, tuple(span), TABLE_COLOR, lambda i = i: self.draw_row(i)))
+
+		hand_rect = pygame.Rect(0, self.table_height, self.pass_rect().left, self.height - self.table_height)
+		regions.append(("hand", hand_rect, (tuple(self.my_cards), hovered), HAND_COLOR, lambda: self.draw_hand(hovered)))
+		regions.append(("pass", self.pass_rect(), pass_hover, HAND_COLOR, lambda: self.draw_button("PASS", pygame.Color("burlywood4"), self.pass_rect(), pass_hover)))
+
+		x, y = self.leftover_pos()
+		leftover_rect = pygame.Rect(x - card_w / 2, y - card_h / 2, card_w, self.table_height - (y - card_h / 2))
+		regions.append(("leftover", leftover_rect, tuple(self.leftover_cards), TABLE_COLOR, self.draw_leftover))
+
+		text_x, text_y = self.row_centers[0][0] + self.row_step[0] * 13 + self.step_size, self.row_centers[0][1]
+		board_rect = pygame.Rect(text_x, text_y, self.width - text_x, leftover_rect.top - text_y)
+		signature = (self.turn, tuple(self.num_cards), tuple(self.player_names), end_screen, tuple(self.rank))
+		regions.append(("leaderboard", board_rect, signature, TABLE_COLOR, lambda: self.draw_leaderboard(end_screen)))
+		return regions
+
+
+	# draw the game board / table (every region, unconditionally)
+	def draw_board(self, end_screen):
+		for key, rect, signature, background, paint in self.board_regions(end_screen):
+			paint()
+
+
+	# clicks act on what is under the mouse, even if nothing needs repainting
+	def handle_clicks(self):
+		if not self.clicked:
+			return
+		hovered = self.hovered_card()
+		if hovered is not None:
+			# sends selected card to client for making a move
+			self.move = self.my_cards[hovered]
+		elif self.pass_rect().collidepoint(self.mouse_pos):
+			self.selected_pass()
+
+
+	# draw what changed since the last frame (waiting + board), only the dirty rects reach the display
 	def draw(self, started = True, end_screen = False):
-		self.move = ""
+		with self.lock:		# the client's listener thread deserializes into the same lists
+			self.move = ""
+			if self.close:
+				return self.move
+
+			dirty = []
+			layout = (started, end_screen, self.screen.get_size())
+			if self.drawn.get("layout") != layout:		# first frame, resize, lobby -> game -> results
+				self.drawn = {"layout": layout}
+				self.screen.fill(TABLE_COLOR)			# green table cloth
+				pygame.draw.rect(self.screen, HAND_COLOR, (0, self.table_height, self.width, self.height - self.table_height), 0)		# player selection area
+				dirty.append(self.screen.get_rect())
 
-		if not self.close:
-			self.screen.fill((97, 200, 86))			# green table cloth
-			pygame.draw.rect(self.screen, (216, 153, 70), (0, self.table_height, self.width, self.height - self.table_height), 0)		# player selection area
 			if not started:
-				self.draw_waiting()
+				regions = [("waiting", pygame.Rect(0, self.table_height, self.width, self.height - self.table_height), True, HAND_COLOR, self.draw_waiting)]
 			else:
-				self.draw_board(end_screen)
-			pygame.display.update()
-			self.clock.tick(10)		# arg = FPS (frames per sec)
+				self.handle_clicks()
+				regions = self.board_regions(end_screen)
 
-		return self.move
+			for key, rect, signature, background, paint in regions:
+				if key in self.drawn and self.drawn[key] == signature:
+					continue
+				self.drawn[key] = signature
+				self.screen.set_clip(rect)		# a region never paints over its neighbours
+				self.screen.fill(background, rect)
+				paint()
+				self.screen.set_clip(None)
+				dirty.append(rect)
 
+			if dirty:
+				pygame.display.update(dirty)
+			return self.move
 
-	# game ended, so display results
-	def update_results(self, data):
-		self.rank = data
-		self.finished = True
 
-
-	# after the game is over (display leaderboard)
+	# after the game is over (display leaderboard), redraws only on input
 	def handle_end(self):
-		if not self.close:
-			flag = True
-			while flag and (not self.close):
-				for event in pygame.event.get():
-					if event.type == pygame.QUIT:
-						self.close = True
-						flag = False
-
-				# display end screen + rank
-				self.draw(end_screen = True)
-
-			pygame.quit()
+		while not self.close:
+			self.draw(end_screen = True)
+			self.handle_events()
+
+		pygame.quit()
\ No newline at end of file
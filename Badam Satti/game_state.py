@@ -0,0 +1,148 @@
+import threading
+
+from utils import *
+from rules import SEVEN_H, from_spans, legal_moves, place, span, to_cards, to_mask
+
+
+# client-side game state, what the server sends (no rendering, views build on top of it)
+class GameState:
+	def __init__(self):
+		self.player_names = []
+
+		# setup reference cards
+		self.card_num = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+		self.card_suite = ['H', 'S', 'D', 'C']
+		self.ref_cards = sum([[str(i) + s for i in self.card_num] for s in self.card_suite], [])
+
+		# game state
+		self.version = None		# state version received from the server
+		self.player_id = None	# my seat in the room
+		self.turn = 0 			# who's turn is it?
+		self.my_turn = 0 		# is it my turn?
+		self.table = []			# config of the table
+		self.num_cards = []			# number of cards each player has
+		self.my_cards = []			# user selects a card from here
+		self.leftover_cards = []		# cards left to be dealt
+
+		self.finished = False		# game over (display rank)
+		self.close = False
+		self.rank = []
+
+		# optimistic moves: my move is shown before the server answers, undone if it disagrees
+		self.pending = None		# my move no GAME_STATE has confirmed yet
+		self.confirmed = None		# state before it, restored on MOVE_INVALID / a conflicting state
+		self.rollbacks = 0
+		self.lock = threading.RLock()		# the client's listener thread deserializes while the view predicts / draws
+
+
+	# setting up the game env
+	def setup_game(self, data):
+		with self.lock:
+			self.player_names = data
+
+
+	# unpack the game state on top of what the server confirmed, a pending move the server has not processed yet is
+	# predicted again (returns False if out of sync)
+	def deserialize(self, data):
+		with self.lock:
+			move, base = self.pending, self.version		# predictions leave the version alone
+			self.undo()
+			synced = self.apply_state(data)
+			if move is not None and synced and self.version == base:		# nothing moves on my turn but my move: the same state resent
+				self.predict(move)
+			return synced
+
+
+	# full snapshot or changes from the server (returns False if out of sync)
+	def apply_state(self, data):
+		if "changes" in data:
+			if data.get("base") != self.version:		# missed a change, ask for a snapshot
+				return False
+			for change in data.get("changes"):
+				self.apply_change(change)
+			self.version = data.get("version")
+			return True
+
+		self.version = data.get("version")
+		self.player_id = data.get("player_id")
+		self.turn = data.get("turn")
+		self.my_turn = data.get("my_turn")
+		self.table = data.get("table")
+		self.num_cards = data.get("num_cards")
+		self.my_cards = data.get("my_cards")
+		self.leftover_cards = data.get("leftover_cards")
+		return True
+
+
+	# apply one accepted move on top of the current state
+	def apply_change(self, change):
+		card = change.get("card")
+		if card is not None:
+			si = self.card_suite.index(card[-1])
+			l, r = self.table[si] = change.get("span")
+			self.num_cards[change.get("player")] -= 1
+			if change.get("player") == self.player_id:
+				self.my_cards.remove(card)
+			# leftover cards covered by the new span were placed along with the card
+			self.leftover_cards = [c for c in self.leftover_cards if not (c[-1] == card[-1] and l <= self.card_num.index(c[:-1]) <= r)]
+		self.turn = change.get("turn")
+		self.my_turn = 1 if (self.turn == self.player_id) else 0
+
+
+	# cards the server would accept from my hand right now (the rules Room checks moves with)
+	def legal(self):
+		table = from_spans(self.table)
+		return to_cards(legal_moves(to_mask(self.my_cards), table, bool(table & SEVEN_H)))
+
+
+	# the change Room.verify_move will record for my move (turn goes to the next seat still holding cards)
+	def predicted_change(self, move):
+		change = {"player": self.player_id, "card": None, "span": None}
+		num_cards = list(self.num_cards)
+		if move != "PASS":
+			ci = CARD_IDS[move]
+			table, _ = place(from_spans(self.table), to_mask(self.leftover_cards), ci)
+			change["card"], change["span"] = move, span(table, ci // 13)
+			num_cards[self.player_id] -= 1
+		n = len(num_cards)
+		seats = [(self.player_id + i) % n for i in range(1, n + 1)]
+		change["turn"] = next((seat for seat in seats if num_cards[seat]), seats[0])
+		return change
+
+
+	# apply my move at once if the server would accept it (False: illegal or not my turn, nothing to send)
+	def predict(self, move):
+		with self.lock:
+			if self.version is None or not self.my_turn or self.pending is not None or self.finished:
+				return False
+			legal = self.legal()
+			if move not in legal and not (move == "PASS" and not legal):
+				return False
+			self.confirmed = (self.turn, self.my_turn, list(self.table), list(self.num_cards), list(self.my_cards), list(self.leftover_cards))
+			self.pending = move
+			self.apply_change(self.predicted_change(move))
+			return True
+
+
+	# back to the confirmed state (returns True if a prediction was undone)
+	def undo(self):
+		if self.pending is None:
+			return False
+		self.turn, self.my_turn, self.table, self.num_cards, self.my_cards, self.leftover_cards = self.confirmed
+		self.pending = self.confirmed = None
+		return True
+
+
+	# the server refused my move (MOVE_INVALID)
+	def rollback(self):
+		with self.lock:
+			undone = self.undo()
+			self.rollbacks += undone
+			return undone
+
+
+	# game ended, so display results
+	def update_results(self, data):
+		with self.lock:
+			self.rank = data
+			self.finished = True
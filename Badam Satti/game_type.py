@@ -0,0 +1,11 @@
+import hive
+from gamehive.engine import GameType, register
+from utils import GAME_NAME
+from room import Room
+from bot import Bot
+from codec import CODECS
+from movelog import MoveLog
+from records import GameRecorder, RecordStore
+
+# what a gamehive server needs to host Badam Satti (gamehive.engine.load_game imports this module)
+GAME = register(GameType(GAME_NAME, Room, bot = Bot, codecs = CODECS, move_log = MoveLog, recorder = GameRecorder, store = RecordStore))
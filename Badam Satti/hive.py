@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the gamehive core package sits next to the game folders, import this before any gamehive module
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+	sys.path.append(ROOT)
@@ -0,0 +1,208 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+import resource
+import subprocess
+
+import hive
+from gamehive.protocols import Protocols
+from codec import JSON, CODECS
+from gamehive.transport import HEADER, frame
+from rules import SEVEN_H, card_ids, from_spans, legal_moves, to_mask
+from utils import CARDS, CARD_IDS
+
+SERVERS = {
+	"threaded": "from server import Server; Server(port = {port}, users = {users}).run()",
+	"asyncio": "from async_server import AsyncServer; AsyncServer(port = {port}, users = {users}).run()",
+	"sharded": "from sharded_server import ShardedServer; ShardedServer(port = {port}, users = {users}, workers = {workers}).run()",
+}
+
+
+# what one virtual player knows about its table (snapshot + deltas, like Game.deserialize without pygame)
+class TableView:
+	def __init__(self):
+		self.version = None
+		self.player_id = None
+		self.turn = None
+		self.table = [(-1, -1)] * 4
+		self.hand = 0		# card mask
+
+
+	# returns False if a delta doesn't apply on top of what we have (ask for a resync)
+	def apply(self, data):
+		if "changes" not in data:
+			self.version = data["version"]
+			self.player_id = data["player_id"]
+			self.turn = data["turn"]
+			self.table = [tuple(span) for span in data["table"]]
+			self.hand = to_mask(data["my_cards"])
+			return True
+		if data["base"] != self.version:
+			return False
+		for change in data["changes"]:
+			if change["card"] is not None:
+				ci = CARD_IDS[change["card"]]
+				self.table[ci // 13] = tuple(change["span"])
+				if change["player"] == self.player_id:
+					self.hand &= ~(1 << ci)
+			self.turn = change["turn"]
+		self.version = data["version"]
+		return True
+
+
+	def legal(self):
+		table = from_spans(self.table)
+		return [CARDS[ci] for ci in card_ids(legal_moves(self.hand, table, bool(table & SEVEN_H)))]
+
+
+# numbers of one ramp stage, shared by all its players
+class Stats:
+	def __init__(self):
+		self.connect = []		# seconds to connect + get the NICKNAME prompt
+		self.rtt = []		# MOVE -> MOVE_VALID / MOVE_INVALID
+		self.lag = []		# MOVE sent -> GAME_STATE with that move reaching each seat of the table
+		self.sent = {}		# (table, version) -> time the move producing that version was sent
+		self.games = 0
+		self.invalid = 0
+		self.errors = 0
+
+
+# one headless player: handshake, wait for a table, play random legal moves (or the first legal move) until RESULTS
+async def virtual_player(host, port, name, stats, codec = "binary", policy = "random", think = 0.0, rng = random):
+	start = time.perf_counter()
+	try:
+		reader, writer = await asyncio.open_connection(host, port)
+	except OSError:
+		stats.errors += 1
+		return
+	current = JSON
+	view = TableView()
+	table = None		# START names identify the table for the broadcast lag
+	pending = None		# (version the move was made on, time sent)
+	acted = None
+
+	async def read():
+		(length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+		return current.decode(await reader.readexactly(length))
+
+	def send(r_type, data):
+		writer.write(frame(current.encode(r_type, data)))
+
+	try:
+		while True:
+			msg = await read()
+			r_type, data = msg["type"], msg["data"]
+			now = time.perf_counter()
+			if r_type == Protocols.Response.NICKNAME:
+				stats.connect.append(now - start)
+				if data and codec in data:
+					send(Protocols.Request.NICKNAME, {"nickname": name, "codec": codec})
+					current = CODECS[codec]
+				else:
+					send(Protocols.Request.NICKNAME, name)
+			elif r_type == Protocols.Response.START:
+				table = tuple(data)
+			elif r_type == Protocols.Response.GAME_STATE:
+				if not view.apply(data):
+					send(Protocols.Request.RESYNC, None)
+					continue
+				sent = stats.sent.get((table, view.version))
+				if sent is not None:
+					stats.lag.append(now - sent)
+			elif r_type in (Protocols.Response.MOVE_VALID, Protocols.Response.MOVE_INVALID):
+				if pending is not None:
+					stats.rtt.append(now - pending[1])
+					if r_type == Protocols.Response.MOVE_INVALID:
+						stats.sent.pop((table, pending[0] + 1), None)
+						stats.invalid += 1
+						acted = None		# try again on the next state
+				pending = None
+			elif r_type == Protocols.Response.RESULTS:
+				stats.games += 1
+				break
+
+			if view.version is not None and view.turn == view.player_id and pending is None and acted != view.version:
+				if think:
+					await asyncio.sleep(rng.uniform(0, think))
+				moves = view.legal()
+				move = (rng.choice(moves) if policy == "random" else moves[0]) if moves else "PASS"
+				acted = view.version
+				pending = (view.version, time.perf_counter())
+				stats.sent[(table, view.version + 1)] = pending[1]		# the version this move will produce
+				send(Protocols.Request.MOVE, move)
+			await writer.drain()
+	except (OSError, asyncio.IncompleteReadError):
+		stats.errors += 1
+	writer.close()
+
+
+def percentile(samples, q):
+	if not samples:
+		return float("nan")
+	samples = sorted(samples)
+	return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+# `tables` tables worth of players, all at once (spawn_rate connections per second if set)
+async def run_stage(host, port, tables, players, codec, policy, think, spawn_rate, seed):
+	stats = Stats()
+	rng = random.Random(seed)
+	tasks = []
+	start = time.perf_counter()
+	for i in range(tables * players):
+		tasks.append(asyncio.create_task(virtual_player(host, port, f"load_{seed}_{i}", stats, codec, policy, think, rng)))
+		if spawn_rate:
+			await asyncio.sleep(1 / spawn_rate)
+	while len(stats.connect) + stats.errors < len(tasks) and time.perf_counter() - start < 60:		# every handshake done
+		await asyncio.sleep(0.01)
+	connect_time = time.perf_counter() - start
+	await asyncio.gather(*tasks)
+	return stats, connect_time, time.perf_counter() - start
+
+
+def report(tables, players, stats, connect_time, elapsed):
+	ms = lambda samples, q: percentile(samples, q) * 1e3
+	print(f"{tables:>6} {tables * players:>7} {len(stats.connect) / connect_time:>10,.0f} "
+			f"{ms(stats.rtt, 0.5):>8.2f} {ms(stats.rtt, 0.99):>8.2f} {ms(stats.lag, 0.5):>8.2f} {ms(stats.lag, 0.99):>8.2f} "
+			f"{len(stats.rtt) / elapsed:>8,.0f} {stats.games:>6} {stats.invalid:>7} {stats.errors:>6} {elapsed:>7.1f}s")
+
+
+async def ramp(args):
+	print(f"{'tables':>6} {'players':>7} {'connect/s':>10} {'rtt p50':>8} {'rtt p99':>8} {'lag p50':>8} {'lag p99':>8} {'moves/s':>8} {'games':>6} {'invalid':>7} {'errors':>6} {'time':>8}")
+	for stage, tables in enumerate(args.tables):
+		stats, connect_time, elapsed = await run_stage(args.host, args.port, tables, args.players, args.codec, args.policy, args.think, args.spawn_rate, args.seed + stage)
+		report(tables, args.players, stats, connect_time, elapsed)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "headless client swarm, ramps concurrent tables against a server")
+	parser.add_argument("--host", default = "127.0.0.1")
+	parser.add_argument("--port", type = int, default = 62743)
+	parser.add_argument("--server", choices = sorted(SERVERS), default = None, help = "start this server locally first")
+	parser.add_argument("--workers", type = int, default = None, help = "worker processes of --server sharded (default: one per core)")
+	parser.add_argument("--players", type = int, default = 2, help = "players per table (the server's users)")
+	parser.add_argument("--tables", type = int, nargs = "+", default = [1, 10, 100, 500], help = "concurrent tables per ramp stage")
+	parser.add_argument("--codec", choices = sorted(CODECS), default = "binary")
+	parser.add_argument("--policy", choices = ["random", "first"], default = "random", help = "random legal move or the first legal move")
+	parser.add_argument("--think", type = float, default = 0.0, help = "max seconds to wait before moving (uniform)")
+	parser.add_argument("--spawn-rate", type = float, default = None, help = "connections per second (default: all at once)")
+	parser.add_argument("--seed", type = int, default = 0)
+	args = parser.parse_args()
+
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, max(args.tables) * args.players * 2 + 256)), hard))
+
+	server = None
+	if args.server:
+		server = subprocess.Popen([sys.executable, "-c", SERVERS[args.server].format(port = args.port, users = args.players, workers = args.workers)], stdout = subprocess.DEVNULL)
+		time.sleep(1)
+	try:
+		asyncio.run(ramp(args))
+	except KeyboardInterrupt:
+		pass
+	finally:
+		if server:
+			server.kill()
+			server.wait()
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import struct
+import argparse
+import multiprocessing
+
+from room import Room
+from utils import CARD_IDS
+
+MAGIC = b"GHML"		# GameHive move log
+FORMAT = 1
+HEADER = struct.Struct("!4sBBQd")		# magic, format, num_players, seed, created (unix time)
+PASS = 0xFF		# one byte per accepted move, card id or PASS
+
+
+# append-only log of one room, the seed + every accepted move (the player is implied by the turn order)
+class MoveLog:
+	def __init__(self, path, num_players, seed):
+		self.path = path
+		self.file = open(path, "ab", buffering = 0)		# unbuffered, a crash loses at most the move in flight
+		if self.file.tell() == 0:
+			self.file.write(HEADER.pack(MAGIC, FORMAT, num_players, seed, time.time()))
+
+
+	# Room.log hook, called after every accepted verify_move
+	def append(self, move):
+		self.file.write(bytes((PASS if move == "PASS" else CARD_IDS[move],)))
+
+
+	def close(self):
+		self.file.close()
+
+
+# (num_players, seed, created, moves) of a log file, moves as bytes of card ids / PASS
+def read_log(path):
+	with open(path, "rb") as f:
+		data = f.read()
+	magic, version, num_players, seed, created = HEADER.unpack_from(data)
+	if magic != MAGIC or version != FORMAT:
+		raise ValueError(f"{path}: not a move log (format {FORMAT})")
+	return num_players, seed, created, data[HEADER.size:]
+
+
+# the room as it was after the first `index` moves (all of them if None), through verify_move like the server
+def replay(path, index = None):
+	num_players, seed, _, moves = read_log(path)
+	room = Room(num_players, seed = seed)
+	room.initialise_board()
+	for i, ci in enumerate(moves[:index]):
+		move = "PASS" if ci == PASS else room.ref_cards[ci]
+		if not room.verify_move(room.turn, move):
+			raise ValueError(f"{path}: move {i} ({move}) rejected by the current rules")
+	return room
+
+
+# fast path for batch checks: legality by mask + Room.play, returns (moves replayed, error or None)
+def check_log(path):
+	try:
+		num_players, seed, _, moves = read_log(path)
+	except (ValueError, struct.error) as e:
+		return 0, str(e)
+	room = Room(num_players, seed = seed)
+	room.initialise_board()
+	room.track_changes = False
+	for i, ci in enumerate(moves):
+		legal = room.legal_moves(room.turn)
+		if (ci == PASS and legal) or (ci != PASS and not (legal >> ci & 1)):
+			return i, f"move {i} ({'PASS' if ci == PASS else room.ref_cards[ci]}) is illegal under the current rules"
+		room.play(None if ci == PASS else ci)
+	return len(moves), None
+
+
+# replay every log in a directory on a process pool, returns ({path: error}, games, moves, seconds)
+def check_dir(directory, workers = None):
+	paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".ghml"))
+	start = time.perf_counter()
+	with multiprocessing.Pool(workers) as pool:
+		results = pool.map(check_log, paths, chunksize = 64)
+	errors = {path: error for path, (_, error) in zip(paths, results) if error}
+	return errors, len(paths), sum(moves for moves, _ in results), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "inspect / replay GameHive move logs")
+	commands = parser.add_subparsers(dest = "command", required = True)
+	show = commands.add_parser("show", help = "room state of one log at a move index")
+	show.add_argument("path")
+	show.add_argument("--index", type = int, default = None, help = "moves to replay (default: all)")
+	show.add_argument("--player", type = int, default = None, help = "serialize for this seat (default: every hand)")
+	check = commands.add_parser("check", help = "replay every log of a directory against the current rules")
+	check.add_argument("directory")
+	check.add_argument("--workers", type = int, default = None)
+	args = parser.parse_args()
+
+	if args.command == "show":
+		num_players, seed, created, moves = read_log(args.path)
+		room = replay(args.path, args.index)
+		print(f"{num_players} players, seed {seed}, {time.ctime(created)}, move {room.version}/{len(moves)}")
+		if args.player is not None:
+			print(room.serialize(args.player))
+		else:
+			print("turn:", room.turn, "table:", room.table, "leftover:", room.leftover_cards)
+			for i, cards in enumerate(room.player_cards):
+				print(f"player {i}: {' '.join(cards)}")
+			print("rank:", room.leaderboard(), "(finished)" if room.finished else "")
+	else:
+		errors, games, moves, elapsed = check_dir(args.directory, args.workers)
+		for path, error in errors.items():
+			print(f"{path}: {error}")
+		print(f"{games} games, {moves} moves in {elapsed:.2f}s ({moves / elapsed:,.0f} moves/s), {len(errors)} failed")
+		sys.exit(1 if errors else 0)
@@ -0,0 +1,354 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from utils import CARD_IDS
+from movelog import PASS
+
+FORMAT = 1
+MAX_SEATS = 8		# per-seat columns are this wide, unused seats padded
+NO_SEAT = 0xFF
+
+# one file per column, (dtype, width), rows appended in this order (a game counts once its last column is written)
+MOVE_COLUMNS = {
+	"move_seat": ("u1", 1),		# who moved
+	"move_card": ("u1", 1),		# card id, PASS
+	"move_seconds": ("<f4", 1),		# since the previous move (the deal for the first one), NaN if not timed
+}
+GAME_COLUMNS = {
+	"seed": ("<u8", 1),		# Room seed, replays the deal
+	"created": ("<f8", 1),		# unix time of the deal
+	"duration": ("<f4", 1),		# deal -> last move, seconds (NaN if not timed)
+	"num_players": ("u1", 1),
+	"first": ("u1", 1),		# seat holding 7H, first on turn
+	"bots": ("u1", 1),		# bit per seat played by a bot
+	"hands": ("<u8", MAX_SEATS),		# dealt card mask per seat (the leftover cards are the rest of the deck)
+	"passes": ("<u2", MAX_SEATS),		# PASS count per seat
+	"order": ("u1", MAX_SEATS),		# seats in finishing order, NO_SEAT padded
+	"move_start": ("<u8", 1),		# first row of the game in the move columns
+	"num_moves": ("<u2", 1),
+}
+
+
+# one room's game as it is played, RoomManager feeds it every accepted move
+class GameRecorder:
+	def __init__(self, room, bots = ()):
+		self.seed = room.seed
+		self.first = room.turn
+		self.hands = list(room.hands)
+		self.bots = sum(1 << player_id for player_id in bots)
+		self.created = time.time()
+		self.start = self.last = time.perf_counter()
+		self.seats = []
+		self.cards = []
+		self.seconds = []
+
+
+	# an accepted move, as the client sent it (Room.verify_move is case-insensitive)
+	def append(self, player_id, move):
+		now = time.perf_counter()
+		move = move.upper()
+		self.seats.append(player_id)
+		self.cards.append(PASS if move == "PASS" else CARD_IDS[move])
+		self.seconds.append(now - self.last)
+		self.last = now
+
+
+	# a bot took the seat over mid-game (its player left), the seat is tagged as a bot's
+	def set_bot(self, player_id):
+		self.bots |= 1 << player_id
+
+
+	# the finished game as one record (RecordStore.append)
+	def finish(self, room):
+		passes = [0] * len(self.hands)
+		for seat, card in zip(self.seats, self.cards):
+			passes[seat] += card == PASS
+		return {
+				"seed": self.seed,
+				"created": self.created,
+				"duration": self.last - self.start,
+				"first": self.first,
+				"bots": self.bots,
+				"hands": self.hands,
+				"passes": passes,
+				"order": room.leaderboard(),
+				"moves": (self.seats, self.cards, self.seconds),
+				}
+
+
+# append-only columnar store of finished games, read back as memory-mapped NumPy arrays (one writer per directory)
+class RecordStore:
+	def __init__(self, directory):
+		self.directory = directory
+		os.makedirs(directory, exist_ok = True)
+		schema_path = os.path.join(directory, "schema.json")
+		schema = {"format": FORMAT, "max_seats": MAX_SEATS, "moves": MOVE_COLUMNS, "games": GAME_COLUMNS}
+		if os.path.exists(schema_path):
+			with open(schema_path) as f:
+				stored = json.load(f)
+			if stored["format"] != FORMAT:
+				raise ValueError(f"{directory}: record store format {stored['format']}, expected {FORMAT}")
+		else:
+			with open(schema_path, "w") as f:
+				json.dump(schema, f, indent = 2)
+		self.files = {}		# column -> append handle, opened on the first write
+
+
+	def path(self, column):
+		return os.path.join(self.directory, f"{column}.bin")
+
+
+	def write(self, column, values, dtype, width):
+		f = self.files.get(column)
+		if f is None:
+			f = self.files[column] = open(self.path(column), "ab")
+		values = np.asarray(values, dtype = dtype)
+		f.write(values.reshape(-1, width).tobytes() if width > 1 else values.tobytes())
+
+
+	# finished games (GameRecorder.finish records), one write per column
+	def append(self, records):
+		if not records:
+			return
+		games = {name: [] for name in GAME_COLUMNS}
+		moves = {name: [] for name in MOVE_COLUMNS}
+		for record in records:
+			seats, cards, seconds = record["moves"]
+			n = len(record["hands"])
+			for name in ("seed", "created", "duration", "first", "bots"):
+				games[name].append(record[name])
+			games["num_players"].append(n)
+			games["hands"].append(list(record["hands"]) + [0] * (MAX_SEATS - n))
+			games["passes"].append(list(record["passes"]) + [0] * (MAX_SEATS - n))
+			games["order"].append(list(record["order"]) + [NO_SEAT] * (MAX_SEATS - n))
+			games["num_moves"].append(len(cards))
+			moves["move_seat"] += seats
+			moves["move_card"] += cards
+			moves["move_seconds"] += seconds
+		self.append_columns(games, moves)
+
+
+	# column arrays straight in (bulk writers), move_start is filled in here
+	def append_columns(self, games, moves):
+		if not self.files:		# first write of this writer
+			self.truncate()
+		num_moves = np.asarray(games["num_moves"], dtype = np.uint64)
+		games["move_start"] = self.num_moves() + np.cumsum(num_moves) - num_moves
+		for name, (dtype, width) in MOVE_COLUMNS.items():
+			self.write(name, moves[name], dtype, width)
+		for name, (dtype, width) in GAME_COLUMNS.items():
+			self.write(name, games[name], dtype, width)
+		for f in self.files.values():
+			f.flush()		# readers (analytics) see whole games only
+
+
+	# drops what a crash left past the last complete game (moves written, game columns not, or half a row), later
+	# appends would land under the wrong game otherwise; only the writer does this, readers skip partial rows
+	def truncate(self):
+		games = len(self)
+		for name, (dtype, width) in GAME_COLUMNS.items():
+			self.truncate_column(name, games * np.dtype(dtype).itemsize * width)
+		moves = self.num_moves()
+		for name, (dtype, width) in MOVE_COLUMNS.items():
+			self.truncate_column(name, moves * np.dtype(dtype).itemsize * width)
+
+
+	def truncate_column(self, column, size):
+		path = self.path(column)
+		if os.path.exists(path) and os.path.getsize(path) > size:
+			os.truncate(path, size)
+
+
+	def close(self):
+		for f in self.files.values():
+			f.close()
+		self.files = {}
+
+
+	# complete rows of a column file (a crash can leave a partial row behind)
+	def rows(self, column, dtype, width):
+		path = self.path(column)
+		if not os.path.exists(path):
+			return 0
+		return os.path.getsize(path) // (np.dtype(dtype).itemsize * width)
+
+
+	# games whose every column made it to disk
+	def __len__(self):
+		return min(self.rows(name, dtype, width) for name, (dtype, width) in GAME_COLUMNS.items())
+
+
+	def num_moves(self):
+		n = len(self)
+		if n == 0:
+			return 0
+		games = self.games()
+		return int(games["move_start"][n - 1]) + int(games["num_moves"][n - 1])
+
+
+	def memmap(self, column, dtype, width, rows):
+		if rows == 0:
+			return np.zeros((0, width) if width > 1 else 0, dtype = dtype)
+		return np.memmap(self.path(column), dtype = dtype, mode = "r", shape = (rows, width) if width > 1 else (rows,))
+
+
+	# game columns as read-only memory maps (nothing is loaded until it is touched)
+	def games(self):
+		n = len(self)
+		return {name: self.memmap(name, dtype, width, n) for name, (dtype, width) in GAME_COLUMNS.items()}
+
+
+	def moves(self):
+		n = self.num_moves()
+		return {name: self.memmap(name, dtype, width, n) for name, (dtype, width) in MOVE_COLUMNS.items()}
+
+
+	# (games, moves) column slices of `size` games at a time, move rows of the chunk only
+	def chunks(self, size = 1 << 16):
+		games, moves = self.games(), self.moves()
+		n = len(self)
+		for start in range(0, n, size):
+			end = min(start + size, n)
+			first, last = int(games["move_start"][start]), int(games["move_start"][end - 1]) + int(games["num_moves"][end - 1])
+			yield {name: column[start:end] for name, column in games.items()}, {name: column[first:last] for name, column in moves.items()}
+
+
+# every store under path (a store directory itself, or e.g. one per sharded worker)
+def find_stores(path):
+	for root, _, files in sorted(os.walk(path)):
+		if "schema.json" in files:
+			yield RecordStore(root)
+
+
+# card masks out of (N, 52) bool hands
+def pack_masks(hands):
+	packed = np.zeros(hands.shape[:-1] + (8,), dtype = np.uint8)
+	packed[..., :7] = np.packbits(hands, axis = -1, bitorder = "little")
+	return packed.view("<u8")[..., 0]
+
+
+# bulk fill: N random-policy games from the NumPy simulator (every seat a bot, no timings)
+def simulate(store, games, num_players, batch_size = 20000, seed = 0):
+	from batch_sim import BatchGame, PASS as SIM_PASS
+
+	for start in range(0, games, batch_size):
+		seeds = np.arange(seed + start, seed + min(start + batch_size, games))
+		batch = BatchGame.from_seeds(seeds, num_players)
+		hands, first = pack_masks(batch.hands), batch.turn.copy()
+		rng = np.random.default_rng(seed + start)
+		turns, history = [], []
+		while not batch.finished.all():
+			live = ~batch.finished
+			moves = batch.random_policy(rng)
+			turns.append(np.where(live, batch.turn, -1))
+			history.append(np.where(live, moves, -2))
+			batch.step(moves)
+
+		turns, history = np.stack(turns, axis = 1), np.stack(history, axis = 1)
+		played = history != -2		# (N, steps), the live prefix of every game
+		seats, cards = turns[played], history[played]		# row-major: game by game, in move order
+		passed = cards == SIM_PASS
+		n = len(seeds)
+		passes = np.zeros((n, MAX_SEATS), dtype = np.uint16)
+		np.add.at(passes, (np.repeat(np.arange(n), played.sum(axis = 1))[passed], seats[passed]), 1)
+		order = np.full((n, MAX_SEATS), NO_SEAT, dtype = np.uint8)
+		order[:, :num_players] = batch.leaderboard()
+		padded = np.zeros((n, MAX_SEATS), dtype = np.uint64)
+		padded[:, :num_players] = hands
+
+		store.append_columns({
+				"seed": seeds,
+				"created": np.full(n, time.time()),
+				"duration": np.full(n, np.nan),
+				"num_players": np.full(n, num_players),
+				"first": first,
+				"bots": np.full(n, (1 << num_players) - 1),
+				"hands": padded,
+				"passes": passes,
+				"order": order,
+				"num_moves": played.sum(axis = 1),
+				}, {
+				"move_seat": seats,
+				"move_card": np.where(passed, PASS, cards),
+				"move_seconds": np.full(len(cards), np.nan),
+				})
+
+
+# replays stored games through Room (deal from the seed, legality as movelog.check_log), returns ({game index: error}, games, moves)
+def check(store, limit = None):
+	from room import Room
+
+	errors, seen, replayed = {}, 0, 0
+	for games, moves in store.chunks():
+		offset = int(games["move_start"][0]) if len(games["seed"]) else 0
+		for g in range(len(games["seed"])):
+			if limit is not None and seen >= limit:
+				return errors, seen, replayed
+			n, start = int(games["num_players"][g]), int(games["move_start"][g]) - offset
+			room = Room(n, seed = int(games["seed"][g]))
+			room.initialise_board()
+			room.track_changes = False
+			error = None
+			if list(room.hands) != games["hands"][g][:n].tolist() or room.turn != games["first"][g]:
+				error = "deal differs from the seed's"
+			for i in range(start, start + int(games["num_moves"][g])):
+				if error:
+					break
+				seat, ci = int(moves["move_seat"][i]), int(moves["move_card"][i])
+				legal = room.legal_moves(room.turn)
+				if seat != room.turn:
+					error = f"move {i - start}: seat {seat} moved on seat {room.turn}'s turn"
+				elif (ci == PASS and legal) or (ci != PASS and not (legal >> ci & 1)):
+					error = f"move {i - start} ({'PASS' if ci == PASS else room.ref_cards[ci]}) is illegal"
+				else:
+					room.play(None if ci == PASS else ci)
+					replayed += 1
+			if not error and (not room.finished or room.leaderboard() != games["order"][g][:n].tolist()):
+				error = "finishing order differs"
+			if error:
+				errors[seen] = error
+			seen += 1
+	return errors, seen, replayed
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "columnar store of finished games")
+	commands = parser.add_subparsers(dest = "command", required = True)
+	info = commands.add_parser("info", help = "games / moves per store")
+	info.add_argument("path")
+	fill = commands.add_parser("simulate", help = "append random-policy games (NumPy simulator)")
+	fill.add_argument("path")
+	fill.add_argument("--games", type = int, default = 100000)
+	fill.add_argument("--players", type = int, default = 4)
+	fill.add_argument("--batch", type = int, default = 20000)
+	fill.add_argument("--seed", type = int, default = 0)
+	verify = commands.add_parser("check", help = "replay every stored game through Room")
+	verify.add_argument("path")
+	verify.add_argument("--limit", type = int, default = None, help = "games per store")
+	args = parser.parse_args()
+
+	if args.command == "check":
+		failed = 0
+		for store in find_stores(args.path):
+			start = time.perf_counter()
+			errors, games, moves = check(store, args.limit)
+			for game, error in list(errors.items())[:10]:
+				print(f"{store.directory} game {game}: {error}")
+			print(f"{store.directory}: {games:,} games, {moves:,} moves in {time.perf_counter() - start:.1f}s, {len(errors)} failed")
+			failed += len(errors)
+		sys.exit(1 if failed else 0)
+
+	if args.command == "simulate":
+		store = RecordStore(args.path)
+		start = time.perf_counter()
+		simulate(store, args.games, args.players, args.batch, args.seed)
+		store.close()
+		print(f"{args.games} games in {time.perf_counter() - start:.1f}s")
+	for store in find_stores(args.path):
+		size = sum(os.path.getsize(os.path.join(store.directory, f)) for f in os.listdir(store.directory))
+		print(f"{store.directory}: {len(store):,} games, {store.num_moves():,} moves, {size / 1e6:.1f} MB")
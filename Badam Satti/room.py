@@ -1,101 +1,118 @@
 import random
 
+import hive
+from gamehive.engine import GameEngine
 from utils import *
+from rules import *
 
 
-class Room:
-	def __init__(self, num_players):
+# Badam Satti rules as a gamehive engine (one table)
+class Room(GameEngine):
+	def __init__(self, num_players, seed = None):
 		self.num_players = num_players
+		self.seed = seed		# same seed -> same deal and starting turn
+		self.rng = random.Random(seed)
 		self.game_start = False
 		self.finished = False
 
 		# ref cards
-		self.card_num = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-		self.card_suite = ['H', 'S', 'D', 'C']
-		self.ref_cards = sum([[str(i) + s for i in self.card_num] for s in self.card_suite], [])
+		self.card_num = RANKS
+		self.card_suite = SUITS
+		self.ref_cards = CARDS
 
 		# shuffle cards and distribute
 		self.shuffled_cards = self.ref_cards.copy()		# not shuffled yet
-		self.player_cards = []
-		self.leftover_cards = []
+		self.hands = []			# 52-bit card mask per player
+		self.leftover = 0		# 52-bit mask of cards left to be dealt
 
 		# setup the table and round
-		self.table = []
-		self.turn = random.choice(range(self.num_players))
+		self.table_mask = 0		# 52-bit mask of cards on the table
+		self.turn = self.rng.choice(range(self.num_players))
 		self.rank = []
 		self.active_players = list(range(self.num_players))
 
+		# state versioning (one change per accepted move)
+		self.version = 0
+		self.changes = []		# changes[v] takes a client from version v to v + 1
+		self.track_changes = True		# off for search clones
+		self.log = None		# MoveLog (movelog.py) receiving every accepted move
+
+
+	# cards of every player, sorted (string view of the hand masks)
+	@property
+	def player_cards(self):
+		return [to_cards(hand) for hand in self.hands]
+
+
+	# cards left to be dealt (string view of the leftover mask)
+	@property
+	def leftover_cards(self):
+		return to_cards(self.leftover)
+
+
+	# (l, r) rank span per suite, (-1, -1) if not opened (view of the table mask)
+	@property
+	def table(self):
+		return [span(self.table_mask, si) for si in range(len(self.card_suite))]
+
 
 	# sort cards in their (1st) card suite (2nd) card number 
 	def sort_cards(self, cards):
-		return sorted(cards, key=lambda x: self.card_suite.index(x[-1])*100+self.card_num.index(x[:-1]))
+		return sorted(cards, key = CARD_IDS.__getitem__)		# card ids are already in (suite, number) order
 
 
 	# shuffle cards and distribute them among players & setup the table
 	def initialise_board(self):
-		random.shuffle(self.shuffled_cards)
+		self.rng.shuffle(self.shuffled_cards)
 
 		# distribute cards among players
 		cards_per_player = len(self.ref_cards) // self.num_players
 		cards_left = len(self.ref_cards) % self.num_players
-		self.player_cards = [self.sort_cards(self.shuffled_cards[i * cards_per_player : i * cards_per_player + cards_per_player]) for i in range(self.num_players)]
-		self.leftover_cards = self.shuffled_cards[len(self.ref_cards) - cards_left :]
+		self.hands = [to_mask(self.shuffled_cards[i * cards_per_player : i * cards_per_player + cards_per_player]) for i in range(self.num_players)]
+		self.leftover = to_mask(self.shuffled_cards[len(self.ref_cards) - cards_left :])
 
-		self.table = [(-1, -1) for _ in self.card_suite]
+		self.table_mask = 0
 		self.find_7H()
 
 
 	# find player with 7H card, place all '7' leftover cards on the table
 	def find_7H(self):
-		for i, cards in enumerate(self.player_cards):
-			if '7H' in cards:
+		for i, hand in enumerate(self.hands):
+			if hand & SEVEN_H:
 				self.turn = i
-		for si in range(len(self.card_suite)):
-			c = self.ref_cards[si * 13 + 6]
-			if c in self.leftover_cards:
-				self.place_card(si * 13 + 6)
-				self.leftover_cards.remove(c)
+		for ci in card_ids(self.leftover & SEVENS):
+			self.leftover ^= 1 << ci
+			self.put_on_table(ci)
+
+
+	# bitmask of all possible card moves of the player_id
+	def legal_moves(self, player_id):
+		return legal_moves(self.hands[player_id], self.table_mask, self.game_start)
 
 
 	# find list of all possible card moves of the player_id
 	def possible_moves(self, player_id):
-		if not self.game_start:
-			return ['7H']
-		moves = []
-		for si, (l, r) in enumerate(self.table):
-			if l == -1:
-				moves.append(self.ref_cards[si * 13 + 6])
-				continue
-			if l != 0:
-				moves.append(self.ref_cards[si * 13 + l - 1])
-			if r != 12:
-				moves.append(self.ref_cards[si * 13 + r + 1])
-		return [c for c in moves if c in self.player_cards[player_id]]
+		return to_cards(self.legal_moves(player_id))
+
+
+	# card id goes on the table along with the leftover cards it connects to
+	def put_on_table(self, ci):
+		if ci == CARD_IDS["7H"]:
+			self.game_start = True
+		self.table_mask, self.leftover = place(self.table_mask, self.leftover, ci)
 
 
 	# places card on the table, check for leftover cards simultaneously
 	def place_card(self, move):
-		if move == "7H":
-			self.game_start = True
-		ci = self.ref_cards.index(move)
-		n, s = ci % 13, ci // 13		# extract card number + suite number
-		l, r = self.table[s] if self.table[s][0] != -1 else (n, n)
-		l = n if n == l - 1 else l
-		r = n if n == r + 1 else r 
-		while l > 0 and (self.ref_cards[s * 13 + l - 1] in self.leftover_cards):		# decrement till leftover cards are placed
-			self.leftover_cards.remove(self.ref_cards[s * 13 + l - 1])
-			l -= 1
-		while r < 12 and (self.ref_cards[s * 13 + r + 1] in self.leftover_cards):		# increament till leftover cards are placed
-			self.leftover_cards.remove(self.ref_cards[s * 13 + r + 1])
-			r += 1
-		self.table[s] = (l, r)
-		self.player_cards[self.turn].remove(move)
+		ci = CARD_IDS[move]
+		self.hands[self.turn] &= ~(1 << ci)
+		self.put_on_table(ci)
 
 
 	# update rank, active players, turn
 	def update_state(self):
 		if self.turn in self.active_players:
-			if self.player_cards[self.turn] == []:
+			if not self.hands[self.turn]:
 				self.rank.append(self.turn)
 				self.active_players.remove(self.turn)
 
@@ -108,34 +125,94 @@ class Room:
 			self.turn = (self.turn + 1) % self.num_players
 
 
-	# package game state for the client
+	# fast path for search / simulation: current player plays card id ci (None = PASS), no validation or recording
+	def play(self, ci):
+		if ci is not None:
+			self.hands[self.turn] &= ~(1 << ci)
+			self.put_on_table(ci)
+		self.update_state()
+
+
+	# cheap copy for search (shares nothing mutable, skips the change history)
+	def clone(self):
+		room = Room.__new__(Room)
+		room.__dict__.update(self.__dict__)
+		room.hands = self.hands.copy()
+		room.rank = self.rank.copy()
+		room.active_players = self.active_players.copy()
+		room.changes = []
+		room.track_changes = False
+		room.log = None
+		return room
+
+
+	# package game state for the client (player_id None -> public view, no hand, for spectators)
 	def serialize(self, player_id):
 		data = {
+				"version": self.version,		# state version of this snapshot
+				"player_id": player_id,		# which seat am I?
 				"turn": self.turn,		# who's turn is it?
 				"my_turn": 1 if (player_id == self.turn) else 0,		# is it my turn?
 				"table": self.table, 		# cards put on the table
-				"num_cards": [len(p) for p in self.player_cards],		# number of cards with each player
-				"my_cards": self.player_cards[player_id],		# my cards left
+				"num_cards": [count(hand) for hand in self.hands],		# number of cards with each player
+				"my_cards": to_cards(self.hands[player_id]) if player_id is not None else [],		# my cards left
 				"leftover_cards": self.leftover_cards,		# cards left to be dealt
 				}
 		return data
 
 
+	# package the changes since the client's version (full snapshot if never synced, None if up to date)
+	def serialize_update(self, player_id, since = None):
+		version = self.version
+		if since is None or since > version:
+			return self.serialize(player_id)
+		if since == version:
+			return None
+		data = {
+				"base": since,		# version the changes apply on top of
+				"version": version,
+				"changes": self.changes[since:version],
+				}
+		return data
+
+
+	# record an accepted move as a compact change, bumps the state version
+	def record_change(self, player_id, move):
+		change = {
+				"player": player_id,		# who moved
+				"card": None,		# card placed (None for PASS)
+				"span": None,		# new (l, r) span of the card's suite
+				"turn": self.turn,		# who's turn is it now?
+				"out": player_id if player_id in self.rank else None,		# player went out with this move
+				}
+		if move != "PASS":
+			change["card"] = move
+			change["span"] = span(self.table_mask, CARD_IDS[move] // 13)
+		if self.track_changes:
+			self.changes.append(change)
+		self.version += 1
+
+
 	# verify if the card move is valid or not (update the game state if valid)
 	def verify_move(self, player_id, move):
+		if not isinstance(move, str):		# malformed request
+			return False
 		move = move.upper()
 		valid = False
 		if player_id == self.turn:		# acceptable player_id and move
-			allowed_moves = self.possible_moves(player_id)
-			if allowed_moves == []:
+			allowed_moves = self.legal_moves(player_id)
+			if not allowed_moves:
 				valid = (move == "PASS")
 			else:
-				valid = (move in allowed_moves)
+				valid = (move in CARD_IDS) and bool(allowed_moves >> CARD_IDS[move] & 1)
 
 		if valid:
 			if move != "PASS":
 				self.place_card(move)
 			self.update_state()
+			self.record_change(player_id, move)
+			if self.log is not None:
+				self.log.append(move)
 		return valid
 
 
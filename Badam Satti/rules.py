@@ -0,0 +1,72 @@
+from utils import *
+
+# 52-bit card masks, bit i <-> CARDS[i] (suit * 13 + rank), so ascending bits are (suit, rank) sorted
+FULL_DECK = (1 << 52) - 1
+SUIT_MASKS = [((1 << 13) - 1) << (13 * s) for s in range(len(SUITS))]
+ACES = sum(1 << (13 * s) for s in range(len(SUITS)))		# rank 0 of every suit
+KINGS = ACES << 12		# rank 12 of every suit
+SEVENS = ACES << 6		# every suit starts from its 7
+SEVEN_H = 1 << CARD_IDS["7H"]
+
+
+# card list -> mask
+def to_mask(cards):
+	mask = 0
+	for card in cards:
+		mask |= 1 << CARD_IDS[card]
+	return mask
+
+
+# card ids set in the mask, ascending
+def card_ids(mask):
+	while mask:
+		low = mask & -mask
+		yield low.bit_length() - 1
+		mask ^= low
+
+
+# mask -> card list, sorted in (suit, rank) order
+def to_cards(mask):
+	return [CARDS[i] for i in card_ids(mask)]
+
+
+# (l, r) rank span of the suit on the table, (-1, -1) if the suit is not opened yet
+def span(table, si):
+	suit = (table & SUIT_MASKS[si]) >> (13 * si)
+	if not suit:
+		return (-1, -1)
+	return ((suit & -suit).bit_length() - 1, suit.bit_length() - 1)
+
+
+# cards that can go on the table: neighbours of the placed spans + 7 of unopened suits (only 7H to start)
+def legal_moves(hand, table, started):
+	if not started:
+		return hand & SEVEN_H
+	reach = ((table << 1) & ~ACES) | ((table >> 1) & ~KINGS) | SEVENS		# shifts must not wrap into the next suit
+	return reach & ~table & hand
+
+
+# place card ci on the table, leftover cards touching the grown span are placed too (returns table, leftover)
+def place(table, leftover, ci):
+	table |= 1 << ci
+	suit_leftover = leftover & SUIT_MASKS[ci // 13]
+	grow = (((table << 1) & ~ACES) | ((table >> 1) & ~KINGS)) & suit_leftover
+	while grow:
+		table |= grow
+		suit_leftover ^= grow
+		grow = (((table << 1) & ~ACES) | ((table >> 1) & ~KINGS)) & suit_leftover
+	return table, (leftover & ~SUIT_MASKS[ci // 13]) | suit_leftover
+
+
+# number of cards in the mask
+def count(mask):
+	return bin(mask).count("1")
+
+
+# (l, r) spans per suit -> table mask
+def from_spans(spans):
+	table = 0
+	for si, (l, r) in enumerate(spans):
+		if l != -1:
+			table |= ((1 << (r - l + 1)) - 1) << (13 * si + l)
+	return table
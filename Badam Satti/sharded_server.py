@@ -0,0 +1,23 @@
+import argparse
+
+import hive
+from gamehive.sharded_server import ShardedServer as CoreShardedServer
+from game_type import GAME
+
+
+# gamehive ShardedServer hosting Badam Satti only
+class ShardedServer(CoreShardedServer):
+	def __init__(self, host = '127.0.0.1', port = 62743, users = 2, bots = 0, workers = None, metrics = None, log_dir = None, record_dir = None):
+		CoreShardedServer.__init__(self, [GAME], host, port, users, bots, workers, metrics, log_dir, record_dir)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Badam Satti server, rooms sharded over worker processes")
+	parser.add_argument("--host", default = "0.0.0.0")
+	parser.add_argument("--port", type = int, default = 62743)
+	parser.add_argument("--users", type = int, default = 2)
+	parser.add_argument("--bots", type = int, default = 0)
+	parser.add_argument("--workers", type = int, default = None, help = "default: one per core")
+	parser.add_argument("--records", default = None, help = "record finished games here (records.py), one store per worker")
+	args = parser.parse_args()
+	ShardedServer(args.host, args.port, args.users, args.bots, args.workers, record_dir = args.records).run()
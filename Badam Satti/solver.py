@@ -0,0 +1,165 @@
+import sys
+import time
+import random
+import argparse
+from collections import OrderedDict
+
+from utils import *
+from rules import *
+from room import Room
+
+
+# exact endgame search when every hand is known (max^n: the player on turn minimises their own finishing place)
+class EndgameSolver:
+	def __init__(self, max_entries = 1 << 20):
+		self.max_entries = max_entries		# transposition table size, least recently used entries go first
+		self.table = OrderedDict()		# state key -> finishing order of the players still holding cards
+
+		# search stats
+		self.nodes = 0		# positions expanded (table misses)
+		self.lookups = 0
+		self.hits = 0
+		self.search_time = 0.0
+
+
+	def nodes_per_sec(self):
+		return self.nodes / self.search_time if self.search_time else 0.0
+
+
+	def hit_rate(self):
+		return self.hits / self.lookups if self.lookups else 0.0
+
+
+	# (finishing order of the whole room, best card id for the player on turn, None = PASS)
+	def solve(self, room):
+		start = time.perf_counter()
+		hands = tuple(room.hands)
+		if room.finished:
+			order, best = (), None
+		else:
+			order, best = self.best(hands, room.table_mask, room.leftover, room.turn)
+		self.search_time += time.perf_counter() - start
+		return tuple(room.rank) + order, best
+
+
+	# optimal line of play from the room, [(player, card id or None)] until the game is over
+	def principal_variation(self, room):
+		room = room.clone()
+		line = []
+		while not room.finished:
+			_, best = self.solve(room)
+			line.append((room.turn, best))
+			room.play(best)
+		return line
+
+
+	# finishing order of the remaining players and the move reaching it
+	def best(self, hands, table, leftover, turn):
+		hand = hands[turn]
+		legal = legal_moves(hand, table, bool(table & SEVEN_H))
+		if not legal:		# forced PASS
+			return self.value(hands, table, leftover, next_turn(hands, turn)), None
+
+		best_order, best_ci = None, None
+		for ci in card_ids(legal):
+			left = hand & ~(1 << ci)
+			after = hands[:turn] + (left,) + hands[turn + 1:]
+			t, l = place(table, leftover, ci)		# same placement as Room.put_on_table (leftover cards follow)
+			if left:
+				order = self.value(after, t, l, next_turn(after, turn))
+			else:		# went out, ahead of everyone still holding cards
+				nxt = next_turn(after, turn)
+				order = (turn,) + (self.value(after, t, l, nxt) if nxt is not None else ())
+			if best_order is None or order.index(turn) < best_order.index(turn):
+				best_order, best_ci = order, ci
+				if order[0] == turn:		# can't do better than next out
+					break
+		return best_order, best_ci
+
+
+	# finishing order from a position, memoised in the LRU transposition table
+	def value(self, hands, table, leftover, turn):
+		key = state_key(hands, table, leftover, turn)
+		self.lookups += 1
+		order = self.table.get(key)
+		if order is not None:
+			self.hits += 1
+			self.table.move_to_end(key)
+			return order
+
+		self.nodes += 1
+		active = [i for i, hand in enumerate(hands) if hand]
+		if len(active) == 1:		# last one left plays out alone
+			order = (active[0],)
+		else:
+			order, _ = self.best(hands, table, leftover, turn)
+		self.table[key] = order
+		if len(self.table) > self.max_entries:
+			self.table.popitem(last = False)
+		return order
+
+
+# every hand, the table, the leftover cards and the turn packed into one int (52 bits per mask)
+def state_key(hands, table, leftover, turn):
+	key = (turn << 104) | (leftover << 52) | table
+	for i, hand in enumerate(hands):
+		key |= hand << (112 + 52 * i)
+	return key
+
+
+# next player after turn still holding cards (None if nobody is)
+def next_turn(hands, turn):
+	n = len(hands)
+	for step in range(1, n + 1):
+		i = (turn + step) % n
+		if hands[i]:
+			return i
+	return None
+
+
+# cards still held by the players (what the bots compare against their threshold)
+def cards_left(room):
+	return sum(count(hand) for hand in room.hands)
+
+
+# dealt room played at random (seeded) until at most `cards` are left in the hands
+def random_endgame(num_players, cards, seed):
+	rng = random.Random(seed)
+	room = Room(num_players, seed = seed)
+	room.initialise_board()
+	room.track_changes = False
+	while not room.finished and cards_left(room) > cards:
+		legal = list(card_ids(room.legal_moves(room.turn)))
+		room.play(rng.choice(legal) if legal else None)
+	return room
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "optimal finishing order of a Badam Satti endgame")
+	source = parser.add_mutually_exclusive_group(required = True)
+	source.add_argument("--log", help = "move log (movelog.py) to take the position from")
+	source.add_argument("--random", type = int, metavar = "SEED", help = "deal with this seed, random play down to --cards")
+	parser.add_argument("--index", type = int, default = None, help = "moves of the log to replay (default: all)")
+	parser.add_argument("--players", type = int, default = 3)
+	parser.add_argument("--cards", type = int, default = 15, help = "cards left in the hands (--random)")
+	parser.add_argument("--table-size", type = int, default = 1 << 20, help = "transposition table entries")
+	args = parser.parse_args()
+
+	if args.log:
+		from movelog import replay
+		room = replay(args.log, args.index)
+	else:
+		room = random_endgame(args.players, args.cards, args.random)
+	sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))		# one frame per ply, passes included
+
+	for i, hand in enumerate(room.hands):
+		print(f"{'>' if i == room.turn else ' '} player {i}: {' '.join(to_cards(hand)) or '(out)'}")
+	print("table:", room.table, "leftover:", room.leftover_cards)
+
+	solver = EndgameSolver(args.table_size)
+	order, best = solver.solve(room)
+	print("optimal finishing order:", " ".join(map(str, order)))
+	print("best move:", "PASS" if best is None else CARDS[best])
+	print("line:", " ".join(f"{p}:{'PASS' if ci is None else CARDS[ci]}" for p, ci in solver.principal_variation(room)))
+	print(f"{solver.nodes:,} nodes in {solver.search_time:.3f}s ({solver.nodes_per_sec():,.0f} nodes/s), "
+			f"table hit rate {solver.hit_rate():.1%} ({len(solver.table):,} entries)")
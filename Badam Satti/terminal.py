@@ -0,0 +1,90 @@
+import random
+import threading
+
+from game_state import GameState
+
+
+# text view of the game state, no pygame (ssh sessions, headless boxes, scripted play)
+class TerminalView(GameState):
+	def __init__(self, policy = None):
+		GameState.__init__(self)
+		self.policy = policy		# None asks on stdin, "first" / "random" pick a legal move by themselves
+		self.updated = threading.Event()		# set by the client's listener thread
+		self.shown = None		# (version, pending move) printed last
+		self.moved = None		# version we last made a move on
+
+
+	# wake the main loop from the network thread (state changed)
+	def notify(self):
+		self.updated.set()
+
+
+	# sleeps until a network update (or timeout ms), returns the kill switch
+	def handle_events(self, timeout = 1000):
+		self.updated.wait(timeout / 1000)
+		self.updated.clear()
+		return self.close
+
+
+	def print_board(self):
+		print(f"\n--- move {self.version} ---")
+		for si, (l, r) in enumerate(self.table):
+			row = " ".join(self.card_num[i] + self.card_suite[si] for i in range(l, r + 1)) if l != -1 else "-"
+			print(f"{self.card_suite[si]}: {row}")
+		if self.leftover_cards:
+			print("leftover:", " ".join(self.leftover_cards))
+		for i, n in enumerate(self.num_cards):
+			name = self.player_names[i] if i < len(self.player_names) else i
+			print(f"{'>' if i == self.turn else ' '} {name}: {n} cards{' (you)' if i == self.player_id else ''}")
+		if self.player_id is not None:		# spectators have no hand
+			print("hand:", " ".join(self.my_cards))
+
+
+	# my move, from the policy or the prompt (PASS only when nothing is playable)
+	def choose(self, legal):
+		if self.policy == "first":
+			return legal[0] if legal else "PASS"
+		if self.policy == "random":
+			return random.choice(legal) if legal else "PASS"
+		while True:
+			try:
+				move = input(f"your move [{' '.join(legal) or 'PASS'}] : ").strip().upper()
+			except EOFError:
+				self.close = True
+				return ""
+			if (move in legal) or (move == "PASS" and not legal):
+				return move
+			print("not playable, pick one of the listed cards")
+
+
+	# prints the board when it changed, returns the move made by the player
+	def draw(self, started = True, end_screen = False):
+		with self.lock:		# the listener thread deserializes meanwhile, the prompt below waits without the lock
+			if self.close or not started or self.version is None:
+				return ""
+			if self.shown != (self.version, self.pending):		# a predicted move prints at once
+				self.shown = (self.version, self.pending)
+				self.print_board()
+			if not self.my_turn or self.moved == self.version:
+				return ""
+			self.moved = self.version
+			legal = self.legal()
+		return self.choose(legal)
+
+
+	# my move was refused, ask again
+	def rollback(self):
+		undone = GameState.rollback(self)
+		if undone:
+			print("move refused by the server")
+			self.moved = None
+		return undone
+
+
+	# after the game is over, print the leaderboard
+	def handle_end(self):
+		if not self.finished:
+			return
+		print("\nresults:")
+		for place, i in enumerate(self.rank):
+			print(f"{place + 1}. {self.player_names[i]}{' (W)' if place == 0 else ''}")
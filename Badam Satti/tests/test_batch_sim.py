@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_sim import BatchGame, PASS
+
+
+# rng stub drawing 0.0 everywhere (numpy's random() is in [0, 1), 0.0 is a legal draw)
+class ZeroRng:
+	def random(self, shape, dtype = np.float64):
+		return np.zeros(shape, dtype = dtype)
+
+
+# every move random_policy picks is legal for the player on turn, PASS only without one
+def play_checked(batch, rng):
+	while not batch.finished.all():
+		live = ~batch.finished
+		legal = batch.legal_moves()
+		moves = batch.random_policy(rng)
+		placed = live & (moves != PASS)
+		assert legal[batch.games[placed], moves[placed]].all()
+		assert not legal[live & (moves == PASS)].any()
+		batch.step(moves)
+
+
+def test_random_policy_zero_draws():
+	play_checked(BatchGame.from_seeds(range(200), 3), ZeroRng())
+
+
+# a zero draw on the only valid candidate picked candidate 0 (seed 107078: a pad id, IndexError in step)
+def test_random_policy_seeded():
+	play_checked(BatchGame.from_seeds(np.arange(100000, 120000), 3), np.random.default_rng(100000))
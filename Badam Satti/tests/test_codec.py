@@ -0,0 +1,88 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import MESSAGE_IDS, BinaryCodec
+from gamehive.codec import JSON
+from gamehive.protocols import Protocols
+from room import Room
+
+
+# ids are on the wire: older clients / servers decode by them, so they may never move
+def test_message_ids_frozen():
+	assert MESSAGE_IDS == {
+			"protocols.request_nickname": 0,
+			"protocols.wait": 1,
+			"protocols.start": 2,
+			"protocols.game_state": 3,
+			"protocols.move_valid": 4,
+			"protocols.move_invalid": 5,
+			"protocols.results": 6,
+			"protocols.send_nickname": 7,
+			"protocols.move": 8,
+			"protocols.new_game": 9,
+			"protocols.leave": 10,
+			"protocols.resync": 11,
+			"protocols.spectate": 12,
+			"protocols.error": 13,
+			}
+	protocol_types = [v for group in (Protocols.Response, Protocols.Request) for k, v in vars(group).items() if not k.startswith("_")]
+	assert sorted(protocol_types) == sorted(MESSAGE_IDS)		# every message type has an id
+
+
+def test_unknown_id_is_a_decode_error():
+	try:
+		BinaryCodec().decode(bytes((200,)))
+	except ValueError:
+		return
+	assert False
+
+
+# empty bodies: no data decodes to None, but an empty leaderboard (abandoned room) stays a list
+def test_empty_payloads():
+	codec = BinaryCodec()
+	for r_type, data in ((Protocols.Response.RESULTS, []), (Protocols.Response.RESULTS, [2, 0, 1]), (Protocols.Response.WAIT, None), (Protocols.Response.START, []), (Protocols.Response.ERROR, "")):
+		assert codec.decode(codec.encode(r_type, data)) == {"type": r_type, "data": data}
+
+
+# both codecs carry the same data: every snapshot (player and public view) and delta of seeded games
+def test_round_trip_matches_json():
+	binary = BinaryCodec()
+	for seed in range(20):
+		room = Room(2 + seed % 4, seed = seed)
+		room.initialise_board()
+		rng = random.Random(seed)
+		messages = [(Protocols.Response.START, [f"p{i}" for i in range(room.num_players)])]
+		while not room.finished:
+			before = room.version
+			legal = room.possible_moves(room.turn)
+			move = rng.choice(legal) if legal else "PASS"
+			messages.append((Protocols.Request.MOVE, move))
+			assert room.verify_move(room.turn, move)
+			for player_id in list(range(room.num_players)) + [None]:
+				messages.append((Protocols.Response.GAME_STATE, room.serialize(player_id)))
+				messages.append((Protocols.Response.GAME_STATE, room.serialize_update(player_id, before)))
+		messages.append((Protocols.Response.RESULTS, room.leaderboard()))
+		for r_type, data in messages:
+			assert binary.decode(binary.encode(r_type, data)) == JSON.decode(JSON.encode(r_type, data))
+
+
+# deltas and snapshots keep their shape on the wire (the client tells them apart by "changes")
+def test_delta_vs_snapshot():
+	codec = BinaryCodec()
+	room = Room(3, seed = 4)
+	room.initialise_board()
+	assert room.verify_move(room.turn, room.possible_moves(room.turn)[0])
+	delta = codec.decode(codec.encode(Protocols.Response.GAME_STATE, room.serialize_update(0, 0)))["data"]
+	snapshot = codec.decode(codec.encode(Protocols.Response.GAME_STATE, room.serialize(0)))["data"]
+	assert delta["base"] == 0 and delta["version"] == 1 and len(delta["changes"]) == 1
+	assert "changes" not in snapshot and snapshot["version"] == 1 and snapshot["player_id"] == 0
+
+
+# moves that aren't cards reach the server as text (which rejects them)
+def test_moves():
+	codec = BinaryCodec()
+	for move, decoded in (("7h", "7H"), ("PASS", "PASS"), ("pass", "PASS"), ("11H", "11H")):
+		assert codec.decode(codec.encode(Protocols.Request.MOVE, move))["data"] == decoded
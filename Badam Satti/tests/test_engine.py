@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.engine import GameEngine, GameType
+
+
+class Partial(GameEngine):
+	def __init__(self, num_players, seed = None):
+		self.num_players = num_players
+
+
+# an engine missing part of the interface is refused when its game type is declared, not mid-match
+def test_incomplete_engine_refused():
+	try:
+		GameType("partial", Partial)
+	except TypeError as e:
+		assert "verify_move" in str(e)
+	else:
+		assert False
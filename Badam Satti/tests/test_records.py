@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import GAME_COLUMNS, GameRecorder, RecordStore, simulate, check
+from room import Room
+
+
+# simulated games are the games Room plays from the same seeds (seeds 100000.. hit a 0.0 draw in random_policy)
+def test_simulate_matches_room(tmp_path):
+	for players in (3, 4):
+		store = RecordStore(str(tmp_path / str(players)))
+		simulate(store, 2000, players, batch_size = 500, seed = 100000)
+		store.close()
+		errors, games, moves = check(store)
+		assert errors == {} and games == 2000 and moves == store.num_moves()
+
+
+def record(seed, moves):
+	return {"seed": seed, "created": 0.0, "duration": 0.0, "first": 0, "bots": 0, "hands": [1, 2], "passes": [0, 0], "order": [0, 1],
+			"moves": ([0, 1] * (moves // 2), [52] * moves, [0.0] * moves)}
+
+
+# a crash after the move columns (and half a game row) must not shift the moves of later games
+def test_partial_row_dropped_on_reopen(tmp_path):
+	store = RecordStore(str(tmp_path))
+	store.append([record(1, 4)])
+	store.close()
+	for name in ("move_seat", "move_card", "move_seconds"):		# the next game's moves made it, its game columns did not
+		with open(store.path(name), "ab") as f:
+			f.write(b"\0" * 6 * (4 if name == "move_seconds" else 1))
+	with open(store.path("seed"), "ab") as f:
+		f.write(b"\0" * 3)
+	assert os.path.getsize(store.path("seed")) == 8 + 3 and os.path.getsize(store.path("move_seconds")) == 4 * 4 + 6 * 4
+
+	store = RecordStore(str(tmp_path))
+	assert len(store) == 1 and store.num_moves() == 4
+	store.append([record(2, 2)])
+	store.close()
+	games, moves = store.games(), store.moves()
+	assert list(games["seed"]) == [1, 2] and list(games["move_start"]) == [0, 4]
+	assert store.num_moves() == 6 and all(os.path.getsize(store.path(name)) == 6 * (4 if name == "move_seconds" else 1) for name in moves)
+	assert all(os.path.getsize(store.path(name)) == 2 * np.dtype(dtype).itemsize * width for name, (dtype, width) in GAME_COLUMNS.items())
+
+
+# a seat a bot took over mid-game is recorded as a bot's
+def test_recorder_takeover_marks_bot():
+	room = Room(3, seed = 1)
+	room.initialise_board()
+	recorder = GameRecorder(room, bots = {2: None})
+	recorder.set_bot(0)
+	assert recorder.finish(room)["bots"] == 0b101
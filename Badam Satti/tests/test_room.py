@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from room import Room
+
+
+# moves come straight off the wire, anything but a string is just an invalid move
+def test_verify_move_rejects_non_strings():
+	room = Room(3, seed = 1)
+	room.initialise_board()
+	version = room.version
+	for move in (None, 7, ["7H"], {"card": "7H"}):
+		assert not room.verify_move(room.turn, move)
+	assert room.version == version
+	assert room.verify_move(room.turn, "7h")
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from codec import CODECS
+from game_type import GAME
+from gamehive.room_manager import RoomManager
+from gamehive.server import Server
+
+
+# spectators waiting for a room join the next one, every watcher at the same version shares one public payload
+def test_public_fan_out():
+	rooms = RoomManager([GAME], table_size = 2)
+	early = "early"
+	assert rooms.watch(early) is None		# no room yet, waits for the next one
+	assert rooms.enqueue("p0", "p0") is None
+	room_id = rooms.enqueue("p1", "p1")
+	assert rooms.watching[early] == room_id
+	late = "late"
+	assert rooms.watch(late) == room_id		# newest room
+	room = rooms.rooms[room_id]
+
+	[(snapshot, watchers)] = rooms.public_updates(room_id, room)
+	assert sorted(watchers) == [early, late]
+	assert snapshot["player_id"] is None and snapshot["my_cards"] == [] and snapshot["my_turn"] == 0		# no hand shown
+	assert rooms.public_updates(room_id, room) == []		# nothing new
+
+	rooms.verify_move(room, room.turn, room.possible_moves(room.turn)[0])
+	rooms.resync(late)
+	held = "held"
+	rooms.watch(held, room_id)
+	updates = {tuple(sorted(watchers)): data for data, watchers in rooms.public_updates(room_id, room, skip = {held})}
+	assert set(updates) == {(early,), (late,)}
+	assert "changes" in updates[(early,)] and updates[(early,)]["base"] == snapshot["version"]		# delta from its version
+	assert "changes" not in updates[(late,)]		# resynced, a fresh snapshot
+	assert rooms.synced.get(held) is None		# skipped, stays where it was
+
+	rooms.remove(late)
+	assert late not in rooms.watchers[room_id] and late not in rooms.watching
+
+
+# keeps what the server queued, nothing is sent
+class Outbox:
+	def __init__(self):
+		self.frames = []
+
+
+	def queue(self, msg):
+		self.frames.append(msg)
+
+
+	def queue_state(self, msg, base, rebuild):
+		self.frames.append(msg)
+		return False
+
+
+	def flush(self):
+		pass
+
+
+# the public state is encoded once per codec, every spectator in the group gets the same bytes
+def test_broadcast_encodes_once():
+	server = Server([GAME], port = 0, users = 2)
+	try:
+		for client in ("p0", "p1", "w0", "w1", "w2"):
+			server.transports[client] = Outbox()
+		server.codecs["w2"] = CODECS["binary"]
+		server.rooms.enqueue("p0", "p0")
+		room_id = server.rooms.enqueue("p1", "p1")
+		for client in ("w0", "w1", "w2"):
+			server.rooms.watch(client, room_id)
+		room = server.rooms.rooms[room_id]
+		server.broadcast(room_id, room, server.rooms.members[room_id])
+		[w0], [w1], [w2] = (server.transports[client].frames for client in ("w0", "w1", "w2"))
+		assert w0 is w1 and w0 != w2		# json shared, binary encoded separately
+		assert CODECS["binary"].decode(w2) == CODECS["json"].decode(w0)
+	finally:
+		server.server.close()
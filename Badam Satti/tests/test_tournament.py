@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tournament
+
+
+class PassingBot(tournament.Bot):
+	def move(self, state, available_moves):
+		return "PASS"
+
+
+# a bot that always passes gets a legal move played for it: its passes are the ones that reached the board
+def test_passes_count_played_moves():
+	tournament.register("passing", PassingBot)
+	result = tournament.play_game((0, 5, ["passing", "random", "random"]))
+	assert result["invalid"][0] > 0
+	assert result["passes"][0] < result["invalid"][0]
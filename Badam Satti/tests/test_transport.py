@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import socket
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hive
+from gamehive.transport import QueuedTransport, Transport, frame
+
+
+# hands out the stream a few bytes per recv_into, as a congested socket does
+class ChunkedSocket:
+	def __init__(self, data, chunk):
+		self.data = data
+		self.chunk = chunk
+		self.sent = b""
+
+
+	def recv_into(self, view):
+		n = min(self.chunk, len(view), len(self.data))
+		view[:n] = self.data[:n]
+		self.data = self.data[n:]
+		return n
+
+
+	def sendall(self, data):
+		self.sent += data
+
+
+# frames split across reads (headers too), several frames per read, and frames bigger than the buffer
+def test_frames_across_partial_reads():
+	messages = [b"", b"a", b"x" * 300, bytes(range(256)) * 3, b"end"]
+	stream = b"".join(frame(msg) for msg in messages)
+	for chunk in (1, 3, 7, 64, len(stream)):
+		transport = Transport(ChunkedSocket(stream, chunk), size = 128)
+		assert [bytes(transport.recv_frame()) for _ in messages] == messages
+		assert transport.recv_frame() is None and transport.closed
+		assert transport.bytes_in == len(stream)
+
+
+# queued frames go out together on flush
+def test_queue_flush():
+	sock = ChunkedSocket(b"", 1)
+	transport = Transport(sock)
+	transport.queue(b"one")
+	transport.queue(b"two")
+	assert sock.sent == b""
+	transport.flush()
+	transport.send(b"three")
+	assert sock.sent == frame(b"one") + frame(b"two") + frame(b"three")
+
+
+# an unsent GAME_STATE is replaced by one rebuilt from its base, built without the transport lock (it takes the room lock)
+def test_queued_state_coalesced():
+	a, b = socket.socketpair()
+	transport = QueuedTransport(a)
+	bases = []
+
+	def rebuild(base):
+		assert not transport.lock.locked()
+		bases.append(base)
+		return b"state 0-2"
+
+	try:
+		assert not transport.queue_state(b"state 0-1", 0, rebuild)
+		transport.queue(b"results")		# frames queued after the state keep their place
+		assert transport.queue_state(b"state 1-2", 1, rebuild)
+		assert bases == [0]
+		transport.flush()
+		peer = Transport(b)
+		assert [bytes(peer.recv_frame()) for _ in range(2)] == [b"state 0-2", b"results"]
+		assert not transport.queue_state(b"state 2-3", 2, rebuild)		# the flushed one is gone, nothing to fold into
+		assert bases == [0]
+	finally:
+		transport.close()
+		a.close()
+		b.close()
+
+
+# a peer that stops reading is evicted once the backlog passes the limit (on_evict called once)
+def test_slow_peer_evicted():
+	a, b = socket.socketpair()
+	a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+	evicted = []
+	transport = QueuedTransport(a, limit = 1 << 16, on_evict = lambda: evicted.append(True))
+	try:
+		for _ in range(64):
+			transport.send(b"x" * 4096)
+		deadline = time.monotonic() + 5
+		while not evicted and time.monotonic() < deadline:
+			transport.send(b"x" * 4096)
+		assert evicted == [True]
+		transport.send(b"x" * 4096)
+		assert evicted == [True]
+	finally:
+		transport.close()
+		b.close()
+		a.close()
@@ -0,0 +1,160 @@
+import time
+import random
+import argparse
+import itertools
+import importlib.util
+import multiprocessing
+
+import pandas as pd
+
+from room import Room
+from bot import Bot, ISMCTSBot, EndgameBot
+
+
+# bot classes that can enter a tournament, by name (register yours from an imported module so pool workers see it)
+BOTS = {"random": Bot, "ismcts": ISMCTSBot, "endgame": EndgameBot}
+
+
+def register(name, bot_class):
+	BOTS[name] = bot_class
+
+
+# plays one seeded game between bot classes, no sockets and no thinking delay (on a pool worker)
+def play_game(task):
+	game_id, seed, seats = task
+	start = time.perf_counter()
+	room = Room(len(seats), seed = seed)
+	room.initialise_board()
+	bots = [BOTS[name.split("#")[0]](i, delay = None, seed = seed * len(seats) + i) for i, name in enumerate(seats)]
+	passes = [0] * len(seats)
+	invalid = [0] * len(seats)
+	moves = 0
+
+	while not room.finished:
+		turn = room.turn
+		available_moves = room.possible_moves(turn)
+		move = bots[turn].move(room.serialize(turn), available_moves) or "PASS"
+		if not room.verify_move(turn, move):		# bad bot, count it and play a legal move for it
+			invalid[turn] += 1
+			move = available_moves[0] if available_moves else "PASS"
+			room.verify_move(turn, move)
+		passes[turn] += move == "PASS"		# the move that went on the board
+		moves += 1
+
+	return {
+			"game_id": game_id,
+			"seed": seed,
+			"seats": seats,
+			"rank": room.leaderboard(),		# seat ids in finishing order
+			"moves": moves,
+			"passes": passes,
+			"invalid": invalid,
+			"duration": time.perf_counter() - start,
+			}
+
+
+# pairwise Elo over the finishing order, every pair of seats counts as one match
+def update_ratings(ratings, result, k = 16):
+	order = [result["seats"][i] for i in result["rank"]]
+	scale = k / (len(order) - 1)
+	delta = dict.fromkeys(order, 0.0)
+	for i, winner in enumerate(order):
+		for loser in order[i + 1:]:
+			expected = 1 / (1 + 10 ** ((ratings[loser] - ratings[winner]) / 400))
+			delta[winner] += scale * (1 - expected)
+			delta[loser] -= scale * (1 - expected)
+	for name, d in delta.items():
+		ratings[name] += d
+
+
+# every table of distinct entrants, each dealt `games` times with rotated seating
+def round_robin(entrants, players, games, seed):
+	tasks = []
+	for table in itertools.combinations(entrants, players):
+		for g in range(games):
+			shift = g % players
+			tasks.append((len(tasks), seed + len(tasks), list(table[shift:] + table[:shift])))
+	return tasks
+
+
+# one round of tables grouping entrants with similar ratings (entrants left over sit out)
+def swiss_round(entrants, ratings, players, first_id, seed):
+	standings = sorted(entrants, key = lambda name: -ratings[name])
+	tables = [standings[i : i + players] for i in range(0, len(standings) - players + 1, players)]
+	return [(first_id + i, seed + first_id + i, random.Random(seed + first_id + i).sample(table, players)) for i, table in enumerate(tables)]
+
+
+# one row per game for the results file
+def to_rows(results):
+	rows = []
+	for result in results:
+		row = {k: result[k] for k in ("game_id", "seed", "moves", "duration")}
+		for seat, name in enumerate(result["seats"]):
+			row[f"seat_{seat}"] = name
+			row[f"finish_{seat}"] = result["rank"].index(seat) + 1
+			row[f"passes_{seat}"] = result["passes"][seat]
+			row[f"invalid_{seat}"] = result["invalid"][seat]
+		rows.append(row)
+	return rows
+
+
+def run(entrants, players = 4, games = 100, mode = "round_robin", rounds = 10, workers = None, seed = 0):
+	ratings = dict.fromkeys(entrants, 1500.0)
+	results = []
+	with multiprocessing.Pool(workers) as pool:
+		if mode == "round_robin":
+			tasks = round_robin(entrants, players, games, seed)
+			results = sorted(pool.imap_unordered(play_game, tasks, chunksize = 64), key = lambda result: result["game_id"])
+			for result in results:		# game_id order keeps ratings reproducible
+				update_ratings(ratings, result)
+		else:
+			for _ in range(rounds):
+				tasks = []
+				for g in range(games):		# several deals per round, pairings fixed for the round
+					tasks += swiss_round(entrants, ratings, players, len(results) + len(tasks), seed)
+				round_results = sorted(pool.map(play_game, tasks, chunksize = 64), key = lambda result: result["game_id"])
+				for result in round_results:
+					update_ratings(ratings, result)
+				results += round_results
+	return ratings, results
+
+
+# per-game results to csv / parquet (by extension, parquet needs pyarrow)
+def save(results, path):
+	frame = pd.DataFrame(to_rows(results))
+	if path.endswith(".parquet"):
+		frame.to_parquet(path, index = False)
+	else:
+		frame.to_csv(path, index = False)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "headless Badam Satti bot tournament")
+	parser.add_argument("bots", nargs = "+", help = f"entrants, any of {sorted(BOTS)} (repeat a name to enter it twice)")
+	parser.add_argument("--players", type = int, default = 4, help = "seats per table")
+	parser.add_argument("--games", type = int, default = 100, help = "deals per table (per round for swiss)")
+	parser.add_argument("--mode", choices = ["round_robin", "swiss"], default = "round_robin")
+	parser.add_argument("--rounds", type = int, default = 10, help = "swiss rounds")
+	parser.add_argument("--workers", type = int, default = None, help = "pool size (default: all cores)")
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--out", default = "tournament.csv", help = ".csv or .parquet")
+	args = parser.parse_args()
+
+	# label repeated entrants name#2, name#3, ...
+	entrants = [name if args.bots[:i].count(name) == 0 else f"{name}#{args.bots[:i].count(name) + 1}" for i, name in enumerate(args.bots)]
+	unknown = {name.split("#")[0] for name in entrants} - set(BOTS)
+	if unknown:
+		parser.error(f"unknown bots {sorted(unknown)}, registered: {sorted(BOTS)}")
+	if len(entrants) < args.players:
+		parser.error(f"need at least {args.players} entrants for {args.players} seats")
+	if args.out.endswith(".parquet") and not (importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")):
+		parser.error("parquet output needs pyarrow (or fastparquet), use a .csv path instead")
+
+	start = time.perf_counter()
+	ratings, results = run(entrants, args.players, args.games, args.mode, args.rounds, args.workers, args.seed)
+	elapsed = time.perf_counter() - start
+	save(results, args.out)
+
+	print(f"{len(results)} games in {elapsed:.1f}s ({len(results) / elapsed:,.0f} games/s), results in {args.out}")
+	for name, rating in sorted(ratings.items(), key = lambda item: -item[1]):
+		print(f"{name:>20} {rating:8.1f}")
@@ -1,5 +1,9 @@
+GAME_NAME = "badam_satti"		# GameType name clients ask for at the NICKNAME handshake
+
 RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
 SUITS = ['H', 'S', 'D', 'C']
+CARDS = [r + s for s in SUITS for r in RANKS]		# deck order, card id = suit index * 13 + rank index
+CARD_IDS = {card: i for i, card in enumerate(CARDS)}
 
 
 class Deck:
@@ -0,0 +1 @@
+# GameHive core: servers, matchmaking, transport and client shared by every game folder (see engine.py)
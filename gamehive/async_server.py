@@ -0,0 +1,350 @@
+import asyncio
+import socket
+import struct
+import time
+
+from gamehive.protocols import Protocols, REQUEST_NAMES
+from gamehive.codec import JSON, negotiate
+from gamehive.room_manager import RoomManager
+from gamehive.scheduler import AsyncBotScheduler
+from gamehive.transport import HEADER, frame
+from gamehive.metrics import from_env
+from gamehive.server import game_parser
+
+
+# Server on one event loop, hosts every game type in games the same way
+class AsyncServer:
+	def __init__(self, games, host = '127.0.0.1', port = 62743, users = 2, bots = 0, metrics = None, log_dir = None, record_dir = None):
+		self.games = games
+		self.host = host
+		self.port = port
+		self.users = users
+		self.bots = bots
+		# total players = users + bots
+
+		self.server = None		# asyncio.Server, created in serve()
+		self.clients = set()		# connected writers
+		self.codecs = {}		# writer -> wire codec agreed at the NICKNAME handshake (json by default)
+		self.traffic = {}		# writer -> [bytes in, bytes out, "host:port"]
+		self.metrics = from_env() if metrics is None else metrics		# NullMetrics unless enabled
+		self.metrics.register(self.collect)
+		self.rooms = RoomManager(games, self.users, self.bots, metrics = self.metrics, log_dir = log_dir, record_dir = record_dir)		# matchmaking queue + every active room
+		self.scheduler = AsyncBotScheduler(self.rooms)		# plays the bot seats as timers on the loop
+
+		# notifications instead of polling
+		self.dirty = set()		# room_ids with state the clients haven't been sent yet
+		self.changed = None		# asyncio.Event, wakes the broadcaster (serve) when a room turns dirty
+		self.rooms.on_change = self.mark_dirty		# accepted moves (players + bots), resyncs
+		self.offer = list(dict.fromkeys(name for game in games for name in game.codecs))		# codecs of every hosted game, in order
+
+		# outbound bounds per client, past either one the client is disconnected
+		self.send_limit = 1 << 20		# bytes buffered on the transport
+		self.send_lag = 5.0		# seconds a client may take to drain its buffer
+		self.lagging = set()		# clients with a full buffer, catch_up waits for each
+
+		self.kill = False
+		self.tasks = set()		# one per connection (+ catch_up), gathered at shutdown
+
+
+	# buffers {r_type, data} for client, goes out with the next drain
+	def queue(self, r_type, data, client):
+		msg = frame(self.codecs.get(client, JSON).encode(r_type, data))
+		client.write(msg)
+		self.traffic[client][1] += len(msg)
+
+
+	# buffers a message many clients get (deltas, public views, results), framed once per codec in frames
+	def queue_shared(self, r_type, data, client, frames, key):
+		codec = self.codecs.get(client, JSON)
+		msg = frames.get((codec.name, key))
+		if msg is None:
+			msg = frames[(codec.name, key)] = frame(codec.encode(r_type, data))
+		client.write(msg)
+		self.traffic[client][1] += len(msg)
+
+
+	# sends {r_type, data} to client
+	async def send(self, r_type, data, client):
+		self.queue(r_type, data, client)
+		await client.drain()
+
+
+	# receive client requests
+	async def receive(self, reader, client):
+		try:
+			raw_len = await reader.readexactly(HEADER.size)		# unpack length from first 4 bytes
+			(length,) = HEADER.unpack(raw_len)
+			msg = await reader.readexactly(length)
+		except asyncio.IncompleteReadError:		# client closed the connection
+			return None
+		self.traffic[client][0] += HEADER.size + length
+
+		# decode safely
+		try:
+			return self.codecs.get(client, JSON).decode(msg)
+		except (ValueError, IndexError, struct.error) as e:
+			print("Decode error:", e)
+			print("Raw bytes:", msg)
+			return None
+
+
+	# fetch nickname and queue the client for matchmaking (returns False if the client left)
+	async def handle_login(self, reader, client):
+		while not self.kill:
+			await self.send(Protocols.Response.NICKNAME, self.offer, client)		# offer the wire codecs
+			msg = await self.receive(reader, client)		# capture client's nickname
+			if not msg:
+				return False
+			r_type, data = msg.get("type"), msg.get("data")
+			if r_type == Protocols.Request.SPECTATE:
+				return await self.handle_spectate(client, data)
+			if r_type == Protocols.Request.NICKNAME:
+				game = self.rooms.game(data.get("game") if isinstance(data, dict) else None)		# old clients: the default game
+				nickname, self.codecs[client] = negotiate(data, game.codecs)
+				break
+		else:
+			return False
+
+		room_id = self.rooms.enqueue(client, nickname, game.name)
+		if room_id is None:		# send clients to waiting lobby till a table fills up
+			print(f"Waiting Lobby ({game.name}) = {self.rooms.waiting(game.name)} Players")
+			await self.send(Protocols.Response.WAIT, None, client)		# inform client to wait
+		else:		# this arrival filled the table, release everyone seated at it
+			await self.start_room(room_id)
+		return True
+
+
+	# spectator login, data = {room (None = the game's newest), codec, game} (returns False if refused)
+	async def handle_spectate(self, client, data):
+		if not isinstance(data, dict) or not isinstance(data.get("room"), (int, type(None))):
+			await self.send(Protocols.Response.ERROR, "malformed spectate request", client)
+			return False
+		room_id = data.get("room")
+		game = self.rooms.game_types.get(room_id) or self.rooms.game(data.get("game"))		# a room's own game wins
+		_, self.codecs[client] = negotiate(data, game.codecs)
+		room_id = self.rooms.watch(client, room_id, game.name)
+		if room_id is None:		# no such room (yet), watches the next one
+			await self.send(Protocols.Response.WAIT, None, client)
+		else:
+			await self.send(Protocols.Response.START, self.rooms.names[room_id], client)
+			self.mark_dirty(room_id)		# snapshot of the public view
+		return True
+
+
+	# START to every player (and waiting spectator) of a new room, then its first GAME_STATE
+	async def start_room(self, room_id):
+		self.scheduler.wake(room_id)		# a bot may be first on turn
+		for member in self.rooms.members[room_id] + list(self.rooms.watchers[room_id]):
+			if member is not None:		# bot seats
+				self.queue(Protocols.Response.START, self.rooms.names[room_id], member)		# no drain, a slow member can't hold up the others
+		self.mark_dirty(room_id)
+
+
+	# room has something new for its clients, wake the broadcaster (rooms are only touched on the loop)
+	def mark_dirty(self, room_id):
+		self.dirty.add(room_id)
+		self.changed.set()
+
+
+	# handle client requests here
+	async def handle_receive(self, msg, client):
+		r_type, data = msg.get("type"), msg.get("data")
+		if r_type == Protocols.Request.MOVE:		# validate the move
+			room, player_id = self.rooms.route(client)
+			valid = room is not None and self.rooms.verify_move(room, player_id, data)
+			if not valid:
+				await self.send(Protocols.Response.MOVE_INVALID, None, client)
+			else:
+				self.scheduler.wake(self.rooms.seats[client][0])		# next seat may be a bot
+				await self.send(Protocols.Response.MOVE_VALID, None, client)
+		elif r_type == Protocols.Request.RESYNC:		# client missed a change, send a full snapshot next
+			self.rooms.resync(client)
+		elif r_type == Protocols.Request.NEW_GAME:		# player sent to waiting when new game requested
+			pass
+		elif r_type == Protocols.Request.LEAVE:		# game ends when someone leaves the server
+			pass
+
+
+	# let the client disconnect gracefully (remove details from everywhere)
+	def disconnect(self, client):
+		self.clients.discard(client)
+		self.codecs.pop(client, None)
+		self.traffic.pop(client, None)
+		self.lagging.discard(client)
+		room_id = self.rooms.remove(client)
+		if room_id is not None and not self.kill:		# a bot took the seat, it may be on turn
+			self.scheduler.wake(room_id)
+		client.close()
+
+
+	# track a task (the connection's own by default), gathered at shutdown
+	def track(self, task = None):
+		task = task or asyncio.current_task()
+		self.tasks.add(task)
+		task.add_done_callback(self.tasks.discard)
+
+
+	# track a new connection (its task, the current one by default, is gathered at shutdown)
+	def attach(self, client, task = None):
+		self.track(task)
+		client.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+		client.transport.set_write_buffer_limits(high = 0)		# drain() waits for an empty buffer (catch_up)
+		self.clients.add(client)
+		host, port = client.get_extra_info("peername")[:2]
+		self.traffic[client] = [0, 0, f"{host}:{port}"]
+
+
+	# handles one client connection (one task per socket)
+	async def handle_client(self, reader, client):
+		self.attach(client)
+		try:
+			if await self.handle_login(reader, client):
+				await self.serve_requests(reader, client)
+		except (ConnectionError, OSError):
+			self.metrics.inc("gamehive_socket_errors_total")
+		finally:		# whatever went wrong, the client leaves no entries behind
+			self.disconnect(client)
+
+
+	# requests of a logged-in client until it leaves
+	async def serve_requests(self, reader, client):
+		while not self.kill:
+			msg = await self.receive(reader, client)
+			if not msg:
+				break
+			start = time.perf_counter()
+			await self.handle_receive(msg, client)
+			self.metrics.observe("gamehive_request_seconds", time.perf_counter() - start, type = REQUEST_NAMES.get(msg.get("type"), "unknown"))
+
+
+	# True while the client's buffer still holds earlier messages: its state is held back (synced stays put) and
+	# catch_up sends one delta over everything it missed once the buffer empties, evicted past send_limit
+	def behind(self, room_id, client):
+		size = client.transport.get_write_buffer_size()
+		if not size:
+			return False
+		if size > self.send_limit:
+			self.evict(client)
+		elif client not in self.lagging:
+			self.lagging.add(client)
+			self.track(asyncio.create_task(self.catch_up(room_id, client)))
+		self.metrics.inc("gamehive_coalesced_states_total")
+		return True
+
+
+	# waits for a lagging client's buffer to empty (evicted after send_lag), then broadcasts the room to it again
+	async def catch_up(self, room_id, client):
+		try:
+			await asyncio.wait_for(client.drain(), self.send_lag)
+		except asyncio.TimeoutError:
+			self.evict(client)
+		except (ConnectionError, OSError):		# gone already, its own task disconnects it
+			pass
+		self.lagging.discard(client)
+		self.mark_dirty(room_id)
+
+
+	# client fell too far behind, drop the connection (buffer discarded): its task reads EOF and disconnects it
+	def evict(self, client):
+		print(f"Evicting {self.traffic.get(client, [None] * 3)[2]} (too slow)")
+		self.metrics.inc("gamehive_evicted_clients_total")
+		client.transport.abort()
+
+
+	# sends the room's changes to its players (private snapshots, shared deltas) and spectators (public view, framed once)
+	# only buffers (transports write on their own), clients still busy with an older state are skipped until they catch up
+	# returns True once RESULTS went out (finished is read first, a move ending the game mid-broadcast waits for the next wakeup)
+	async def broadcast(self, room_id, room, clients):
+		frames = {}		# (codec, key) -> framed message, everyone at the same version gets the same bytes
+		results = room.leaderboard() if self.rooms.over(room_id, room) else None
+		for i, client in enumerate(clients):
+			if client is None:		# disconnected
+				continue
+			if results is None and self.behind(room_id, client):
+				continue
+			try:
+				data = self.rooms.state_update(client, room, i)
+				if data is not None and "changes" in data:		# same deltas for everyone at the same version
+					self.queue_shared(Protocols.Response.GAME_STATE, data, client, frames, (data["base"], data["version"]))
+				elif data is not None:		# snapshot holds the player's hand (None: nothing to send during idle turns)
+					self.queue(Protocols.Response.GAME_STATE, data, client)
+				if results is not None:
+					self.queue_shared(Protocols.Response.RESULTS, results, client, frames, "results")
+			except OSError:		# if socket issue
+				self.metrics.inc("gamehive_socket_errors_total")
+		skip = set() if results is not None else {client for client in self.rooms.spectators(room_id) if self.behind(room_id, client)}
+		for data, watchers in self.rooms.public_updates(room_id, room, skip):
+			key = (data["base"], data["version"]) if "changes" in data else ("public", data["version"])
+			for client in watchers:
+				if client in self.traffic:		# still connected
+					self.queue_shared(Protocols.Response.GAME_STATE, data, client, frames, key)
+		if results is not None:		# to every spectator, one held back until now may have nothing new
+			for client in self.rooms.spectators(room_id):
+				if client in self.traffic:
+					self.queue_shared(Protocols.Response.RESULTS, results, client, frames, "results")
+		return results is not None
+
+
+	# gauges read when metrics are scraped
+	def collect(self):
+		yield "gamehive_connected_clients", {}, len(self.clients)
+		yield "gamehive_active_rooms", {}, len(self.rooms.rooms)
+		for name in self.rooms.games:
+			yield "gamehive_waiting_players", {"game": name}, self.rooms.waiting(name)
+		for bytes_in, bytes_out, address in list(self.traffic.values()):
+			yield "gamehive_client_bytes_in", {"client": address}, bytes_in
+			yield "gamehive_client_bytes_out", {"client": address}, bytes_out
+		for client in list(self.clients):
+			yield "gamehive_client_backlog_bytes", {"client": self.traffic.get(client, [None] * 3)[2]}, client.transport.get_write_buffer_size()
+
+
+	# one wakeup of the broadcaster, every dirty room gets its changes (returns the room_ids torn down)
+	async def broadcast_changes(self):
+		await self.changed.wait()		# an accepted move / resync / new room
+		self.changed.clear()
+		room_ids, self.dirty = self.dirty, set()
+		start = time.perf_counter()
+		closed = []
+		for room_id, room, clients in self.rooms.active_rooms(room_ids):
+			if await self.broadcast(room_id, room, clients):		# RESULTS went out, tear down (the server keeps running)
+				self.rooms.close_room(room_id)
+				closed.append(room_id)
+		self.metrics.observe("gamehive_broadcast_seconds", time.perf_counter() - start)		# serialize + send fan-out of the wakeup
+		return closed
+
+
+	# stop the bots, close every connection and wait for their tasks
+	async def shutdown(self):
+		self.kill = True
+		self.scheduler.stop()
+		for client in list(self.clients):
+			client.close()
+		await asyncio.gather(*self.tasks, return_exceptions = True)		# every connection task sees its socket closed
+		self.rooms.close()		# finished games still being written
+		print("Server killed")
+
+
+	# main coroutine, sends game state changes to the clients of a room as soon as it changes
+	async def serve(self):
+		self.changed = asyncio.Event()
+		self.server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address = True, backlog = 1024)
+		print("Server created")
+		self.scheduler.start()
+		try:
+			async with self.server:
+				while True:
+					await self.broadcast_changes()
+		finally:
+			await self.shutdown()
+
+
+	def run(self):
+		try:
+			asyncio.run(self.serve())
+		except KeyboardInterrupt:		# Ctrl + C to shutdown server
+			pass
+
+
+if __name__ == "__main__":
+	args = game_parser("host one or more games on a single listener (one event loop)").parse_args()
+	AsyncServer(args.games, args.host, args.port, args.users, args.bots).run()
@@ -0,0 +1,164 @@
+import socket
+import threading
+import struct
+import importlib
+
+from gamehive.protocols import Protocols
+from gamehive.codec import JSON
+from gamehive.transport import Transport
+
+
+# connection, handshake and main loop of a game's client, a game folder subclasses it with its own game_name, codecs and views
+class Client:
+	game_name = None		# GameType name asked for at the NICKNAME handshake (None: the server's default game)
+	codecs = {JSON.name: JSON}		# codec name -> codec the game's client speaks
+	views = {}		# --view name -> (module, class), imported only when picked (pygame is slow to load)
+
+	def __init__(self, host = '127.0.0.1', port = 62743, nickname = None, codec = "binary", view = "pygame", view_options = None, spectate = False, room = None):
+		self.host = host
+		self.port = port 
+		self.nickname = nickname
+		self.preferred_codec = codec		# asked for at the NICKNAME handshake if the server offers it
+		self.codec = JSON
+		self.view = view
+		self.view_options = view_options or {}
+		self.spectate = spectate		# watch a room instead of playing (public view)
+		self.room = room		# room to watch, None for the newest one
+
+		self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+		self.server.connect((self.host, self.port))
+		self.transport = Transport(self.server)		# buffered framing
+		print(f"Connected to server")
+
+		self.game = None		# created after the handshake, see run
+		self.started = False
+
+		self.kill = False
+		self.listener = None		# server_listener thread, joined by await_kill
+
+
+	# sends request r_type to server along with data
+	def send(self, r_type, data):
+		self.transport.send(self.codec.encode(r_type, data))
+
+
+	# receive client requests
+	def receive(self):
+		msg = self.transport.recv_frame()
+		if msg is None:
+			return None
+
+		# decode safely
+		try:
+			return self.codec.decode(msg)
+		except (ValueError, IndexError, struct.error) as e:
+			print("Decode error:", e)
+			print("Raw bytes:", bytes(msg))
+			return None
+
+
+	# handle server responses
+	def handle_receive(self, msg):
+		if not msg:
+			return
+		r_type, data = msg.get("type"), msg.get("data")
+
+		if r_type == Protocols.Response.GAME_STATE:
+			if not self.game.deserialize(data):
+				self.send(Protocols.Request.RESYNC, None)
+		elif r_type == Protocols.Response.MOVE_VALID:		# the prediction stands until the GAME_STATE carrying it
+			pass
+		elif r_type == Protocols.Response.MOVE_INVALID:		# undo the predicted move
+			self.game.rollback()
+		elif r_type == Protocols.Response.NICKNAME and self.spectate:
+			codec = self.preferred_codec if data and self.preferred_codec in data and self.preferred_codec in self.codecs else None
+			self.send(Protocols.Request.SPECTATE, {"room": self.room, "codec": codec, "game": self.game_name})
+			if codec:
+				self.codec = self.codecs[codec]
+		elif r_type == Protocols.Response.NICKNAME:		# data = codecs offered (None from older servers)
+			codec = self.preferred_codec if data and self.preferred_codec in data and self.preferred_codec in self.codecs else None
+			if data:
+				self.send(Protocols.Request.NICKNAME, {"nickname": self.nickname, "codec": codec, "game": self.game_name})
+				if codec:
+					self.codec = self.codecs[codec]		# everything after the reply uses the new codec
+			else:
+				self.send(Protocols.Request.NICKNAME, self.nickname)
+		elif r_type == Protocols.Response.START:
+			self.started = True
+			self.game.setup_game(data)
+		elif r_type == Protocols.Response.RESULTS:
+			self.game.update_results(data)
+			self.kill = True
+		elif r_type == Protocols.Response.ERROR:		# refused, the server hangs up
+			print("Server error:", data)
+			self.kill = True
+		# elif r_type == Protocols.Response.WAIT:		# means not started (covered under START)
+		# 	pass
+
+
+	# NICKNAME handshake, before any view is loaded (the server hears from us as soon as possible)
+	def login(self):
+		while True:
+			msg = self.receive()
+			if msg is None:
+				raise ConnectionError("server closed the connection during login")
+			if msg.get("type") == Protocols.Response.NICKNAME:
+				self.handle_receive(msg)
+				return
+
+
+	# view class by name, imports its module on first use
+	def load_view(self):
+		module, name = self.views[self.view]
+		return getattr(importlib.import_module(module), name)
+
+
+	# actively listening to server for responses (on thread)
+	def server_listener(self):
+		self.server.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+		while not self.kill:		# blocking reads, await_kill shuts the socket down to wake us
+			try:
+				msg = self.receive()
+			except OSError:		# socket shut down
+				break
+			if msg is None and self.transport.closed:		# server went away
+				break
+			self.handle_receive(msg)
+			self.game.notify()		# wake the render loop
+		self.kill = True
+		self.game.notify()
+
+
+	# awaiting all threads to kill themselves (only 1 thread here)
+	def await_kill(self):
+		self.kill = True
+		try:
+			self.server.shutdown(socket.SHUT_RDWR)
+		except OSError:		# already closed
+			pass
+		if self.listener is not None:
+			self.listener.join()
+		self.server.close()
+		print("Client killed")
+
+
+	# main loop which updates game state
+	def run(self):
+		self.login()
+		self.game = self.load_view()(**self.view_options)
+		self.listener = threading.Thread(target = self.server_listener)
+		self.listener.start()
+		try:
+			while not self.kill:
+				self.kill = self.game.handle_events() or self.kill		# sleeps until input / network update (returns kill switch)
+				move = self.game.draw(self.started)		# to render what changed (returns move made by the player)
+				if move and self.game.predict(move):		# legal: applied locally at once, illegal clicks never leave the client
+					self.send(Protocols.Request.MOVE, move)
+					self.game.notify()		# redraw with the move on the table
+			self.game.handle_end()		# when game over
+		except KeyboardInterrupt:
+			
+			pass
+		self.await_kill()
+
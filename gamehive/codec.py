@@ -0,0 +1,29 @@
+import json
+
+
+class JsonCodec:
+	name = "json"
+
+	# {r_type, data} -> bytes
+	def encode(self, r_type, data):
+		return json.dumps({"type": r_type, "data": data}).encode("utf-8")
+
+
+	# bytes (or a memoryview) -> {r_type, data}
+	def decode(self, msg):
+		msg = json.loads(str(msg, "utf-8"))
+		if not isinstance(msg, dict):
+			raise ValueError(f"message is not an object: {msg!r}")
+		return msg
+
+
+JSON = JsonCodec()		# every game speaks it, and every message before the handshake is json
+
+
+# server side of the handshake, NICKNAME reply is either the bare nickname (old clients) or {nickname, codec, game}
+# codecs: the chosen game's (GameType.codecs)
+def negotiate(data, codecs):
+	if isinstance(data, dict):
+		codec = data.get("codec")
+		return str(data.get("nickname")), codecs.get(codec, JSON) if isinstance(codec, str) else JSON
+	return str(data), JSON
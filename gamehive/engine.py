@@ -0,0 +1,110 @@
+import os
+import sys
+import importlib
+from abc import ABC, abstractmethod
+
+from gamehive.codec import JSON
+
+
+# what the core asks of a game's rules (the Room of a game folder), one instance per table
+# the servers never look inside the state: they relay moves, then broadcast what serialize_update returns
+class GameEngine(ABC):
+	num_players = 0
+	version = 0		# bumped by every accepted move, deltas are taken between versions
+	turn = None		# player_id on turn, bots are scheduled on it
+	finished = False
+	log = None		# GameType.move_log of the table (set by the RoomManager), None if not logging
+
+
+	@abstractmethod
+	def __init__(self, num_players, seed = None):
+		raise NotImplementedError
+
+
+	# deal / set up, once before the first move
+	@abstractmethod
+	def initialise_board(self):
+		raise NotImplementedError
+
+
+	# apply player_id's move if it is legal (returns whether it was)
+	@abstractmethod
+	def verify_move(self, player_id, move):
+		raise NotImplementedError
+
+
+	# the whole state as player_id sees it (None: the public view spectators get)
+	@abstractmethod
+	def serialize(self, player_id):
+		raise NotImplementedError
+
+
+	# {base, version, changes} since version `since`, a snapshot (serialize) if since is None, None if nothing changed
+	@abstractmethod
+	def serialize_update(self, player_id, since = None):
+		raise NotImplementedError
+
+
+	# moves player_id may make now, bots pick from these
+	@abstractmethod
+	def possible_moves(self, player_id):
+		raise NotImplementedError
+
+
+	# player_ids in finishing order, sent as RESULTS once finished
+	@abstractmethod
+	def leaderboard(self):
+		raise NotImplementedError
+
+
+# a game the servers can host: its engine, bot, wire codecs, and optionally move logs / finished game records
+class GameType:
+	def __init__(self, name, engine, bot = None, codecs = None, table_size = None, bots = None, move_log = None, recorder = None, store = None):
+		if getattr(engine, "__abstractmethods__", None):		# fail when the game folder is loaded, not mid-match
+			raise TypeError(f"{name}: engine {engine.__name__} does not implement {', '.join(sorted(engine.__abstractmethods__))}")
+		self.name = name		# picked by clients at the NICKNAME handshake
+		self.engine = engine		# GameEngine subclass
+		self.bot = bot		# bot class, bot(bot_id) with name / think_time() / move(state, moves), offload = True to run off the scheduler
+		self.codecs = codecs or {JSON.name: JSON}		# codec name -> codec, json always works
+		self.table_size = table_size		# players per table, None: the server's users
+		self.bots = bots		# bot seats per table, None: the server's bots
+		self.move_log = move_log		# move_log(path, num_players, seed) with append(move) / close(), None: no logs
+		self.recorder = recorder		# recorder(room, bots) with append(player_id, move) / set_bot(player_id) / finish(room) -> record
+		self.store = store		# store(directory) with append(records), finished games of this type
+
+
+GAMES = {}		# name -> GameType, every game imported into this process
+
+
+def register(game):
+	GAMES[game.name] = game
+	return game
+
+
+# folder of a module loaded from a game folder (one holding a game_type.py), None for any other module
+def game_folder(module):
+	path = getattr(module, "__file__", None)
+	if not path:
+		return None
+	folder = os.path.dirname(os.path.abspath(path))
+	return folder if os.path.isfile(os.path.join(folder, "game_type.py")) else None
+
+
+# imports a game folder's game_type.py and returns its GAME
+# game folders share module names (room, codec, utils, ...): other games' modules are set aside during the import and
+# this folder's are dropped from sys.modules after it (the loaded game keeps references to the ones it got)
+def load_game(folder):
+	folder = os.path.abspath(folder)
+	others = {name: module for name, module in sys.modules.items() if game_folder(module)}
+	for name in others:
+		del sys.modules[name]
+	sys.path.insert(0, folder)
+	try:
+		module = importlib.import_module("game_type")
+	finally:
+		sys.path.remove(folder)
+		for name, loaded in list(sys.modules.items()):
+			if game_folder(loaded) == folder:
+				del sys.modules[name]
+		sys.modules.update(others)
+	return module.GAME
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float("inf"))		# seconds
+
+
+# latency distribution over fixed buckets (prometheus style, cumulative when rendered)
+class Histogram:
+	def __init__(self, buckets = BUCKETS):
+		self.buckets = buckets
+		self.counts = [0] * len(buckets)
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+
+	def observe(self, value):
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+		self.max = max(self.max, value)
+
+
+	# upper bound of the bucket holding the q-th quantile
+	def quantile(self, q):
+		rank = q * self.count
+		seen = 0
+		for bound, n in zip(self.buckets, self.counts):
+			seen += n
+			if seen >= rank:
+				return min(bound, self.max)
+		return self.max
+
+
+# counters, histograms and gauge collectors of one server process
+class Metrics:
+	enabled = True
+
+	def __init__(self):
+		self.lock = threading.Lock()		# threaded Server observes from every client thread
+		self.counters = {}		# (name, labels) -> value
+		self.histograms = {}		# (name, labels) -> Histogram
+		self.collectors = []		# callables yielding (name, labels dict, value), read at scrape time (gauges)
+		self.started = time.time()
+
+
+	def inc(self, name, value = 1, **labels):
+		key = (name, tuple(sorted(labels.items())))
+		with self.lock:
+			self.counters[key] = self.counters.get(key, 0) + value
+
+
+	def observe(self, name, seconds, **labels):
+		key = (name, tuple(sorted(labels.items())))
+		with self.lock:
+			histogram = self.histograms.get(key)
+			if histogram is None:
+				histogram = self.histograms[key] = Histogram()
+			histogram.observe(seconds)
+
+
+	def register(self, collector):
+		self.collectors.append(collector)
+
+
+	def gauges(self):
+		return [(name, tuple(sorted(labels.items())), value) for collector in self.collectors for name, labels, value in collector()]
+
+
+	# prometheus text exposition format
+	def render(self):
+		lines = []
+		with self.lock:
+			counters = sorted(self.counters.items())
+			histograms = sorted((key, h.buckets, list(h.counts), h.sum, h.count) for key, h in self.histograms.items())		# copied, observers keep going
+
+		typed = set()
+		for (name, labels), value in counters:
+			if name not in typed:
+				lines.append(f"# TYPE {name} counter")
+				typed.add(name)
+			lines.append(f"{name}{format_labels(labels)} {value}")
+		for name, labels, value in self.gauges():
+			if name not in typed:
+				lines.append(f"# TYPE {name} gauge")
+				typed.add(name)
+			lines.append(f"{name}{format_labels(labels)} {value}")
+		for (name, labels), buckets, counts, total, count in histograms:
+			if name not in typed:
+				lines.append(f"# TYPE {name} histogram")
+				typed.add(name)
+			cumulative = 0
+			for bound, n in zip(buckets, counts):
+				cumulative += n
+				le = "+Inf" if bound == float("inf") else repr(bound)
+				lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+			lines.append(f"{name}_sum{format_labels(labels)} {total}")
+			lines.append(f"{name}_count{format_labels(labels)} {count}")
+		return "\n".join(lines) + "\n"
+
+
+	# everything as plain json (histograms summarised: count, sum, p50, p99, max)
+	def snapshot(self):
+		with self.lock:
+			counters = {f"{name}{format_labels(labels)}": value for (name, labels), value in self.counters.items()}
+			histograms = {f"{name}{format_labels(labels)}": {
+					"count": h.count,
+					"sum": h.sum,
+					"p50": h.quantile(0.5),
+					"p99": h.quantile(0.99),
+					"max": h.max,
+					} for (name, labels), h in self.histograms.items()}
+		gauges = {f"{name}{format_labels(labels)}": value for name, labels, value in self.gauges()}
+		return {"time": time.time(), "uptime": time.time() - self.started, "counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+	# GET /metrics (prometheus text) or /metrics.json on a local port (on thread)
+	def serve(self, port, host = '127.0.0.1'):
+		metrics = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				if self.path == "/metrics":
+					body, content_type = metrics.render().encode("utf-8"), "text/plain; version=0.0.4"
+				elif self.path == "/metrics.json":
+					body, content_type = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+				else:
+					self.send_error(404)
+					return
+				self.send_response(200)
+				self.send_header("Content-Type", content_type)
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):		# no line per scrape on stdout
+				pass
+
+		httpd = ThreadingHTTPServer((host, port), Handler)
+		threading.Thread(target = httpd.serve_forever, daemon = True).start()
+		print(f"Metrics on http://{host}:{port}/metrics")
+		return httpd
+
+
+	# rewrite a json snapshot to path every interval seconds (on thread)
+	def dump_every(self, path, interval = 10):
+		def dump():
+			while True:
+				time.sleep(interval)
+				with open(path + ".tmp", "w") as f:
+					json.dump(self.snapshot(), f, indent = 1)
+				os.replace(path + ".tmp", path)		# readers never see half a file
+		threading.Thread(target = dump, daemon = True).start()
+
+
+# stand-in when metrics are off, every call is a no-op
+class NullMetrics:
+	enabled = False
+
+	def inc(self, name, value = 1, **labels):
+		pass
+
+
+	def observe(self, name, seconds, **labels):
+		pass
+
+
+	def register(self, collector):
+		pass
+
+
+def format_labels(labels):
+	if not labels:
+		return ""
+	return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# Metrics if GAMEHIVE_METRICS_PORT and/or GAMEHIVE_METRICS_DUMP (json path) are set, NullMetrics otherwise
+def from_env():
+	port, path = os.environ.get("GAMEHIVE_METRICS_PORT"), os.environ.get("GAMEHIVE_METRICS_DUMP")
+	if not (port or path):
+		return NullMetrics()
+	metrics = Metrics()
+	if port:
+		metrics.serve(int(port))
+	if path:
+		metrics.dump_every(path, float(os.environ.get("GAMEHIVE_METRICS_INTERVAL", 10)))
+	return metrics
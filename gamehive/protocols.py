@@ -7,10 +7,17 @@ class Protocols:
 		MOVE_VALID = "protocols.move_valid"
 		MOVE_INVALID = "protocols.move_invalid"
 		RESULTS = "protocols.results"
+		ERROR = "protocols.error"		# request refused (data = reason), the server closes the connection after it
 
 	class Request:		# sent by client
 		NICKNAME = "protocols.send_nickname"
 		MOVE = "protocols.move"
 		NEW_GAME = "protocols.new_game"
 		LEAVE = "protocols.leave"
+		RESYNC = "protocols.resync"
+		SPECTATE = "protocols.spectate"		# instead of NICKNAME, watch a room (public view only)
+
+
+# request type -> short name (metrics labels)
+REQUEST_NAMES = {value: name.lower() for name, value in vars(Protocols.Request).items() if not name.startswith("__")}
 
@@ -0,0 +1,311 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from gamehive.metrics import NullMetrics
+
+
+# matchmaking + every active room of every hosted game type (gamehive.engine.GameType), one lobby queue per game
+class RoomManager:
+	def __init__(self, games, table_size = 2, bots = 0, bot_class = None, metrics = None, log_dir = None, record_dir = None):
+		self.games = {game.name: game for game in games}		# the first one is the default (clients that name no game)
+		self.default = games[0].name
+		self.table_size = table_size		# players seated per room (unless the game type says otherwise)
+		self.num_bots = bots		# bot seats added to every room (after the players)
+		self.bot_class = bot_class		# None: the game type's bot
+		self.metrics = metrics or NullMetrics()
+		self.log_dir = log_dir		# every room's seed + moves are logged under <log_dir>/<game> (GameType.move_log), None to disable
+		self.record_dir = record_dir		# finished games go to a store per game type under <record_dir>/<game>, None to disable
+		self.records = {}		# game name -> store, opened on its first finished game
+		self.writer = None		# one thread writing finished games (stores are single writer), off the lock and the event loop
+		self.recorders = {}		# room_id -> recorder of the game in play
+		self.lock = threading.Lock()		# threaded Server calls in from every client thread
+
+		self.queues = {name: deque() for name in self.games}		# game -> (client, nickname) waiting to be seated, in arrival order
+		self.rooms = {}			# room_id -> engine (GameEngine)
+		self.game_types = {}		# room_id -> GameType
+		self.members = {}		# room_id -> clients, index == player_id
+		self.names = {}			# room_id -> nicknames, index == player_id
+		self.seats = {}			# client -> (room_id, player_id)
+		self.synced = {}		# client -> room version it was last sent
+		self.bots = {}			# room_id -> {player_id: bot}, played by the server's BotScheduler
+		self.room_ids = {}		# Room -> room_id
+		self.abandoned = set()		# room_ids a player left that no bot can take over, closed at the next broadcast
+		self.watchers = {}		# room_id -> spectator clients
+		self.watching = {}		# spectator client -> room_id
+		self.idle_watchers = {name: [] for name in self.games}		# game -> spectators waiting for its next room
+		self.on_change = None		# called with a room_id when the room has something new to broadcast
+		self.next_room_id = 0
+		self.next_bot_id = 0
+
+
+	# hosted game type by name, the default one for None / unknown names
+	def game(self, name = None):
+		if not isinstance(name, str):		# None, or a malformed request
+			return self.games[self.default]
+		return self.games.get(name, self.games[self.default])
+
+
+	# players per table of the game type
+	def seats_per_table(self, game):
+		return game.table_size or self.table_size
+
+
+	# clients waiting for a table (of one game, or of all)
+	def waiting(self, name = None):
+		if name is None:
+			return sum(len(queue) for queue in self.queues.values())
+		return len(self.queues[name])
+
+
+	# matchmaking, queue a logged-in client for a game (returns room_id if this arrival filled a table)
+	def enqueue(self, client, nickname, name = None):
+		game = self.game(name)
+		with self.lock:
+			queue = self.queues[game.name]
+			queue.append((client, nickname))
+			if len(queue) < self.seats_per_table(game):
+				return None
+			return self.create_room([queue.popleft() for _ in range(self.seats_per_table(game))], game.name)
+
+
+	# setup the gaming env for the seated players
+	def create_room(self, players, name = None):
+		game = self.game(name)
+		room_id = self.next_room_id
+		self.next_room_id += 1
+
+		bots = {}
+		bot_class = self.bot_class or game.bot
+		for player_id in range(len(players), len(players) + (self.num_bots if game.bots is None else game.bots)):
+			bots[player_id] = bot_class(self.next_bot_id)
+			self.next_bot_id += 1
+
+		seed = random.getrandbits(63)		# logged, the deal can be replayed
+		room = game.engine(len(players) + len(bots), seed = seed)
+		room.initialise_board()
+		if self.log_dir and game.move_log is not None:
+			log_dir = os.path.join(self.log_dir, game.name)
+			os.makedirs(log_dir, exist_ok = True)
+			room.log = game.move_log(os.path.join(log_dir, f"{int(time.time())}_{room_id}_{seed}.ghml"), room.num_players, seed)
+		if self.record_dir and game.recorder is not None:
+			self.recorders[room_id] = game.recorder(room, bots)
+		self.rooms[room_id] = room
+		self.game_types[room_id] = game
+		self.room_ids[room] = room_id
+		self.bots[room_id] = bots
+		self.members[room_id] = [client for client, _ in players] + [None] * len(bots)		# bots have no socket
+		self.names[room_id] = [nickname for _, nickname in players] + [bot.name for bot in bots.values()]
+		for player_id, (client, _) in enumerate(players):
+			self.seats[client] = (room_id, player_id)
+		self.watchers[room_id] = set(self.idle_watchers[game.name])
+		for client in self.idle_watchers[game.name]:
+			self.watching[client] = room_id
+		self.idle_watchers[game.name] = []
+		print(f"Room {room_id} ({game.name}) created ({len(self.rooms)} active)")
+		return room_id
+
+
+	# returns (room, player_id) the client is seated at, (None, None) if not seated
+	def route(self, client):
+		seat = self.seats.get(client)
+		if seat is None:
+			return None, None
+		room_id, player_id = seat
+		return self.rooms[room_id], player_id
+
+
+	# spectate a room (the game's newest one if room_id is None), returns the room_id or None if waiting for the game's next room
+	def watch(self, client, room_id = None, name = None):
+		game = self.game(name)
+		with self.lock:
+			if room_id is None:
+				room_id = max((i for i, room_game in self.game_types.items() if room_game is game), default = None)
+			if room_id not in self.rooms:
+				self.idle_watchers[game.name].append(client)
+				return None
+			self.watchers[room_id].add(client)
+			self.watching[client] = room_id
+			return room_id
+
+
+	# GAME_STATE payloads for the room's spectators, [(data, clients)] grouped by the version they were last sent
+	def public_updates(self, room_id, room, skip = ()):
+		groups = {}
+		with self.lock:
+			for client in self.watchers.get(room_id, ()):
+				if client in skip:		# held back this round, stays at its version
+					continue
+				groups.setdefault(self.synced.get(client), []).append(client)
+			updates = [(room.serialize_update(None, since), clients) for since, clients in groups.items()]
+		for data, clients in updates:
+			if data is not None:
+				for client in clients:
+					self.synced[client] = data["version"]
+		return [(data, clients) for data, clients in updates if data is not None]
+
+
+	# the room's spectators right now (a copy, clients come and go from their own threads)
+	def spectators(self, room_id):
+		with self.lock:
+			return list(self.watchers.get(room_id, ()))
+
+
+	# (room, player_id, bot) if a bot is on turn in the room, else None
+	def bot_on_turn(self, room_id):
+		with self.lock:
+			room = self.rooms.get(room_id)
+			if room is None or room.finished:
+				return None
+			bot = self.bots.get(room_id, {}).get(room.turn)
+			if bot is None:
+				return None
+			return room, room.turn, bot
+
+
+	# (player_id, bot, state, moves) for the bot on turn if the room is still at version, else None
+	# (one consistent view: client threads apply moves under the same lock)
+	def bot_turn(self, room_id, version):
+		with self.lock:
+			room = self.rooms.get(room_id)
+			if room is None or room.finished or room.version != version:
+				return None
+			bot = self.bots.get(room_id, {}).get(room.turn)
+			if bot is None:
+				return None
+			return room.turn, bot, room.serialize(room.turn), room.possible_moves(room.turn)
+
+
+	# apply a player's or bot's move, serialised since bots move from the scheduler thread
+	def verify_move(self, room, player_id, move):
+		with self.lock:
+			room_id = self.room_ids.get(room)
+			start = time.perf_counter()
+			valid = room.verify_move(player_id, move)
+			self.metrics.observe("gamehive_verify_move_seconds", time.perf_counter() - start)
+			recorder = self.recorders.get(room_id)
+			if valid and recorder is not None:
+				recorder.append(player_id, move)
+		if valid:
+			self.changed(room_id)
+		return valid
+
+
+	# GAME_STATE payload for the client, delta since its last sync (None if nothing changed)
+	def state_update(self, client, room, player_id):
+		with self.lock:		# never serialize a room halfway through a move
+			data = room.serialize_update(player_id, self.synced.get(client))
+		if data is not None:
+			self.synced[client] = data["version"]
+		return data
+
+
+	# state from an older version the client still holds (its newer updates were never sent, see QueuedTransport)
+	def rebase(self, client, room, player_id, since):
+		with self.lock:
+			data = room.serialize_update(player_id, since)
+		self.synced[client] = data["version"]
+		return data
+
+
+	# client lost track of its room, next update will be a full snapshot
+	def resync(self, client):
+		self.synced.pop(client, None)
+		self.changed(self.seats.get(client, (self.watching.get(client),))[0])
+
+
+	# wake the server's broadcaster for the room
+	def changed(self, room_id):
+		if room_id is not None and self.on_change is not None:
+			self.on_change(room_id)
+
+
+	# snapshot of (room_id, room, clients) for the broadcast loop, every room or only the given ones still open
+	def active_rooms(self, room_ids = None):
+		with self.lock:
+			if room_ids is None:
+				room_ids = list(self.rooms)
+			return [(room_id, self.rooms[room_id], self.members[room_id]) for room_id in room_ids if room_id in self.rooms]
+
+
+	# tear down a room, its clients stay connected but are no longer seated
+	def close_room(self, room_id):
+		with self.lock:
+			room = self.rooms.pop(room_id, None)
+			game = self.game_types.pop(room_id, None)
+			self.room_ids.pop(room, None)
+			self.abandoned.discard(room_id)
+			recorder = self.recorders.pop(room_id, None)
+			record = recorder.finish(room) if recorder is not None and room.finished else None		# abandoned games aren't recorded
+			self.names.pop(room_id, None)
+			self.bots.pop(room_id, None)
+			for client in self.members.pop(room_id, []):
+				self.seats.pop(client, None)
+				self.synced.pop(client, None)
+			for client in self.watchers.pop(room_id, ()):
+				self.watching.pop(client, None)
+				self.synced.pop(client, None)
+		if room is not None and room.log is not None:
+			room.log.close()
+		if record is not None:
+			if self.writer is None:
+				self.writer = ThreadPoolExecutor(1)
+			self.writer.submit(self.save, game, record)
+		print(f"Room {room_id} closed ({len(self.rooms)} active)")
+
+
+	# a finished game into its game type's store, opened on first use (on the writer thread)
+	def save(self, game, record):
+		if game.name not in self.records:
+			self.records[game.name] = game.store(os.path.join(self.record_dir, game.name))
+		self.records[game.name].append([record])
+
+
+	# True once the room's RESULTS are due: its game is over, or it was abandoned
+	def over(self, room_id, room):
+		return room.finished or room_id in self.abandoned
+
+
+	# waits for the queued record writes, closes the stores (server shutdown)
+	def close(self):
+		if self.writer is not None:
+			self.writer.shutdown(wait = True)
+		for store in self.records.values():
+			store.close()
+
+
+	# forget a disconnected client, a seat it held goes to a bot (engines have no notion of leaving)
+	# returns the room_id whose seat changed hands (the scheduler has to wake for it), None otherwise
+	def remove(self, client):
+		with self.lock:
+			for name, queue in self.queues.items():
+				self.queues[name] = deque(entry for entry in queue if entry[0] is not client)
+			self.synced.pop(client, None)
+			for watchers in self.idle_watchers.values():
+				if client in watchers:
+					watchers.remove(client)
+			room_id = self.watching.pop(client, None)
+			if room_id in self.watchers:
+				self.watchers[room_id].discard(client)
+			seat = self.seats.pop(client, None)
+			if seat is None or seat[0] not in self.members:
+				return None
+			room_id, player_id = seat
+			self.members[room_id][player_id] = None
+			if self.rooms[room_id].finished:
+				return None
+			bot_class = self.bot_class or self.game_types[room_id].bot
+			if bot_class is None:		# nobody can play on, the others get RESULTS as they stand
+				self.abandoned.add(room_id)
+			else:
+				self.bots[room_id][player_id] = bot = bot_class(self.next_bot_id)
+				self.next_bot_id += 1
+				print(f"Room {room_id}: {self.names[room_id][player_id]} left, {bot.name} takes over")
+				recorder = self.recorders.get(room_id)
+				if recorder is not None:		# its moves from here on are the bot's
+					recorder.set_bot(player_id)
+		self.changed(room_id)
+		return room_id
@@ -0,0 +1,116 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# plays bot seats of every room, a bot's "thinking" is a scheduled wakeup, not a sleeping thread
+class BotScheduler:
+	def __init__(self, rooms, workers = 4):
+		self.rooms = rooms		# RoomManager
+		self.pool = ThreadPoolExecutor(workers)		# expensive bots (bot.offload) compute here
+		self.pending = set()		# (room_id, version) already scheduled
+
+		# timer heap, drained by one thread
+		self.heap = []		# (wakeup time, seq, room_id, version)
+		self.seq = itertools.count()
+		self.cond = threading.Condition()
+		self.thread = None
+		self.kill = False
+
+
+	# call after a room is created or a move is accepted, schedules the bot on turn (if any)
+	def wake(self, room_id):
+		seat = self.rooms.bot_on_turn(room_id)
+		if seat is None:
+			return
+		room, player_id, bot = seat
+		key = (room_id, room.version)
+		if key in self.pending:
+			return
+		self.pending.add(key)
+		self.schedule(bot.think_time(), room_id, room.version)
+
+
+	def schedule(self, delay, room_id, version):
+		with self.cond:
+			heapq.heappush(self.heap, (time.monotonic() + delay, next(self.seq), room_id, version))
+			self.cond.notify()
+
+
+	# bot's wakeup, skipped if the room moved on or closed meanwhile
+	def play(self, room_id, version):
+		self.pending.discard((room_id, version))
+		turn = self.rooms.bot_turn(room_id, version)
+		if turn is None:
+			return
+		player_id, bot, state, available_moves = turn
+		if getattr(bot, "offload", False):
+			self.pool.submit(self.offloaded, room_id, version, player_id, bot, state, available_moves)
+		else:
+			self.finish(room_id, version, player_id, bot.move(state, available_moves))
+
+
+	def offloaded(self, room_id, version, player_id, bot, state, available_moves):
+		self.finish(room_id, version, player_id, bot.move(state, available_moves))
+
+
+	# apply the bot's move, then the next bot (if any) starts thinking
+	def finish(self, room_id, version, player_id, move):
+		room = self.rooms.rooms.get(room_id)
+		if room is None or room.version != version:
+			return
+		self.rooms.verify_move(room, player_id, move or "PASS")
+		self.wake(room_id)
+
+
+	# timer thread, sleeps until the earliest wakeup
+	def run(self):
+		while True:
+			with self.cond:
+				while not self.kill and (not self.heap or self.heap[0][0] > time.monotonic()):
+					self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+				if self.kill:
+					return
+				_, _, room_id, version = heapq.heappop(self.heap)
+			self.play(room_id, version)
+
+
+	def start(self):
+		self.thread = threading.Thread(target = self.run)
+		self.thread.start()
+
+
+	def stop(self):
+		with self.cond:
+			self.kill = True
+			self.cond.notify()
+		if self.thread:
+			self.thread.join()
+		self.pool.shutdown(wait = False, cancel_futures = True)
+
+
+# same scheduling on an asyncio loop (call_later instead of the timer thread)
+class AsyncBotScheduler(BotScheduler):
+	def __init__(self, rooms, workers = 4):
+		super().__init__(rooms, workers)
+		self.loop = None
+
+
+	def schedule(self, delay, room_id, version):
+		self.loop.call_later(delay, self.play, room_id, version)
+
+
+	def offloaded(self, room_id, version, player_id, bot, state, available_moves):
+		move = bot.move(state, available_moves)
+		self.loop.call_soon_threadsafe(self.finish, room_id, version, player_id, move)		# rooms are only touched on the loop
+
+
+	def start(self):
+		self.loop = asyncio.get_running_loop()
+
+
+	def stop(self):
+		self.pool.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,368 @@
+import socket
+import argparse
+import threading
+import struct
+import time
+
+from gamehive.protocols import Protocols, REQUEST_NAMES
+from gamehive.codec import JSON, negotiate
+from gamehive.engine import load_game
+from gamehive.room_manager import RoomManager
+from gamehive.scheduler import BotScheduler
+from gamehive.transport import QueuedTransport
+from gamehive.metrics import from_env
+
+
+# hosts every game type in games (gamehive.engine.GameType) on one listener, clients pick one at the NICKNAME handshake
+class Server:
+	def __init__(self, games, host = '127.0.0.1', port = 62743, users = 2, bots = 0, metrics = None, log_dir = None, record_dir = None):
+		self.games = games
+		self.host = host
+		self.port = port 
+		self.users = users
+		self.bots = bots
+		# total players = users + bots
+
+		self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, True)
+		self.server.bind((self.host, self.port))
+		print("Server created")
+
+		self.clients = set()		# connected sockets
+		self.codecs = {}		# client -> wire codec agreed at the NICKNAME handshake (json by default)
+		self.transports = {}		# client -> QueuedTransport (buffered framing, own writer thread)
+		self.addresses = {}		# client -> "host:port" (metrics label)
+		self.metrics = from_env() if metrics is None else metrics		# NullMetrics unless enabled
+		self.metrics.register(self.collect)
+		self.rooms = RoomManager(games, self.users, self.bots, metrics = self.metrics, log_dir = log_dir, record_dir = record_dir)		# matchmaking queue + every active room
+		self.scheduler = BotScheduler(self.rooms)		# plays the bot seats, one timer thread for all rooms
+
+		# notifications instead of polling
+		self.dirty = set()		# room_ids with state the clients haven't been sent yet
+		self.changed = threading.Condition()		# wakes the broadcaster (run) when a room turns dirty
+		self.lobby = threading.Condition()		# wakes the waiting lobby when a table fills up
+		self.rooms.on_change = self.mark_dirty		# accepted moves (players + bots), resyncs
+		self.offer = list(dict.fromkeys(name for game in games for name in game.codecs))		# codecs of every hosted game, in order
+
+		# outbound bounds per client, past either one the client is disconnected
+		self.send_limit = 1 << 20		# bytes queued + in flight
+		self.send_lag = 5.0		# seconds a single write may stay blocked
+
+		self.kill = False
+		self.threads = []		# listener + one per client, joined at shutdown
+
+
+	# queues {r_type, data} for client, goes out with the next flush
+	def queue(self, r_type, data, client):
+		self.transports[client].queue(self.codecs.get(client, JSON).encode(r_type, data))
+
+
+	# queues a message many clients get (deltas, public views, results), encoded once per codec in frames
+	def queue_shared(self, r_type, data, client, frames, key):
+		codec = self.codecs.get(client, JSON)
+		msg = frames.get((codec.name, key))
+		if msg is None:
+			msg = frames[(codec.name, key)] = codec.encode(r_type, data)
+		self.transports[client].queue(msg)
+
+
+	# queues a GAME_STATE (deltas shared like queue_shared, key None for private snapshots)
+	# a client still holding an unsent one gets a single state from that one's base instead
+	def queue_state(self, data, client, room, player_id, frames, key):
+		codec = self.codecs.get(client, JSON)
+		msg = frames.get((codec.name, key)) if key is not None else None
+		if msg is None:
+			msg = codec.encode(Protocols.Response.GAME_STATE, data)
+			if key is not None:
+				frames[(codec.name, key)] = msg
+		rebuild = lambda base: codec.encode(Protocols.Response.GAME_STATE, self.rooms.rebase(client, room, player_id, base))
+		if self.transports[client].queue_state(msg, data.get("base"), rebuild):
+			self.metrics.inc("gamehive_coalesced_states_total")
+
+
+	# sends {r_type, data} to client
+	def send(self, r_type, data, client):
+		self.queue(r_type, data, client)
+		self.transports[client].flush()
+
+
+	# receive client requests
+	def receive(self, client):
+		msg = self.transports[client].recv_frame()
+		if msg is None:
+			return None
+
+		# decode safely
+		try:
+			return self.codecs.get(client, JSON).decode(msg)
+		except (ValueError, IndexError, struct.error) as e:
+			print("Decode error:", e)
+			print("Raw bytes:", bytes(msg))
+			return None
+
+
+	# fetch nicknames and login details
+	def handle_login(self, client):
+		while not self.kill:
+			self.send(Protocols.Response.NICKNAME, self.offer, client)		# offer the wire codecs
+			msg = self.receive(client)		# capture client's nickname
+			if not msg:
+				return False
+			r_type, data = msg.get("type"), msg.get("data")
+
+			if r_type == Protocols.Request.SPECTATE:
+				return self.handle_spectate(client, data)
+			if r_type != Protocols.Request.NICKNAME:
+				continue
+			game = self.rooms.game(data.get("game") if isinstance(data, dict) else None)		# old clients: the default game
+			nickname, self.codecs[client] = negotiate(data, game.codecs)
+
+			with self.lobby:		# WAIT goes out before anyone can send this client START
+				room_id = self.rooms.enqueue(client, nickname, game.name)
+				if room_id is None:		# send clients to waiting lobby till a table fills up
+					print(f"Waiting Lobby ({game.name}) = {self.rooms.waiting(game.name)} Players")
+					self.send(Protocols.Response.WAIT, None, client)		# inform client to wait
+			if room_id is not None:		# this arrival filled the table, release everyone seated at it
+				self.start_room(room_id)
+			return True
+		return False
+
+
+	# spectator login, data = {room (None = the game's newest), codec, game} (returns False if refused)
+	def handle_spectate(self, client, data):
+		if not isinstance(data, dict) or not isinstance(data.get("room"), (int, type(None))):
+			self.send(Protocols.Response.ERROR, "malformed spectate request", client)
+			return False
+		room_id = data.get("room")
+		game = self.rooms.game_types.get(room_id) or self.rooms.game(data.get("game"))		# a room's own game wins
+		_, self.codecs[client] = negotiate(data, game.codecs)
+		with self.lobby:
+			room_id = self.rooms.watch(client, room_id, game.name)
+			if room_id is None:		# no such room (yet), watches the next one
+				self.send(Protocols.Response.WAIT, None, client)
+			else:
+				self.send(Protocols.Response.START, self.rooms.names[room_id], client)
+		if room_id is not None:
+			self.mark_dirty(room_id)		# snapshot of the public view
+		return True
+
+
+	# START to every player (and waiting spectator) of a new room, then its first GAME_STATE
+	def start_room(self, room_id):
+		with self.lobby:
+			for member in self.rooms.members[room_id] + list(self.rooms.watchers[room_id]):
+				if member is not None:		# bot seats
+					try:
+						self.send(Protocols.Response.START, self.rooms.names[room_id], member)
+					except (OSError, KeyError):		# left while waiting
+						self.metrics.inc("gamehive_socket_errors_total")
+			self.lobby.notify_all()
+		self.mark_dirty(room_id)
+		self.scheduler.wake(room_id)		# a bot may be first on turn
+
+
+	# let the clients sleep in the waiting lobby (until seated, or watching)
+	def waiting_lobby(self, client):
+		with self.lobby:
+			self.lobby.wait_for(lambda: self.kill or client in self.rooms.seats or client in self.rooms.watching)
+
+
+	# room has something new for its clients, wake the broadcaster
+	def mark_dirty(self, room_id):
+		with self.changed:
+			self.dirty.add(room_id)
+			self.changed.notify()
+
+
+	# handle client requests here
+	def handle_receive(self, msg, client):
+		if not msg:
+			return
+		r_type, data = msg.get("type"), msg.get("data")
+		if r_type == Protocols.Request.MOVE:		# validate the move in the client's own room
+			room, player_id = self.rooms.route(client)
+			valid = room is not None and self.rooms.verify_move(room, player_id, data)
+			if not valid:
+				self.send(Protocols.Response.MOVE_INVALID, None, client)
+			else:
+				self.scheduler.wake(self.rooms.seats.get(client, (None,))[0])		# next seat may be a bot
+				self.send(Protocols.Response.MOVE_VALID, None, client)
+		elif r_type == Protocols.Request.RESYNC:		# client missed a change, send a full snapshot next
+			self.rooms.resync(client)
+		elif r_type == Protocols.Request.NEW_GAME:		# player sent to waiting when new game requested
+			pass
+		elif r_type == Protocols.Request.LEAVE:		# game ends when someone leaves the server
+			pass
+
+
+	# let the client disconnect gracefully (remove details from everywhere)
+	def disconnect(self, client):
+		self.clients.discard(client)
+		self.codecs.pop(client, None)
+		transport = self.transports.pop(client, None)
+		if transport is not None:
+			transport.close()		# writer thread exits
+		self.addresses.pop(client, None)
+		room_id = self.rooms.remove(client)
+		if room_id is not None and not self.kill:		# a bot took the seat, it may be on turn
+			self.scheduler.wake(room_id)
+		client.close()
+
+
+	# handles client connection (on thread)
+	def handle_client(self, client):
+		try:
+			client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+			try:
+				logged_in = self.handle_login(client)
+			except OSError:
+				logged_in = False
+			if logged_in:
+				self.waiting_lobby(client)
+			while logged_in and not self.kill:		# blocking reads, await_kill shuts the socket down to wake us
+				try:
+					msg = self.receive(client)
+					if msg is None:		# client closed the connection
+						break
+					start = time.perf_counter()
+					self.handle_receive(msg, client)
+					self.metrics.observe("gamehive_request_seconds", time.perf_counter() - start, type = REQUEST_NAMES.get(msg.get("type"), "unknown"))
+				except OSError:
+					if not self.kill:
+						self.metrics.inc("gamehive_socket_errors_total")
+					break
+		finally:		# whatever went wrong, the client leaves no entries behind
+			self.disconnect(client)
+
+
+	# listens for client connections (on thread)
+	def connection_listener(self):
+		self.server.listen()
+		while not self.kill:
+			try:
+				client, address = self.server.accept()
+			except OSError:		# listening socket shut down by await_kill
+				break
+			print(f"Connected with {str(address)}")
+			self.clients.add(client)
+			self.transports[client] = QueuedTransport(client, self.send_limit, self.send_lag, lambda client = client: self.evict(client))
+			self.addresses[client] = f"{address[0]}:{address[1]}"
+			self.spawn(self.handle_client, client)
+
+
+	# client fell too far behind (backlog or blocked write), shut its socket: the client's thread sees it and disconnects
+	def evict(self, client):
+		print(f"Evicting {self.addresses.get(client)} (too slow)")
+		self.metrics.inc("gamehive_evicted_clients_total")
+		try:
+			client.shutdown(socket.SHUT_RDWR)
+		except OSError:		# already gone
+			pass
+
+
+	# starts a thread that await_kill joins
+	def spawn(self, target, *args):
+		thread = threading.Thread(target = target, args = args)
+		self.threads = [t for t in self.threads if t.is_alive()] + [thread]
+		thread.start()
+
+
+	# gauges read when metrics are scraped
+	def collect(self):
+		yield "gamehive_connected_clients", {}, len(self.clients)
+		yield "gamehive_active_rooms", {}, len(self.rooms.rooms)
+		for name in self.rooms.games:
+			yield "gamehive_waiting_players", {"game": name}, self.rooms.waiting(name)
+		for client, transport in list(self.transports.items()):
+			address = self.addresses.get(client)
+			yield "gamehive_client_bytes_in", {"client": address}, transport.bytes_in
+			yield "gamehive_client_bytes_out", {"client": address}, transport.bytes_out
+			yield "gamehive_client_backlog_bytes", {"client": address}, transport.pending()
+
+
+	# awaiting all threads to kill themselves
+	def await_kill(self):
+		self.kill = True 
+		self.scheduler.stop()
+		with self.lobby:
+			self.lobby.notify_all()
+		for sock in [self.server] + list(self.clients):		# wakes blocking accept / recv
+			try:
+				sock.shutdown(socket.SHUT_RDWR)
+			except OSError:		# already closed
+				pass
+		for thread in self.threads:
+			thread.join()
+		self.server.close()
+		self.rooms.close()		# finished games still being written
+		print("Server killed")		# all threads killed too
+
+
+	# sends the room's changes to its players (private snapshots, shared deltas) and spectators (public view, encoded once)
+	# returns True once RESULTS went out (finished is read first, a move ending the game mid-broadcast waits for the next wakeup)
+	def broadcast(self, room_id, room, clients):
+		frames = {}		# (codec, key) -> encoded message, everyone at the same version gets the same bytes
+		results = room.leaderboard() if self.rooms.over(room_id, room) else None
+		for i, client in enumerate(clients):
+			if client is None:		# disconnected
+				continue
+			try:
+				data = self.rooms.state_update(client, room, i)
+				if data is not None:		# None: nothing to send during idle turns
+					key = (data["base"], data["version"]) if "changes" in data else None		# snapshots hold the player's hand
+					self.queue_state(data, client, room, i, frames, key)
+				if results is not None:
+					self.queue_shared(Protocols.Response.RESULTS, results, client, frames, "results")
+				self.transports[client].flush()		# hands the frames to the client's writer, never blocks
+			except (OSError, KeyError):		# socket issue / client just disconnected
+				self.metrics.inc("gamehive_socket_errors_total")
+		for data, watchers in self.rooms.public_updates(room_id, room):
+			key = (data["base"], data["version"]) if "changes" in data else ("public", data["version"])
+			for client in watchers:
+				try:
+					self.queue_state(data, client, room, None, frames, key)
+				except (OSError, KeyError):
+					self.metrics.inc("gamehive_socket_errors_total")
+		for client in self.rooms.spectators(room_id):		# RESULTS for all, a coalesced state may already have brought one to the end
+			try:
+				if results is not None:
+					self.queue_shared(Protocols.Response.RESULTS, results, client, frames, "results")
+				self.transports[client].flush()
+			except (OSError, KeyError):
+				self.metrics.inc("gamehive_socket_errors_total")
+		return results is not None
+
+
+	# main loop, sends game state changes to the clients of a room as soon as it changes
+	def run(self):
+		self.spawn(self.connection_listener)		# spawns to listen for connections
+		self.scheduler.start()
+		try:
+			while True:
+				with self.changed:
+					self.changed.wait_for(lambda: self.dirty)		# an accepted move / resync / new room
+					room_ids, self.dirty = self.dirty, set()
+				start = time.perf_counter()
+				for room_id, room, clients in self.rooms.active_rooms(room_ids):
+					if self.broadcast(room_id, room, clients):		# RESULTS went out, tear down (the server keeps running)
+						self.rooms.close_room(room_id)
+				self.metrics.observe("gamehive_broadcast_seconds", time.perf_counter() - start)		# serialize + send fan-out of the wakeup
+		except KeyboardInterrupt:		# Ctrl + C to shutdown server
+			pass
+		self.await_kill()				
+
+
+# command line of the core servers, the games are folders holding a game_type.py: python -m gamehive.server "Badam Satti" [more folders]
+def game_parser(description):
+	parser = argparse.ArgumentParser(description = description)
+	parser.add_argument("games", nargs = "+", type = load_game, help = "game folders, the first one is the default")
+	parser.add_argument("--host", default = "0.0.0.0")
+	parser.add_argument("--port", type = int, default = 62743)
+	parser.add_argument("--users", type = int, default = 2, help = "players per table (unless the game sets its own)")
+	parser.add_argument("--bots", type = int, default = 0, help = "bot seats per table (unless the game sets its own)")
+	return parser
+
+
+if __name__ == "__main__":
+	args = game_parser("host one or more games on a single listener (one thread per connection)").parse_args()
+	Server(args.games, args.host, args.port, args.users, args.bots).run()
\ No newline at end of file
@@ -0,0 +1,266 @@
+import os
+import json
+import socket
+import asyncio
+import multiprocessing
+from collections import deque
+
+from gamehive.protocols import Protocols
+from gamehive.codec import JSON, negotiate
+from gamehive.async_server import AsyncServer
+from gamehive.server import game_parser
+from gamehive.metrics import from_env
+
+
+# one worker process, owns the rooms handed to it (an AsyncServer without a listening socket)
+class ShardWorker(AsyncServer):
+	def __init__(self, games, index, handoff, loads, users = 2, bots = 0, metrics = None, log_dir = None, record_dir = None):
+		super().__init__(games, users = users, bots = bots, metrics = metrics, log_dir = log_dir, record_dir = record_dir)
+		self.index = index
+		self.handoff = handoff		# unix SOCK_SEQPACKET from the front door, one table per message
+		self.loads = loads		# shared rooms per worker, the front door adds, we take away
+		self.main = None		# serve task, cancelled when the front door goes away
+
+
+	# a full table arrived: sockets (SCM_RIGHTS) + {game, players: [nickname, codec] per seat}
+	def receive_table(self):
+		try:
+			msg, fds, _, _ = socket.recv_fds(self.handoff, 65536, max(self.rooms.seats_per_table(game) for game in self.games))
+		except BlockingIOError:
+			return
+		if not msg:		# front door is gone (shut down or killed), so are we
+			asyncio.get_running_loop().remove_reader(self.handoff.fileno())
+			self.main.cancel()
+			return
+		table = json.loads(msg)
+		asyncio.create_task(self.seat_table(self.rooms.game(table["game"]), table["players"], [socket.socket(fileno = fd) for fd in fds]))
+
+
+	async def seat_table(self, game, players, socks):
+		streams = []
+		for sock in socks:
+			sock.setblocking(False)
+			streams.append(await asyncio.open_connection(sock = sock))
+		for (_, client), (_, codec) in zip(streams, players):
+			self.codecs[client] = game.codecs.get(codec, JSON)
+		room_id = self.rooms.create_room([(client, nickname) for (_, client), (nickname, _) in zip(streams, players)], game.name)
+		for reader, client in streams:
+			self.attach(client, asyncio.create_task(self.handle_seated(reader, client)))
+		await self.start_room(room_id)
+
+
+	# same as handle_client, the front door did the login
+	async def handle_seated(self, reader, client):
+		try:
+			await self.serve_requests(reader, client)
+		except (ConnectionError, OSError):
+			self.metrics.inc("gamehive_socket_errors_total")
+		finally:
+			self.disconnect(client)
+
+
+	async def serve(self):
+		self.main = asyncio.current_task()
+		self.changed = asyncio.Event()
+		self.scheduler.start()
+		self.handoff.setblocking(False)
+		asyncio.get_running_loop().add_reader(self.handoff.fileno(), self.receive_table)
+		try:
+			while True:
+				closed = await self.broadcast_changes()
+				if closed:
+					with self.loads.get_lock():
+						self.loads[self.index] -= len(closed)
+		except asyncio.CancelledError:
+			pass
+		finally:
+			await self.shutdown()
+
+
+# worker process entry point (metrics, if enabled, on the next ports / its own dump file, game records in its own stores)
+def run_worker(games, index, handoff, inherited, loads, users, bots, log_dir, record_dir):
+	for sock in inherited:		# front door ends of the handoff sockets, forked along
+		sock.close()
+	port, path = os.environ.get("GAMEHIVE_METRICS_PORT"), os.environ.get("GAMEHIVE_METRICS_DUMP")
+	if port:
+		os.environ["GAMEHIVE_METRICS_PORT"] = str(int(port) + 1 + index)
+	if path:
+		os.environ["GAMEHIVE_METRICS_DUMP"] = f"{path}.{index}"
+	if record_dir:
+		record_dir = os.path.join(record_dir, f"worker-{index}")		# one writer per store
+	ShardWorker(games, index, handoff, loads, users, bots, from_env(), log_dir, record_dir).run()
+
+
+# front door: handshake + matchmaking in one process, every full table is handed to the least loaded worker
+class ShardedServer(AsyncServer):
+	def __init__(self, games, host = '127.0.0.1', port = 62743, users = 2, bots = 0, workers = None, metrics = None, log_dir = None, record_dir = None):
+		super().__init__(games, host, port, users, bots, metrics, log_dir)
+		self.workers = workers or os.cpu_count()
+		self.lobby = {game.name: deque() for game in games}		# game -> (client, nickname, codec name) waiting for a table, only the front door touches it
+		self.seated = {}		# waiting client -> future, True once its table was handed off (False: refused)
+		self.loads = multiprocessing.Array("i", self.workers)		# rooms per worker, shared memory
+		self.handoffs = []		# front door end of each worker's unix socket
+		self.processes = []
+		self.log_dir = log_dir
+		self.record_dir = record_dir		# the workers play the games, they record them
+
+
+	def start_workers(self):
+		for index in range(self.workers):
+			front, back = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+			process = multiprocessing.Process(target = run_worker, args = (self.games, index, back, self.handoffs + [front], self.loads, self.users, self.bots, self.log_dir, self.record_dir), daemon = True)
+			process.start()
+			back.close()
+			self.handoffs.append(front)
+			self.processes.append(process)
+		print(f"{self.workers} workers started")
+
+
+	# queue the logged-in client, hand the table off once it is full (returns False if the client left or was refused)
+	async def handle_login(self, reader, client):
+		while not self.kill:
+			await self.send(Protocols.Response.NICKNAME, self.offer, client)		# offer the wire codecs
+			msg = await self.receive(reader, client)
+			if not msg:
+				return False
+			if msg.get("type") == Protocols.Request.SPECTATE:		# rooms live in the workers, the front door has none to show
+				self.queue(Protocols.Response.ERROR, "spectating is not supported by the sharded server", client)
+				return False
+			if msg.get("type") == Protocols.Request.NICKNAME:
+				data = msg.get("data")
+				game = self.rooms.game(data.get("game") if isinstance(data, dict) else None)		# old clients: the default game
+				nickname, self.codecs[client] = negotiate(data, game.codecs)
+				break
+		else:
+			return False
+
+		lobby = self.lobby[game.name]
+		lobby.append((client, nickname, self.codecs[client].name))
+		if len(lobby) < self.rooms.seats_per_table(game):
+			print(f"Waiting Lobby ({game.name}) = {len(lobby)} Players")
+			await self.send(Protocols.Response.WAIT, None, client)		# inform client to wait
+			return await self.wait_in_lobby(reader, client, game)
+		return self.hand_off(game, [lobby.popleft() for _ in range(self.rooms.seats_per_table(game))])
+
+
+	# a waiting player has nothing to say, its socket is only read to notice it leaving (anything it sends is dropped)
+	# returns True once its table was handed off, False if it left first or the table was refused
+	async def wait_in_lobby(self, reader, client, game):
+		seated = self.seated[client] = asyncio.get_running_loop().create_future()
+		read = None
+		try:
+			while not seated.done():
+				read = asyncio.ensure_future(reader.read(4096))
+				await asyncio.wait((read, seated), return_when = asyncio.FIRST_COMPLETED)
+				if not seated.done() and not read.result():		# closed while waiting
+					return False
+			return seated.result()
+		finally:
+			if read is not None:
+				read.cancel()
+			del self.seated[client]
+			if not seated.done():		# gone before its table filled, never handed to a worker
+				self.lobby[game.name] = deque(entry for entry in self.lobby[game.name] if entry[0] is not client)
+
+
+	# sockets of a full table -> least loaded live worker, our copies are closed (the connections stay open)
+	# returns False if no worker takes it: the table is refused (ERROR) instead
+	def hand_off(self, game, table):
+		msg = json.dumps({"game": game.name, "players": [[nickname, codec] for _, nickname, codec in table]}).encode("utf-8")
+		for client, _, _ in table:
+			client.transport.pause_reading()		# later bytes stay in the kernel for the worker
+		alive = [i for i, process in enumerate(self.processes) if process.is_alive()]
+		while alive:
+			with self.loads.get_lock():
+				index = min(alive, key = lambda i: self.loads[i])
+				self.loads[index] += 1
+			if self.send_table(index, msg, table):
+				break
+			with self.loads.get_lock():		# died since the check (or its socket is gone), try the next one
+				self.loads[index] -= 1
+			alive.remove(index)
+		else:
+			print("No live workers, refusing a table")
+			for client, _, _ in table:
+				client.transport.resume_reading()
+				self.queue(Protocols.Response.ERROR, "no game workers available", client)
+				if client in self.seated:
+					self.seated[client].set_result(False)
+			return False
+		for client, _, _ in table:
+			self.clients.discard(client)
+			self.codecs.pop(client, None)
+			self.traffic.pop(client, None)
+			client.transport.abort()		# closes our fd only, the worker holds the connection now
+			if client in self.seated:
+				self.seated[client].set_result(True)
+		return True
+
+
+	# one table message with dups of its sockets to worker index (returns False if it could not be sent)
+	def send_table(self, index, msg, table):
+		fds = [os.dup(client.get_extra_info("socket").fileno()) for client, _, _ in table]
+		try:
+			socket.send_fds(self.handoffs[index], [msg], fds)
+			return True
+		except OSError as e:
+			print(f"Worker {index} unreachable: {e}")
+			return False
+		finally:
+			for fd in fds:
+				os.close(fd)
+
+
+	# the front door only logs players in, everything after goes to a worker
+	async def handle_client(self, reader, client):
+		self.attach(client)
+		handed_off = False
+		try:
+			handed_off = await self.handle_login(reader, client)
+		except (ConnectionError, OSError):
+			self.metrics.inc("gamehive_socket_errors_total")
+		finally:
+			if not handed_off:		# a worker owns the connection otherwise
+				self.disconnect(client)
+
+
+	def collect(self):
+		yield "gamehive_connected_clients", {}, len(self.clients)
+		for name, lobby in self.lobby.items():
+			yield "gamehive_waiting_players", {"game": name}, len(lobby)
+		for index in range(self.workers):
+			yield "gamehive_worker_rooms", {"worker": index}, self.loads[index]
+
+
+	async def serve(self):
+		self.server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address = True, backlog = 4096)
+		print("Server created")
+		try:
+			async with self.server:
+				await self.server.serve_forever()
+		finally:
+			self.kill = True
+			for client in list(self.clients):
+				client.close()
+			await asyncio.gather(*self.tasks, return_exceptions = True)
+
+
+	def run(self):
+		self.start_workers()
+		try:
+			asyncio.run(self.serve())
+		except KeyboardInterrupt:		# Ctrl + C, the workers get it too
+			pass
+		for handoff in self.handoffs:
+			handoff.close()
+		for process in self.processes:
+			process.join()
+		print("Server killed")
+
+
+if __name__ == "__main__":
+	parser = game_parser("host one or more games, rooms sharded over worker processes")
+	parser.add_argument("--workers", type = int, default = None, help = "default: one per core")
+	parser.add_argument("--records", default = None, help = "record finished games here, one store per worker and game")
+	args = parser.parse_args()
+	ShardedServer(args.games, args.host, args.port, args.users, args.bots, args.workers, record_dir = args.records).run()
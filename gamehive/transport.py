@@ -0,0 +1,237 @@
+import time
+import socket
+import struct
+import threading
+
+HEADER = struct.Struct("!I")		# every frame is [4-byte length][payload]
+DONTWAIT = getattr(socket, "MSG_DONTWAIT", None)		# non-blocking send on a blocking socket (not on Windows)
+
+
+# length-prefixed frame, for writers that don't go through a Transport (asyncio streams)
+def frame(msg):
+	return HEADER.pack(len(msg)) + msg
+
+
+# framing over a blocking socket, shared by Server and Client
+class Transport:
+	def __init__(self, sock, size = 65536):
+		self.sock = sock
+
+		# inbound, recv_into a preallocated buffer, frames are handed out as views into it
+		self.buffer = bytearray(size)
+		self.view = memoryview(self.buffer)
+		self.start = 0		# first byte not handed out yet
+		self.end = 0		# end of the received bytes
+		self.closed = False		# peer closed the connection (or it was shut down)
+
+		# outbound, frames queued until the next flush go out in one sendall
+		self.outbox = []
+		self.lock = threading.Lock()		# the broadcast loop and the client's thread both send
+
+		self.bytes_in = 0
+		self.bytes_out = 0
+
+
+	# next frame payload (a memoryview, valid until the next call), None if the peer closed the connection
+	def recv_frame(self):
+		payload = self.next_frame()
+		while payload is None:
+			if not self.fill():
+				return None
+			payload = self.next_frame()
+		return payload
+
+
+	# a complete frame already buffered (one read can bring several), None if there is none yet
+	def next_frame(self):
+		if self.end - self.start < HEADER.size:
+			return None
+		(length,) = HEADER.unpack_from(self.buffer, self.start)
+		begin = self.start + HEADER.size
+		if self.end - begin < length:
+			return None
+		self.start = begin + length
+		return self.view[begin : self.start]
+
+
+	# one recv_into the free end of the buffer (returns False if the peer closed the connection)
+	def fill(self):
+		if self.start == self.end:		# everything consumed, start over
+			self.start = self.end = 0
+		elif self.start and len(self.buffer) - self.end < len(self.buffer) // 4:		# move the partial frame to the front
+			pending = bytes(self.view[self.start : self.end])
+			self.buffer[:len(pending)] = pending
+			self.start, self.end = 0, len(pending)
+		if self.end == len(self.buffer):		# a frame bigger than the buffer
+			buffer = bytearray(len(self.buffer) * 2)
+			buffer[:self.end] = self.view[:self.end]
+			self.buffer, self.view = buffer, memoryview(buffer)
+
+		received = self.sock.recv_into(self.view[self.end:])
+		if not received:
+			self.closed = True
+			return False
+		self.end += received
+		self.bytes_in += received
+		return True
+
+
+	# add an encoded message to the next flush
+	def queue(self, msg):
+		with self.lock:
+			self.outbox.append(HEADER.pack(len(msg)))
+			self.outbox.append(msg)
+
+
+	# send every queued frame at once
+	def flush(self):
+		with self.lock:
+			if not self.outbox:
+				return
+			data = b"".join(self.outbox)
+			self.outbox.clear()
+			self.sock.sendall(data)
+			self.bytes_out += len(data)
+
+
+	# queue + flush under one lock
+	def send(self, msg):
+		with self.lock:
+			self.outbox.append(HEADER.pack(len(msg)))
+			self.outbox.append(msg)
+			data = b"".join(self.outbox)
+			self.outbox.clear()
+			self.sock.sendall(data)
+			self.bytes_out += len(data)
+
+
+# server side framing: flush hands the frames to a writer thread, so a slow peer only holds up itself
+# the backlog is bounded: an unsent GAME_STATE is replaced by the newer one, a peer too far behind is evicted
+class QueuedTransport(Transport):
+	def __init__(self, sock, limit = 1 << 20, max_lag = 5.0, on_evict = None):
+		super().__init__(sock)
+		self.limit = limit		# bytes queued + in flight before the peer is evicted
+		self.max_lag = max_lag		# seconds one write may stay blocked before the peer is evicted
+		self.on_evict = on_evict		# called once (off the lock) when the peer falls behind either bound
+		self.ready = threading.Condition(self.lock)		# wakes the writer
+		self.flushed = False		# frames in the outbox were flushed, the writer should take them
+		self.state = None		# (outbox index, base version) of the GAME_STATE not handed to the writer yet
+		self.backlog = 0		# bytes in the outbox
+		self.in_flight = 0		# bytes the writer is sending
+		self.writing_since = None		# when the current write started (None = idle)
+		self.closing = False
+		self.evicted = False
+		self.writer = threading.Thread(target = self.write_loop, daemon = True)
+		self.writer.start()
+
+
+	def queue(self, msg):
+		with self.lock:
+			self.outbox.append(HEADER.pack(len(msg)))
+			self.outbox.append(msg)
+			self.backlog += HEADER.size + len(msg)
+
+
+	# queue a GAME_STATE, or fold it into the one still waiting: rebuild(base) encodes the state from that older base
+	# rebuild takes the room lock, so it runs off ours (lock order: room lock, then transport lock)
+	# returns True if it was coalesced
+	def queue_state(self, msg, base, rebuild):
+		with self.lock:
+			if self.state is None:
+				self.push_state(msg, base)
+				return False
+			waiting = self.state
+		while True:
+			rebuilt = rebuild(base if waiting is None else waiting[1])
+			with self.lock:
+				if self.state == waiting:
+					if waiting is None:		# the writer took the waiting one meanwhile, ours follows it (from its own base)
+						self.push_state(rebuilt, base)
+						return False
+					index = waiting[0]
+					self.backlog += len(rebuilt) - len(self.outbox[index + 1])
+					self.outbox[index] = HEADER.pack(len(rebuilt))
+					self.outbox[index + 1] = rebuilt
+					return True
+				waiting = self.state
+
+
+	# append a GAME_STATE the next one may fold into (lock held)
+	def push_state(self, msg, base):
+		self.state = (len(self.outbox), base)
+		self.outbox.append(HEADER.pack(len(msg)))
+		self.outbox.append(msg)
+		self.backlog += HEADER.size + len(msg)
+
+
+	# sends what the socket takes right away (no thread wakeup while the peer keeps up), wakes the writer for the rest
+	# returns at once, evicts the peer if it is too far behind
+	def flush(self):
+		with self.lock:
+			if self.outbox and not self.in_flight and DONTWAIT is not None:
+				data = b"".join(self.outbox)
+				try:
+					sent = self.sock.send(data, DONTWAIT)
+				except OSError:		# full (BlockingIOError) or gone, the writer finds out
+					sent = 0
+				self.bytes_out += sent
+				self.outbox.clear()
+				self.state = None		# a partly sent state can't be replaced
+				self.backlog = len(data) - sent
+				if sent < len(data):
+					self.outbox.append(data[sent:])
+			if self.outbox:
+				self.flushed = True
+				self.ready.notify()
+			lag = time.monotonic() - self.writing_since if self.writing_since is not None else 0.0
+			evict = not self.evicted and (self.backlog + self.in_flight > self.limit or lag > self.max_lag)
+			if evict:
+				self.evicted = True
+		if evict and self.on_evict is not None:
+			self.on_evict()
+
+
+	def send(self, msg):
+		self.queue(msg)
+		self.flush()
+
+
+	# bytes the peer hasn't taken yet
+	def pending(self):
+		with self.lock:
+			return self.backlog + self.in_flight
+
+
+	# writer thread, one sendall per batch of flushed frames
+	def write_loop(self):
+		while True:
+			with self.lock:
+				self.ready.wait_for(lambda: self.flushed or self.closing)
+				if not self.flushed:		# closing, nothing left to send
+					return
+				data = b"".join(self.outbox)
+				self.outbox.clear()
+				self.state = None
+				self.flushed = False
+				self.backlog = 0
+				self.in_flight = len(data)
+				self.writing_since = time.monotonic()
+			try:
+				self.sock.sendall(data)
+			except OSError:		# peer gone or evicted, the reader thread cleans up
+				with self.lock:
+					self.closing = True
+					self.in_flight = 0
+					self.writing_since = None
+				return
+			with self.lock:
+				self.bytes_out += len(data)
+				self.in_flight = 0
+				self.writing_since = None
+
+
+	# stop the writer once what was flushed is sent
+	def close(self):
+		with self.lock:
+			self.closing = True
+			self.ready.notify()